@@ -0,0 +1,96 @@
+"""
+Benchmark of the hyperparameter search strategies of params.yaml on a synthetic cluster sized dataset.
+
+Usage       :   python -m benchmarks.bench_search_strategies [n_rows]
+
+Prints the search wall time, the speedup against the exhaustive grid search and the R2 score of the
+best estimator on a held out split, for the XGBRegressor param grid of params.yaml.
+"""
+
+import sys
+import time
+
+from sklearn.datasets import make_regression
+from sklearn.metrics import r2_score
+from sklearn.model_selection import train_test_split
+from xgboost import XGBRegressor
+
+from climate.model_finder.search_strategy import get_search_cv
+from utils.read_params import read_params
+
+
+def run_search(search_config, param_grid, config, x_train, y_train, x_test, y_test):
+    search = get_search_cv(
+        XGBRegressor(),
+        param_grid,
+        search_config,
+        cv=config["model_utils"]["cv"],
+        verbose=0,
+        n_jobs=config["model_utils"]["n_jobs"],
+        random_state=config["base"]["random_state"],
+    )
+
+    start = time.perf_counter()
+
+    search.fit(x_train, y_train)
+
+    elapsed = time.perf_counter() - start
+
+    score = r2_score(y_test, search.best_estimator_.predict(x_test))
+
+    return elapsed, score, search.best_params_
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    config = read_params()
+
+    param_grid = config["XGBRegressor"]
+
+    X, y = make_regression(
+        n_samples=n_rows,
+        n_features=9,
+        noise=10.0,
+        random_state=config["base"]["random_state"],
+    )
+
+    x_train, x_test, y_train, y_test = train_test_split(
+        X,
+        y,
+        test_size=config["base"]["test_size"],
+        random_state=config["base"]["random_state"],
+    )
+
+    base = dict(config["model_utils"]["search"])
+
+    strategies = [
+        ("grid", dict(base, strategy="grid")),
+        ("random", dict(base, strategy="random")),
+        ("halving n_samples", dict(base, strategy="halving", resource="n_samples")),
+        (
+            "halving n_estimators",
+            dict(base, strategy="halving", resource="n_estimators"),
+        ),
+    ]
+
+    grid_time = None
+
+    print(
+        f"{'strategy':<22}{'time (s)':>10}{'speedup':>10}{'test r2':>10}  best params"
+    )
+
+    for name, search_config in strategies:
+        elapsed, score, best_params = run_search(
+            search_config, param_grid, config, x_train, y_train, x_test, y_test
+        )
+
+        grid_time = elapsed if grid_time is None else grid_time
+
+        print(
+            f"{name:<22}{elapsed:>10.2f}{grid_time / elapsed:>10.1f}{score:>10.4f}  {best_params}"
+        )
+
+
+if __name__ == "__main__":
+    main()
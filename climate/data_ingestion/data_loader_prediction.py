@@ -20,6 +20,8 @@ class Data_Getter_Pred:
 
         self.input_files_bucket = self.config["s3_bucket"]["input_files"]
 
+        self.invalid_values = self.config["invalid_values"]
+
         self.s3 = S3_Operation()
 
         self.log_writer = App_Logger()
@@ -51,6 +53,7 @@ class Data_Getter_Pred:
                 self.prediction_file,
                 self.input_files_bucket,
                 self.log_file,
+                na_values=self.invalid_values,
             )
 
             self.log_writer.start_log(
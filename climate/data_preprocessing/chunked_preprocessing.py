@@ -0,0 +1,481 @@
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+from climate.data_preprocessing.preprocessing import Preprocessor
+from climate.s3_bucket_operations.s3_operations import S3_Operation
+from utils.logger import App_Logger
+from utils.read_params import read_params
+
+
+class Replace_Invalid_Stage:
+    """
+    Description :   Streaming stage which replaces the invalid values with null in every chunk
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+
+    needs_stats = False
+
+    def __init__(self, invalid_values):
+        self.invalid_values = invalid_values
+
+    def transform(self, chunk):
+        return chunk.replace(self.invalid_values, np.nan)
+
+
+class Drop_Columns_Stage:
+    """
+    Description :   Streaming stage which drops the given columns from every chunk
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+
+    needs_stats = False
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+
+    def transform(self, chunk):
+        return chunk.drop(labels=self.columns, axis=1, errors="ignore")
+
+
+class Cast_Dtype_Stage:
+    """
+    Description :   Streaming stage which casts every chunk to the given dtype
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+
+    needs_stats = False
+
+    def __init__(self, dtype):
+        self.dtype = dtype
+
+    def transform(self, chunk):
+        return chunk.astype(self.dtype, copy=False)
+
+
+class Zero_Std_Stage:
+    """
+    Description :   Stage which needs global state. During the statistics pass it merges the per chunk
+                    null counts, minimums and maximums of the columns, and then drops the columns having
+                    a standard deviation of zero or at most one value.
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+
+    needs_stats = True
+
+    def __init__(self):
+        self.non_null_count = None
+
+        self.col_min = None
+
+        self.col_max = None
+
+        self.cols_drop = []
+
+    def update(self, chunk):
+        values = chunk.to_numpy()
+
+        mask = np.isnan(values)
+
+        non_null_count = pd.Series(
+            values.shape[0] - mask.sum(axis=0), index=chunk.columns
+        )
+
+        col_min = pd.Series(
+            np.where(mask, np.inf, values).min(axis=0, initial=np.inf),
+            index=chunk.columns,
+        )
+
+        col_max = pd.Series(
+            np.where(mask, -np.inf, values).max(axis=0, initial=-np.inf),
+            index=chunk.columns,
+        )
+
+        if self.non_null_count is None:
+            self.non_null_count, self.col_min, self.col_max = (
+                non_null_count,
+                col_min,
+                col_max,
+            )
+
+        else:
+            self.non_null_count = self.non_null_count + non_null_count
+
+            self.col_min = np.fmin(self.col_min, col_min)
+
+            self.col_max = np.fmax(self.col_max, col_max)
+
+    def finalize(self, stats_stages):
+        is_constant = (self.non_null_count <= 1) | (self.col_min == self.col_max)
+
+        self.cols_drop = list(self.non_null_count.index[is_constant])
+
+    def transform(self, chunk):
+        return chunk.drop(labels=self.cols_drop, axis=1)
+
+
+class Imputer_Stage:
+    """
+    Description :   Stage which needs global state. During the statistics pass it keeps a uniform random
+                    sample of at most sample_size rows, fits the KNN imputer on it and then only transforms
+                    the chunks having missing values.
+
+                    The KNN imputer drops the columns having no value in the data it is fitted on, so for
+                    every column the first row having a value is kept too, and added to the sample when
+                    the sampling left the column empty.
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+
+    needs_stats = True
+
+    def __init__(self, preprocessor, sample_size, random_state):
+        self.preprocessor = preprocessor
+
+        self.sample_size = sample_size
+
+        self.rng = np.random.RandomState(random_state)
+
+        self.sample = None
+
+        self.sample_keys = None
+
+        self.backfill_rows = {}
+
+        self.imputer = None
+
+        self.feature_order = None
+
+    def update(self, chunk):
+        missing_cols = [col for col in chunk.columns if col not in self.backfill_rows]
+
+        if len(missing_cols) > 0:
+            has_value = chunk[missing_cols].notna()
+
+            for col in has_value.columns[has_value.any().to_numpy()]:
+                self.backfill_rows[col] = chunk.loc[has_value[col].idxmax()]
+
+        keys = self.rng.random_sample(len(chunk))
+
+        if self.sample is None:
+            sample, sample_keys = chunk, keys
+
+        else:
+            sample = pd.concat([self.sample, chunk], ignore_index=True)
+
+            sample_keys = np.concatenate([self.sample_keys, keys])
+
+        if len(sample) > self.sample_size:
+            keep = np.argpartition(sample_keys, self.sample_size)[: self.sample_size]
+
+            sample, sample_keys = sample.iloc[keep], sample_keys[keep]
+
+        self.sample, self.sample_keys = sample.reset_index(drop=True), sample_keys
+
+    def finalize(self, stats_stages):
+        self.feature_order = list(self.sample.columns)
+
+        empty_cols = self.sample.columns[self.sample.isna().all().to_numpy()]
+
+        rows = [
+            self.backfill_rows[col] for col in empty_cols if col in self.backfill_rows
+        ]
+
+        if len(rows) > 0:
+            sample = pd.concat([self.sample, pd.DataFrame(rows)], ignore_index=True)
+
+        else:
+            sample = self.sample
+
+        # the imputer sees the chunks after the columns dropped by the stats stages before it
+        for stage in stats_stages:
+            sample = stage.transform(sample)
+
+        self.imputer = self.preprocessor.fit_imputer(sample)
+
+        self.sample, self.sample_keys, self.backfill_rows = None, None, {}
+
+    def transform(self, chunk):
+        if chunk.isna().values.any():
+            chunk = pd.DataFrame(
+                self.imputer.transform(chunk), columns=chunk.columns, index=chunk.index
+            )
+
+        return chunk
+
+
+class Chunked_Preprocessor:
+    """
+    Description :   This class shall be used for preprocessing the training data chunk by chunk, so that
+                    the peak memory stays bounded by the chunk size and not by the length of the history.
+
+                    Streaming stages run on every chunk. Stages which need global state see every chunk
+                    in a first statistics pass, after the streaming stages placed before them, and are
+                    finalized in order, each one knowing the stats stages finalized before it. The second
+                    pass applies all the stages and writes the features to a float32 memory mapped array.
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+
+    def __init__(self, log_file):
+        self.log_file = log_file
+
+        self.config = read_params()
+
+        self.chunksize = self.config["chunked_preprocessing"]["chunksize"]
+
+        self.work_dir = self.config["chunked_preprocessing"]["work_dir"]
+
+        self.invalid_values = self.config["invalid_values"]
+
+        self.random_state = self.config["base"]["random_state"]
+
+        self.knn_reference_sample_size = self.config["knn_imputer"][
+            "reference_sample_size"
+        ]
+
+        self.preprocessor = Preprocessor(log_file)
+
+        self.s3 = S3_Operation()
+
+        self.log_writer = App_Logger()
+
+        self.class_name = self.__class__.__name__
+
+    def get_training_stages(self, drop_columns):
+        """
+        Method Name :   get_training_stages
+        Description :   This method creates the stages used for preprocessing the training features
+
+        Output      :   A list of preprocessing stages
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.get_training_stages.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, self.log_file)
+
+        try:
+            stages = [
+                Replace_Invalid_Stage(self.invalid_values),
+                Drop_Columns_Stage(drop_columns),
+                Cast_Dtype_Stage(np.float32),
+                Zero_Std_Stage(),
+                Imputer_Stage(
+                    self.preprocessor,
+                    self.knn_reference_sample_size,
+                    self.random_state,
+                ),
+            ]
+
+            self.log_writer.log(
+                self.log_file,
+                f"Created stages {[stage.__class__.__name__ for stage in stages]}",
+            )
+
+            self.log_writer.start_log(
+                "exit", self.class_name, method_name, self.log_file
+            )
+
+            return stages
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e, self.class_name, method_name, self.log_file
+            )
+
+    def read_chunks(self, local_file):
+        return pd.read_csv(
+            local_file, chunksize=self.chunksize, na_values=self.invalid_values
+        )
+
+    def collect_stats(self, local_file, stages, label_column_name):
+        """
+        Method Name :   collect_stats
+        Description :   This method runs the statistics pass over all the chunks for the stages which need global state
+
+        Output      :   The number of rows in the data and the stats stages are finalized
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.collect_stats.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, self.log_file)
+
+        try:
+            n_rows = 0
+
+            for chunk in self.read_chunks(local_file):
+                n_rows += len(chunk)
+
+                chunk = chunk.drop(labels=label_column_name, axis=1)
+
+                for stage in stages:
+                    if stage.needs_stats:
+                        stage.update(chunk)
+
+                    else:
+                        chunk = stage.transform(chunk)
+
+            stats_stages = []
+
+            for stage in stages:
+                if stage.needs_stats:
+                    stage.finalize(stats_stages)
+
+                    stats_stages.append(stage)
+
+            self.log_writer.log(
+                self.log_file, f"Collected stats over {n_rows} rows of data"
+            )
+
+            self.log_writer.start_log(
+                "exit", self.class_name, method_name, self.log_file
+            )
+
+            return n_rows
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e, self.class_name, method_name, self.log_file
+            )
+
+    def transform_chunks(self, local_file, stages, label_column_name, n_rows):
+        """
+        Method Name :   transform_chunks
+        Description :   This method applies all the stages on every chunk and writes the features
+                        to a float32 memory mapped array
+
+        Output      :   A dataframe backed by the memory mapped features and a series of labels
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.transform_chunks.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, self.log_file)
+
+        try:
+            features, labels, columns, start = None, None, None, 0
+
+            for chunk in self.read_chunks(local_file):
+                label = chunk[label_column_name].to_numpy()
+
+                chunk = chunk.drop(labels=label_column_name, axis=1)
+
+                for stage in stages:
+                    chunk = stage.transform(chunk)
+
+                if features is None:
+                    columns = list(chunk.columns)
+
+                    features = np.memmap(
+                        tempfile.NamedTemporaryFile(dir=self.work_dir, suffix=".dat"),
+                        dtype=np.float32,
+                        mode="w+",
+                        shape=(n_rows, len(columns)),
+                    )
+
+                    # the labels of the first chunk may parse as integers, while later chunks have floats
+                    labels = np.empty(n_rows, dtype=np.float64)
+
+                end = start + len(chunk)
+
+                features[start:end] = chunk.to_numpy(dtype=np.float32)
+
+                labels[start:end] = label
+
+                start = end
+
+            X = pd.DataFrame(features, columns=columns, copy=False)
+
+            Y = pd.Series(labels, name=label_column_name)
+
+            self.log_writer.log(
+                self.log_file,
+                f"Transformed {n_rows} rows into {len(columns)} float32 features",
+            )
+
+            self.log_writer.start_log(
+                "exit", self.class_name, method_name, self.log_file
+            )
+
+            return X, Y
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e, self.class_name, method_name, self.log_file
+            )
+
+    def preprocess_training_data(
+        self, file_name, bucket, label_column_name, drop_columns
+    ):
+        """
+        Method Name :   preprocess_training_data
+        Description :   This method downloads the training file once and preprocesses it chunk by chunk
+
+        Output      :   Features, labels, the fitted imputer, the zero std columns and the feature order
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.preprocess_training_data.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, self.log_file)
+
+        try:
+            # every run downloads into a folder of its own, which is removed even when the download fails
+            with tempfile.TemporaryDirectory(dir=self.work_dir) as run_dir:
+                local_file = os.path.join(run_dir, os.path.basename(file_name))
+
+                self.s3.download_file(file_name, bucket, local_file, self.log_file)
+
+                stages = self.get_training_stages(drop_columns)
+
+                n_rows = self.collect_stats(local_file, stages, label_column_name)
+
+                X, Y = self.transform_chunks(
+                    local_file, stages, label_column_name, n_rows
+                )
+
+            imputer_stage = [s for s in stages if isinstance(s, Imputer_Stage)][0]
+
+            zero_std_stage = [s for s in stages if isinstance(s, Zero_Std_Stage)][0]
+
+            self.log_writer.log(
+                self.log_file, "Preprocessed training data chunk by chunk"
+            )
+
+            self.log_writer.start_log(
+                "exit", self.class_name, method_name, self.log_file
+            )
+
+            return (
+                X,
+                Y,
+                imputer_stage.imputer,
+                zero_std_stage.cols_drop,
+                imputer_stage.feature_order,
+            )
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e, self.class_name, method_name, self.log_file
+            )
@@ -1,11 +1,39 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+from climate.model.cluster_assigner import Centroid_Assigner
 from climate.s3_bucket_operations.s3_operations import S3_Operation
 from kneed import KneeLocator
-from matplotlib import pyplot as plt
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from threadpoolctl import threadpool_limits
 from utils.logger import App_Logger
+from utils.process_pool import get_process_pool
 from utils.read_params import read_params
 
 
+def fit_kmeans_inertia(data_file, shape, n_clusters, init, random_state, n_threads):
+    """
+    Method Name :   fit_kmeans_inertia
+    Description :   This method fits KMeans for one number of clusters on the memory mapped features,
+                    so that the features are shared with the worker processes instead of being pickled.
+                    The OpenMP and BLAS threads of the worker are limited to its share of the cores.
+
+    Output      :   The within cluster sum of squares of the fitted KMeans
+    """
+    data = np.memmap(data_file, dtype=np.float32, mode="r", shape=shape)
+
+    kmeans = KMeans(n_clusters=n_clusters, init=init, random_state=random_state)
+
+    with threadpool_limits(limits=n_threads):
+        kmeans.fit(data)
+
+    return kmeans.inertia_
+
+
 class KMeans_Clustering:
     """
     Description :   This class shall be used to divide the data into clusters before training.
@@ -19,9 +47,9 @@ class KMeans_Clustering:
 
         self.config = read_params()
 
-        self.input_files_bucket = self.config["s3_bucket"]["input_files"]
+        self.input_files_bucket = self.config["s3_bucket"]["input_files_bucket"]
 
-        self.model_bucket = self.config["s3_bucket"]["climate_model"]
+        self.model_bucket = self.config["s3_bucket"]["climate_model_bucket"]
 
         self.random_state = self.config["base"]["random_state"]
 
@@ -29,32 +57,143 @@ class KMeans_Clustering:
 
         self.max_clusters = self.config["kmeans_cluster"]["max_clusters"]
 
-        self.kmeans_curve = self.config["kmeans_cluster"]["knee"]["curve"]
+        self.kmeans_curve = self.config["kmeans_cluster"]["knee_locator"]["curve"]
 
-        self.kmeans_direction = self.config["kmeans_cluster"]["knee"]["direction"]
+        self.kmeans_direction = self.config["kmeans_cluster"]["knee_locator"][
+            "direction"
+        ]
 
-        self.trained_model_dir = self.config["model_dir"]["trained"]
+        self.elbow_n_jobs = self.config["kmeans_cluster"]["elbow"]["n_jobs"]
 
-        self.s3 = S3_Operation()
+        self.elbow_warm_start = self.config["kmeans_cluster"]["elbow"]["warm_start"]
+
+        self.work_dir = self.config["kmeans_cluster"]["elbow"]["work_dir"]
+
+        self.elbow_mode = self.config["kmeans_cluster"]["elbow"]["mode"]
+
+        self.elbow_sample_size = self.config["kmeans_cluster"]["elbow"]["sample_size"]
 
-        self.elbow_plot_file = self.config["elbow_plot_fig"]
+        self.elbow_n_seeds = self.config["kmeans_cluster"]["elbow"]["n_seeds"]
+
+        self.elbow_batch_size = self.config["kmeans_cluster"]["elbow"]["batch_size"]
+
+        self.elbow_cache_dir = self.config["kmeans_cluster"]["elbow"]["cache_dir"]
+
+        self.render_elbow_plot = self.config["kmeans_cluster"]["elbow"]["render_plot"]
+
+        self.trained_model_dir = self.config["models_dir"]["trained"]
+
+        self.centroids_file = self.config["kmeans_cluster"]["centroids_file"]
+
+        self.s3 = S3_Operation()
 
         self.log_writer = App_Logger()
 
         self.class_name = self.__class__.__name__
 
-    def elbow_plot(self, data):
+    def get_wcss_parallel(self, data):
         """
-        Method Name :   elbow_plot
-        Description :   This method saves the plot to s3 bucket and decides the optimum number of clusters to the file.
+        Method Name :   get_wcss_parallel
+        Description :   This method fits KMeans for every number of clusters concurrently in a pool of spawned
+                        processes. The features are written once to a memory mapped file which every worker reads,
+                        and the cores are split between the workers, so that their threads do not oversubscribe them.
 
-        Output      :   An elbow plot figure saved to input files bucket
+        Output      :   A list of wcss values for number of clusters from 1 to max_clusters - 1
         On Failure  :   Write an exception log and then raise an exception
 
         Version     :   1.2
         Revisions   :   Moved to setup to cloud
         """
-        method_name = self.elbow_plot.__name__
+        method_name = self.get_wcss_parallel.__name__
+
+        self.log_writer.start_log(
+            "start",
+            self.class_name,
+            method_name,
+            self.log_file,
+        )
+
+        try:
+            n_clusters_range = range(1, self.max_clusters)
+
+            n_cores = os.cpu_count() or 1
+
+            n_jobs = n_cores if self.elbow_n_jobs == -1 else self.elbow_n_jobs
+
+            n_jobs = max(1, min(n_jobs, len(n_clusters_range)))
+
+            n_threads = max(1, n_cores // n_jobs)
+
+            shape = (len(data), data.shape[1])
+
+            with tempfile.NamedTemporaryFile(dir=self.work_dir, suffix=".dat") as f:
+                features = np.memmap(f.name, dtype=np.float32, mode="w+", shape=shape)
+
+                # the columns are written straight into the memory mapped file,
+                # so that no float32 copy of the whole data is made in memory
+                if isinstance(data, pd.DataFrame):
+                    for i, col in enumerate(data.columns):
+                        features[:, i] = data[col].to_numpy()
+
+                else:
+                    features[:] = data
+
+                features.flush()
+
+                del features
+
+                with get_process_pool(n_jobs) as pool:
+                    wcss = pool.starmap(
+                        fit_kmeans_inertia,
+                        [
+                            (
+                                f.name,
+                                shape,
+                                i,
+                                self.kmeans_init,
+                                self.random_state,
+                                n_threads,
+                            )
+                            for i in n_clusters_range
+                        ],
+                    )
+
+            self.log_writer.log(
+                self.log_file,
+                f"Computed wcss for {len(wcss)} number of clusters with {n_jobs} processes of {n_threads} threads",
+            )
+
+            self.log_writer.start_log(
+                "exit",
+                self.class_name,
+                method_name,
+                self.log_file,
+            )
+
+            return wcss
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e,
+                self.class_name,
+                method_name,
+                self.log_file,
+            )
+
+    def get_wcss_warm_start(self, data):
+        """
+        Method Name :   get_wcss_warm_start
+        Description :   This method fits KMeans for every number of clusters one after another, starting each
+                        fit from the centroids of the previous number of clusters plus the point which is the
+                        farthest from them, so that every fit needs a single initialization and few iterations.
+
+        Output      :   A list of wcss values for number of clusters from 1 to max_clusters - 1
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   Moved to setup to cloud
+        """
+        method_name = self.get_wcss_warm_start.__name__
 
         self.log_writer.start_log(
             "start",
@@ -64,39 +203,145 @@ class KMeans_Clustering:
         )
 
         try:
-            wcss = []
+            values = np.asarray(data, dtype=np.float64)
+
+            sq_norms = np.einsum("ij,ij->i", values, values)
+
+            wcss, centroids = [], None
 
             for i in range(1, self.max_clusters):
-                kmeans = KMeans(
-                    n_clusters=i, init=self.kmeans_init, random_state=self.random_state
-                )
+                if centroids is None:
+                    kmeans = KMeans(
+                        n_clusters=i,
+                        init=self.kmeans_init,
+                        random_state=self.random_state,
+                    )
+
+                else:
+                    sq_dist = (
+                        sq_norms[:, np.newaxis]
+                        - 2 * values.dot(centroids.T)
+                        + np.einsum("ij,ij->i", centroids, centroids)
+                    )
 
-                kmeans.fit(data)
+                    farthest = values[sq_dist.min(axis=1).argmax()]
+
+                    kmeans = KMeans(
+                        n_clusters=i,
+                        init=np.vstack([centroids, farthest]),
+                        n_init=1,
+                        random_state=self.random_state,
+                    )
+
+                kmeans.fit(values)
+
+                centroids = kmeans.cluster_centers_
 
                 wcss.append(kmeans.inertia_)
 
-            plt.plot(range(1, self.max_clusters), wcss)
+            self.log_writer.log(
+                self.log_file,
+                f"Computed wcss for {len(wcss)} number of clusters with warm start",
+            )
+
+            self.log_writer.start_log(
+                "exit",
+                self.class_name,
+                method_name,
+                self.log_file,
+            )
+
+            return wcss
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e,
+                self.class_name,
+                method_name,
+                self.log_file,
+            )
+
+    def get_time_stratified_sample(self, data, seed):
+        """
+        Method Name :   get_time_stratified_sample
+        Description :   This method splits the rows, which are in time order, into sample_size equal strata
+                        and picks one random row from every stratum
+
+        Output      :   A float32 array with at most sample_size rows of the data
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   Moved to setup to cloud
+        """
+        method_name = self.get_time_stratified_sample.__name__
+
+        self.log_writer.start_log(
+            "start",
+            self.class_name,
+            method_name,
+            self.log_file,
+        )
+
+        try:
+            n_rows = len(data)
 
-            plt.title("The Elbow Method")
+            if n_rows > self.elbow_sample_size:
+                rng = np.random.RandomState(seed)
 
-            plt.xlabel("Number of clusters")
+                bounds = np.linspace(0, n_rows, self.elbow_sample_size + 1).astype(int)
 
-            plt.ylabel("WCSS")
+                offsets = rng.random_sample(self.elbow_sample_size) * np.diff(bounds)
 
-            plt.savefig(self.elbow_plot_file)
+                idx = bounds[:-1] + offsets.astype(int)
+
+                # only the sampled rows are converted to float32
+                data = data.take(idx, axis=0)
+
+            values = np.asarray(data, dtype=np.float32)
 
             self.log_writer.log(
                 self.log_file,
-                "Saved elbow_plot fig and local copy is created",
+                f"Took time stratified sample of {values.shape[0]} rows from {n_rows} rows",
             )
 
-            self.s3.upload_file(
-                self.elbow_plot_file,
-                self.elbow_plot_file,
-                self.input_files_bucket,
+            self.log_writer.start_log(
+                "exit",
+                self.class_name,
+                method_name,
+                self.log_file,
+            )
+
+            return values
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e,
+                self.class_name,
+                method_name,
                 self.log_file,
             )
 
+    def get_knee(self, wcss):
+        """
+        Method Name :   get_knee
+        Description :   This method finds the knee of the wcss curve
+
+        Output      :   The optimum number of clusters
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   Moved to setup to cloud
+        """
+        method_name = self.get_knee.__name__
+
+        self.log_writer.start_log(
+            "start",
+            self.class_name,
+            method_name,
+            self.log_file,
+        )
+
+        try:
             self.kn = KneeLocator(
                 range(1, self.max_clusters),
                 wcss,
@@ -104,9 +349,159 @@ class KMeans_Clustering:
                 direction=self.kmeans_direction,
             )
 
+            self.log_writer.start_log(
+                "exit",
+                self.class_name,
+                method_name,
+                self.log_file,
+            )
+
+            return self.kn.knee
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e,
+                self.class_name,
+                method_name,
+                self.log_file,
+            )
+
+    def get_wcss_minibatch(self, data):
+        """
+        Method Name :   get_wcss_minibatch
+        Description :   This method estimates the wcss curve with MiniBatchKMeans on a time stratified sample,
+                        once for each of n_seeds seeds, and checks that the knee is stable across the seeds.
+                        The wcss of the sample is scaled to the number of rows of the full data.
+
+        Output      :   The median wcss curve across the seeds and the most common knee
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   Moved to setup to cloud
+        """
+        method_name = self.get_wcss_minibatch.__name__
+
+        self.log_writer.start_log(
+            "start",
+            self.class_name,
+            method_name,
+            self.log_file,
+        )
+
+        try:
+            curves, knees = [], []
+
+            for seed in range(
+                self.random_state, self.random_state + self.elbow_n_seeds
+            ):
+                sample = self.get_time_stratified_sample(data, seed)
+
+                scale = float(len(data)) / sample.shape[0]
+
+                wcss = [
+                    MiniBatchKMeans(
+                        n_clusters=i,
+                        init=self.kmeans_init,
+                        batch_size=self.elbow_batch_size,
+                        random_state=seed,
+                    )
+                    .fit(sample)
+                    .inertia_
+                    * scale
+                    for i in range(1, self.max_clusters)
+                ]
+
+                curves.append(wcss)
+
+                knees.append(self.get_knee(wcss))
+
+            valid_knees = [knee for knee in knees if knee is not None]
+
+            knee = max(set(valid_knees), key=valid_knees.count) if valid_knees else None
+
+            self.log_writer.log(
+                self.log_file,
+                f"Knees across {self.elbow_n_seeds} seeds are {knees}, stable is {len(set(knees)) == 1}",
+            )
+
+            self.log_writer.start_log(
+                "exit",
+                self.class_name,
+                method_name,
+                self.log_file,
+            )
+
+            return np.median(curves, axis=0).tolist(), knee
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e,
+                self.class_name,
+                method_name,
+                self.log_file,
+            )
+
+    def get_data_fingerprint(self, data, n_sample_rows=1000):
+        """
+        Method Name :   get_data_fingerprint
+        Description :   This method fingerprints the features with a fast hash of their shape, columns, dtypes
+                        and evenly spaced sample rows, together with the kmeans and elbow params
+
+        Output      :   A hex digest identifying the data and the params used for the elbow curve
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   Moved to setup to cloud
+        """
+        method_name = self.get_data_fingerprint.__name__
+
+        self.log_writer.start_log(
+            "start",
+            self.class_name,
+            method_name,
+            self.log_file,
+        )
+
+        try:
+            values = np.asarray(data)
+
+            rows = np.unique(
+                np.linspace(0, values.shape[0] - 1, n_sample_rows).astype(int)
+            )
+
+            h = hashlib.sha1()
+
+            h.update(str(values.shape).encode())
+
+            h.update(str(list(getattr(data, "columns", []))).encode())
+
+            h.update(str(list(getattr(data, "dtypes", [values.dtype]))).encode())
+
+            h.update(np.ascontiguousarray(values[rows]).tobytes())
+
+            h.update(
+                json.dumps(
+                    {
+                        "init": self.kmeans_init,
+                        "max_clusters": self.max_clusters,
+                        "random_state": self.random_state,
+                        "curve": self.kmeans_curve,
+                        "direction": self.kmeans_direction,
+                        "mode": self.elbow_mode,
+                        "warm_start": self.elbow_warm_start,
+                        "sample_size": self.elbow_sample_size,
+                        "n_seeds": self.elbow_n_seeds,
+                        "batch_size": self.elbow_batch_size,
+                    },
+                    sort_keys=True,
+                ).encode()
+            )
+
+            fingerprint = h.hexdigest()
+
             self.log_writer.log(
                 self.log_file,
-                f"The optimum number of clusters is {str(self.kn.knee)}.",
+                f"Got {fingerprint} as the fingerprint of the data",
             )
 
             self.log_writer.start_log(
@@ -116,7 +511,182 @@ class KMeans_Clustering:
                 self.log_file,
             )
 
-            return self.kn.knee
+            return fingerprint
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e,
+                self.class_name,
+                method_name,
+                self.log_file,
+            )
+
+    def get_elbow_curve(self, data):
+        """
+        Method Name :   get_elbow_curve
+        Description :   This method computes the wcss curve and the knee for the configured elbow mode
+
+        Output      :   The wcss curve and the optimum number of clusters
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   Moved to setup to cloud
+        """
+        method_name = self.get_elbow_curve.__name__
+
+        self.log_writer.start_log(
+            "start",
+            self.class_name,
+            method_name,
+            self.log_file,
+        )
+
+        try:
+            if self.elbow_mode == "minibatch":
+                wcss, knee = self.get_wcss_minibatch(data)
+
+            elif self.elbow_warm_start is True:
+                wcss = self.get_wcss_warm_start(data)
+
+                knee = self.get_knee(wcss)
+
+            else:
+                wcss = self.get_wcss_parallel(data)
+
+                knee = self.get_knee(wcss)
+
+            self.log_writer.start_log(
+                "exit",
+                self.class_name,
+                method_name,
+                self.log_file,
+            )
+
+            return [float(w) for w in wcss], None if knee is None else int(knee)
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e,
+                self.class_name,
+                method_name,
+                self.log_file,
+            )
+
+    def plot_elbow(self, wcss):
+        """
+        Method Name :   plot_elbow
+        Description :   This method renders the elbow plot for the wcss curve and uploads it to input files bucket
+                        in the background, importing the reporting module only when a plot is asked for
+
+        Output      :   The thread rendering the elbow plot
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   Moved to setup to cloud
+        """
+        method_name = self.plot_elbow.__name__
+
+        self.log_writer.start_log(
+            "start",
+            self.class_name,
+            method_name,
+            self.log_file,
+        )
+
+        try:
+            from climate.reporting.plot_report import Plot_Report
+
+            self.plot_thread = Plot_Report(
+                self.log_file
+            ).upload_elbow_plot_in_background(wcss)
+
+            self.log_writer.start_log(
+                "exit",
+                self.class_name,
+                method_name,
+                self.log_file,
+            )
+
+            return self.plot_thread
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e,
+                self.class_name,
+                method_name,
+                self.log_file,
+            )
+
+    def elbow_plot(self, data):
+        """
+        Method Name :   elbow_plot
+        Description :   This method decides the optimum number of clusters. The wcss curve and the knee are cached
+                        in the model bucket keyed by the fingerprint of the data, and the plot is saved to s3 bucket
+                        only when render_plot is set.
+
+        Output      :   The optimum number of clusters
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   Moved to setup to cloud
+        """
+        method_name = self.elbow_plot.__name__
+
+        self.log_writer.start_log(
+            "start",
+            self.class_name,
+            method_name,
+            self.log_file,
+        )
+
+        try:
+            fingerprint = self.get_data_fingerprint(data)
+
+            cache_file = self.elbow_cache_dir + fingerprint + ".json"
+
+            if self.s3.is_object_present(cache_file, self.model_bucket, self.log_file):
+                cached = self.s3.read_json(cache_file, self.model_bucket, self.log_file)
+
+                wcss, knee = cached["wcss"], cached["knee"]
+
+                self.log_writer.log(
+                    self.log_file,
+                    f"Reused cached elbow curve {cache_file} from {self.model_bucket} bucket",
+                )
+
+            else:
+                wcss, knee = self.get_elbow_curve(data)
+
+                self.s3.upload_bytes(
+                    json.dumps({"wcss": wcss, "knee": knee}).encode(),
+                    cache_file,
+                    self.model_bucket,
+                    self.log_file,
+                )
+
+                self.log_writer.log(
+                    self.log_file,
+                    f"Cached elbow curve as {cache_file} in {self.model_bucket} bucket",
+                )
+
+            self.wcss = wcss
+
+            if self.render_elbow_plot is True:
+                self.plot_elbow(wcss)
+
+            self.log_writer.log(
+                self.log_file,
+                f"The optimum number of clusters is {str(knee)}.",
+            )
+
+            self.log_writer.start_log(
+                "exit",
+                self.class_name,
+                method_name,
+                self.log_file,
+            )
+
+            return knee
 
         except Exception as e:
             self.log_writer.exception_log(
@@ -129,7 +699,8 @@ class KMeans_Clustering:
     def create_clusters(self, data, number_of_clusters):
         """
         Method Name :   create_clusters
-        Description :   Create a new dataframe consisting of the cluster information.
+        Description :   Create a new dataframe consisting of the cluster information. Along with the KMeans model,
+                        its centroids are exported as a compact npy array for the NumPy cluster assigner.
 
         Output      :   A dataframe with cluster column
         On Failure  :   Write an exception log and then raise an exception
@@ -164,11 +735,18 @@ class KMeans_Clustering:
                 self.log_file,
             )
 
+            self.s3.upload_bytes(
+                Centroid_Assigner.to_bytes(self.kmeans.cluster_centers_),
+                self.trained_model_dir + self.centroids_file,
+                self.model_bucket,
+                self.log_file,
+            )
+
             self.data["Cluster"] = self.y_kmeans
 
             self.log_writer.log(
                 self.log_file,
-                f"Successfully created {str(self.kn.knee)} clusters",
+                f"Successfully created {str(number_of_clusters)} clusters",
             )
 
             self.log_writer.start_log(
@@ -0,0 +1,153 @@
+import numpy as np
+import pandas as pd
+
+
+class Feature_Matrix:
+    """
+    Description :   This class shall be used for holding the features in a single contiguous float32 array,
+                    so that the preprocessing steps can work in place. Removing columns only updates the
+                    list of active column indices and imputation writes back into the same buffer.
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+
+    def __init__(self, values, columns):
+        self.buffer = np.ascontiguousarray(values, dtype=np.float32)
+
+        self.all_columns = list(columns)
+
+        self.active = np.arange(len(self.all_columns))
+
+    @classmethod
+    def from_frame(cls, data, exclude=()):
+        columns = [col for col in data.columns if col not in exclude]
+
+        values = np.empty((len(data), len(columns)), dtype=np.float32)
+
+        for i, col in enumerate(columns):
+            values[:, i] = data[col].to_numpy()
+
+        return cls(values, columns)
+
+    @property
+    def columns(self):
+        return [self.all_columns[i] for i in self.active]
+
+    @property
+    def shape(self):
+        return self.buffer.shape[0], len(self.active)
+
+    def __len__(self):
+        return self.buffer.shape[0]
+
+    def is_view(self):
+        """
+        Method Name :   is_view
+        Description :   This method checks whether the active columns are a contiguous range of the buffer,
+                        in which case they can be read as a view without copying
+
+        Output      :   True if the active columns can be read as a view, else False
+        """
+        return len(self.active) == 0 or bool(np.all(np.diff(self.active) == 1))
+
+    def drop(self, columns):
+        """
+        Method Name :   drop
+        Description :   This method removes the columns by index bookkeeping, the buffer is left untouched
+
+        Output      :   The same feature matrix without the given columns
+        """
+        drop_idx = [self.all_columns.index(col) for col in columns]
+
+        self.active = self.active[~np.isin(self.active, drop_idx)]
+
+        return self
+
+    def to_array(self):
+        """
+        Method Name :   to_array
+        Description :   This method returns the active columns, as a view of the buffer when they are
+                        contiguous, else as a compact copy
+
+        Output      :   A float32 array of the active columns
+        """
+        if self.is_view():
+            start = self.active[0] if len(self.active) > 0 else 0
+
+            return self.buffer[:, start : start + len(self.active)]
+
+        return np.take(self.buffer, self.active, axis=1)
+
+    def to_frame(self):
+        return pd.DataFrame(self.to_array(), columns=self.columns, copy=False)
+
+    def get_nan_rows(self):
+        """
+        Method Name :   get_nan_rows
+        Description :   This method finds the rows having a missing value in any active column, one column of
+                        the buffer at a time, so that the active columns are never copied
+
+        Output      :   The indices of the rows having missing values
+        """
+        mask = np.zeros(len(self), dtype=bool)
+
+        for i in self.active:
+            mask |= np.isnan(self.buffer[:, i])
+
+        return np.flatnonzero(mask)
+
+    def sample_frame(self, sample_size, random_state):
+        """
+        Method Name :   sample_frame
+        Description :   This method takes a random sample of at most sample_size rows of the active columns
+                        straight from the buffer. For every column left empty by the sampling, the first row
+                        having a value is added, so that an imputer fitted on the sample keeps every column.
+
+        Output      :   A dataframe of the sampled rows
+        """
+        n_rows = len(self)
+
+        if sample_size is None or n_rows <= sample_size:
+            rows = np.arange(n_rows)
+
+        else:
+            rows = np.sort(
+                np.random.RandomState(random_state).choice(
+                    n_rows, sample_size, replace=False
+                )
+            )
+
+        values = self.buffer[np.ix_(rows, self.active)]
+
+        backfill_rows = []
+
+        for j in np.flatnonzero(np.isnan(values).all(axis=0)):
+            valid_rows = np.flatnonzero(~np.isnan(self.buffer[:, self.active[j]]))
+
+            if len(valid_rows) > 0:
+                backfill_rows.append(valid_rows[0])
+
+        if len(backfill_rows) > 0:
+            values = np.vstack(
+                [values, self.buffer[np.ix_(sorted(set(backfill_rows)), self.active)]]
+            )
+
+        return pd.DataFrame(values, columns=self.columns, copy=False)
+
+    def impute(self, imputer):
+        """
+        Method Name :   impute
+        Description :   This method transforms only the rows having missing values with the fitted imputer
+                        and writes the imputed values back into the buffer
+
+        Output      :   The same feature matrix with the missing values imputed
+        """
+        rows = self.get_nan_rows()
+
+        if len(rows) > 0:
+            idx = np.ix_(rows, self.active)
+
+            self.buffer[idx] = imputer.transform(self.buffer[idx])
+
+        return self
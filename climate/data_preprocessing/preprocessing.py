@@ -1,5 +1,6 @@
 import numpy as np
 import pandas as pd
+from climate.data_preprocessing.feature_matrix import Feature_Matrix
 from climate.s3_bucket_operations.s3_operations import S3_Operation
 from sklearn.impute import KNNImputer
 from sklearn.preprocessing import StandardScaler
@@ -25,13 +26,21 @@ class Preprocessor:
 
         self.null_values_file = self.config["null_values_csv_file"]
 
-        self.n_components = self.config["pca_model"]["n_components"]
+        self.knn_n_neighbors = self.config["knn_imputer"]["n_neighbors"]
 
-        self.knn_n_neighbors = self.config["n_neighbors"]
+        self.knn_weights = self.config["knn_imputer"]["weights"]
 
-        self.knn_weights = (self.config["weights"],)
+        self.knn_reference_sample_size = self.config["knn_imputer"][
+            "reference_sample_size"
+        ]
 
-        self.input_files_bucket = self.config["s3_bucket"]["input_files"]
+        self.random_state = self.config["base"]["random_state"]
+
+        self.preprocessing_bundle_file = self.config["preprocessing_bundle_file"]
+
+        self.input_files_bucket = self.config["s3_bucket"]["input_files_bucket"]
+
+        self.invalid_values = self.config["invalid_values"]
 
         self.s3 = S3_Operation()
 
@@ -39,6 +48,7 @@ class Preprocessor:
         """
         Method Name :   remove_columns
         Description :   This method removes the given columns from a pandas dataframe.
+                        For a Feature_Matrix the columns are removed in place without copying.
 
         Output      :   A pandas dataframe after removing the specified columns.
         On Failure  :   Write an exception log and then raise an exception
@@ -61,7 +71,11 @@ class Preprocessor:
         self.columns = columns
 
         try:
-            self.useful_data = self.data.drop(labels=self.columns, axis=1)
+            if isinstance(self.data, Feature_Matrix):
+                self.useful_data = self.data.drop(self.columns)
+
+            else:
+                self.useful_data = self.data.drop(labels=self.columns, axis=1)
 
             self.log_writer.log(self.log_file, "Column removal Successful")
 
@@ -141,6 +155,7 @@ class Preprocessor:
         """
         Method Name :   drop_unnecessary_columns
         Description :   This method drop unnecessary columns in the dataframe
+                        For a Feature_Matrix the columns are dropped in place without copying.
 
         Output      :   Unnecessary columns are dropped in the dataframe
         On Failure  :   Write an exception log and then raise an exception
@@ -159,7 +174,11 @@ class Preprocessor:
         )
 
         try:
-            data = data.drop(cols, axis=1)
+            if isinstance(data, Feature_Matrix):
+                data = data.drop(cols)
+
+            else:
+                data = data.drop(cols, axis=1)
 
             self.log_writer.log(self.log_file, "Dropped unnecessary columns")
 
@@ -183,7 +202,8 @@ class Preprocessor:
     def replace_invalid_with_null(self, data):
         """
         Method Name :   replace_invalid_with_null
-        Description :   This method replaces invalid values with null
+        Description :   This method replaces the invalid values listed in params.yaml with null in one
+                        frame-wide replace. Data read through the data getters already has them parsed as null.
 
         Output      :   A dataframe where invalid values are replaced with null
         On Failure  :   Write an exception log and then raise an exception
@@ -202,15 +222,11 @@ class Preprocessor:
         )
 
         try:
-            for column in data.columns:
-                count = data[column][data[column] == "?"].count()
-
-                if count != 0:
-                    data[column] = data[column].replace("?", np.nan)
+            data = data.replace(self.invalid_values, np.nan)
 
             self.log_writer.log(
                 self.log_file,
-                "Replaced invalid values with np.nan",
+                f"Replaced invalid values {self.invalid_values} with np.nan",
             )
 
             self.log_writer.start_log(
@@ -230,10 +246,112 @@ class Preprocessor:
                 self.log_file,
             )
 
+    def profile_columns(self, data):
+        """
+        Method Name :   profile_columns
+        Description :   This method profiles every column of the dataframe in a single vectorized pass,
+                        computing the null count for all the columns and min, max, mean and variance
+                        for the numeric columns.
+
+        Output      :   A dataframe indexed by column name with the profile of each column
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.profile_columns.__name__
+
+        self.log_writer.start_log(
+            "start",
+            self.class_name,
+            method_name,
+            self.log_file,
+        )
+
+        try:
+            numeric_cols = data.select_dtypes(include=[np.number]).columns
+
+            other_cols = data.columns.difference(numeric_cols, sort=False)
+
+            values = data[numeric_cols].to_numpy()
+
+            if values.dtype.kind != "f":
+                values = values.astype(np.float64)
+
+            mask = np.isnan(values)
+
+            count = values.shape[0] - mask.sum(axis=0)
+
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = np.where(mask, 0.0, values).sum(axis=0) / count
+
+                centered = np.where(mask, 0.0, values - mean)
+
+                variance = np.einsum("ij,ij->j", centered, centered) / (count - 1)
+
+            variance[count < 2] = np.nan
+
+            col_min = np.where(mask, np.inf, values).min(axis=0, initial=np.inf)
+
+            col_max = np.where(mask, -np.inf, values).max(axis=0, initial=-np.inf)
+
+            col_min[count == 0] = np.nan
+
+            col_max[count == 0] = np.nan
+
+            profile = pd.DataFrame(
+                {
+                    "columns": numeric_cols,
+                    "missing values count": values.shape[0] - count,
+                    "min": col_min,
+                    "max": col_max,
+                    "mean": mean,
+                    "variance": variance,
+                },
+                index=numeric_cols,
+            )
+
+            if len(other_cols) > 0:
+                other_profile = pd.DataFrame(
+                    {
+                        "columns": other_cols,
+                        "missing values count": data[other_cols].isna().sum().values,
+                    },
+                    index=other_cols,
+                )
+
+                profile = pd.concat([profile, other_profile], sort=False)
+
+            profile = profile.reindex(data.columns)
+
+            self.log_writer.log(
+                self.log_file,
+                f"Profiled {len(data.columns)} columns of the data",
+            )
+
+            self.log_writer.start_log(
+                "exit",
+                self.class_name,
+                method_name,
+                self.log_file,
+            )
+
+            return profile
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e,
+                self.class_name,
+                method_name,
+                self.log_file,
+            )
+
     def is_null_present(self, data):
         """
         Method Name :   is_null_present
         Description :   This method checks whether there are null values present in the pandas dataframe or not.
+                        The column profile is uploaded to s3 bucket as the null values report and kept
+                        in self.profile for reuse.
 
         Output      :   Returns True if null values are present in the dataframe, False if they are not present and
                         returns the list of columns for which null values are present.
@@ -252,35 +370,23 @@ class Preprocessor:
             self.log_file,
         )
 
-        self.null_present = False
-
-        self.cols_with_missing_values = []
-
-        self.cols = data.columns
-
         try:
-            self.null_counts = data.isna().sum()
-
-            for i in range(len(self.null_counts)):
-                if self.null_counts[i] > 0:
-                    self.null_present = True
+            self.profile = self.profile_columns(data)
 
-                    self.cols_with_missing_values.append(self.cols[i])
+            null_counts = self.profile["missing values count"]
 
-            if self.null_present:
-                self.null_df = pd.DataFrame()
+            self.cols_with_missing_values = list(null_counts.index[null_counts > 0])
 
-                self.null_df["columns"] = data.columns
-
-                self.null_df["missing values count"] = np.asarray(data.isna().sum())
+            self.null_present = len(self.cols_with_missing_values) > 0
 
             self.log_writer.log(self.log_file, "Created data frame with null values")
 
             self.s3.upload_df_as_csv(
-                self.null_df,
+                self.profile,
                 self.null_values_file,
-                self.input_files_bucket,
                 self.null_values_file,
+                self.input_files_bucket,
+                self.log_file,
             )
 
             self.log_writer.start_log(
@@ -390,19 +496,24 @@ class Preprocessor:
                 self.log_file,
             )
 
-    def impute_missing_values(self, data):
+    def fit_imputer(self, data, sample_size=None):
         """
-        Method Name : impute_missing_values
-        Description : This method replaces all the missing values in the dataframe using KNN Imputer.
+        Method Name : fit_imputer
+        Description : This method fits a KNN Imputer on the data, or on a random sample of at most
+                      sample_size rows of it, so that it can be reused for transforming other data.
 
-        Output      : A dataframe which has all the missing values imputed.
+                      The KNN Imputer drops the columns having no value in the data it is fitted on, which
+                      would misalign the imputed columns. So for every column left empty by the sampling a
+                      row having a value is added to the sample, and columns having no value at all must be
+                      dropped before fitting.
+
+        Output      : A fitted KNN Imputer
         On Failure  : Raise Exception
 
-        Written By  : iNeuron Intelligence
         Version     : 1.2
         Revisions   : moved setup to cloud
         """
-        method_name = self.impute_missing_values.__name__
+        method_name = self.fit_imputer.__name__
 
         self.log_writer.start_log(
             "start",
@@ -411,8 +522,6 @@ class Preprocessor:
             self.log_file,
         )
 
-        self.data = data
-
         try:
             imputer = KNNImputer(
                 n_neighbors=self.knn_n_neighbors,
@@ -420,20 +529,129 @@ class Preprocessor:
                 missing_values=np.nan,
             )
 
+            if isinstance(data, Feature_Matrix):
+                # the sample is taken from the buffer, so that the whole matrix is never copied
+                data = data.sample_frame(sample_size, self.random_state)
+
+            else:
+                if not isinstance(data, pd.DataFrame):
+                    data = pd.DataFrame(data)
+
+                if sample_size is not None and len(data) > sample_size:
+                    sample = data.sample(n=sample_size, random_state=self.random_state)
+
+                    empty_cols = sample.columns[sample.isna().all().to_numpy()]
+
+                    backfill_idx = {data[col].first_valid_index() for col in empty_cols}
+
+                    backfill_idx.discard(None)
+
+                    data = pd.concat([sample, data.loc[sorted(backfill_idx)]])
+
+            empty_cols = list(data.columns[data.isna().all().to_numpy()])
+
+            if len(empty_cols) > 0:
+                raise ValueError(
+                    f"Columns {empty_cols} have no value to fit the imputer on, drop them before imputing"
+                )
+
+            imputer.fit(data)
+
             self.log_writer.log(
                 self.log_file,
-                f"Initialized {imputer.__class__.__name__}",
+                f"Fitted {imputer.__class__.__name__} on {len(data)} rows",
             )
 
-            self.new_array = imputer.fit_transform(self.data)
+            self.log_writer.start_log(
+                "exit",
+                self.class_name,
+                method_name,
+                self.log_file,
+            )
+
+            return imputer
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e,
+                self.class_name,
+                method_name,
+                self.log_file,
+            )
+
+    def impute_missing_values(self, data, imputer=None):
+        """
+        Method Name : impute_missing_values
+        Description : This method replaces all the missing values in the dataframe using KNN Imputer.
+                      If an already fitted imputer is given, it is only used for transforming the data.
+                      For a Feature_Matrix the imputed values are written back into its buffer, and without
+                      an imputer one is fitted on the reference sample, as for the preprocessing bundle.
+
+        Output      : A dataframe which has all the missing values imputed.
+        On Failure  : Raise Exception
+
+        Written By  : iNeuron Intelligence
+        Version     : 1.2
+        Revisions   : moved setup to cloud
+        """
+        method_name = self.impute_missing_values.__name__
+
+        self.log_writer.start_log(
+            "start",
+            self.class_name,
+            method_name,
+            self.log_file,
+        )
+
+        self.data = data
+
+        try:
+            if isinstance(self.data, Feature_Matrix):
+                if imputer is None:
+                    imputer = self.fit_imputer(
+                        self.data, sample_size=self.knn_reference_sample_size
+                    )
+
+                self.data.impute(imputer)
+
+                self.log_writer.log(
+                    self.log_file,
+                    "Imputed missing values in place using KNN imputer",
+                )
+
+                self.log_writer.start_log(
+                    "exit",
+                    self.class_name,
+                    method_name,
+                    self.log_file,
+                )
+
+                return self.data
+
+            if imputer is None:
+                imputer = KNNImputer(
+                    n_neighbors=self.knn_n_neighbors,
+                    weights=self.knn_weights,
+                    missing_values=np.nan,
+                )
+
+                self.log_writer.log(
+                    self.log_file,
+                    f"Initialized {imputer.__class__.__name__}",
+                )
+
+                self.new_array = imputer.fit_transform(self.data)
+
+            else:
+                self.new_array = imputer.transform(self.data)
 
             self.log_writer.log(
                 self.log_file,
                 "Imputed missing values using KNN imputer",
             )
 
-            self.new_data = pd.dataframe(
-                data=(self.new_array), columns=self.data.columns
+            self.new_data = pd.DataFrame(
+                data=(self.new_array), columns=self.data.columns, index=self.data.index
             )
 
             self.log_writer.log(
@@ -463,10 +681,13 @@ class Preprocessor:
                 self.log_file,
             )
 
-    def get_columns_with_zero_std_deviation(self, data):
+    def get_columns_with_zero_std_deviation(self, data, profile=None):
         """
         Method Name :   get_columns_with_zero_std_deviation
-        Description :   This method finds out the columns which have a standard deviation of zero.
+        Description :   This method finds out the columns which have a standard deviation of zero,
+                        using the column profile of the data. A column has zero standard deviation when
+                        all of its values are equal, or when it has at most one value, since imputing
+                        the missing values of such a column makes it constant.
 
         Output      :   List of the columns with standard deviation of zero
         On Failure  :   Write an exception log and then raise an exception
@@ -484,16 +705,15 @@ class Preprocessor:
             self.log_file,
         )
 
-        self.columns = data.columns
+        try:
+            if profile is None:
+                profile = self.profile_columns(data)
 
-        self.data_n = data.describe()
+            non_null_count = len(data) - profile["missing values count"]
 
-        self.col_drop = []
+            is_constant = (non_null_count <= 1) | (profile["min"] == profile["max"])
 
-        try:
-            for x in self.columns:
-                if self.data_n[x]["std"] == 0:
-                    self.col_drop.append(x)
+            self.col_drop = list(profile.index[is_constant])
 
             self.log_writer.log(
                 self.log_file,
@@ -521,3 +741,158 @@ class Preprocessor:
                 method_name,
                 self.log_file,
             )
+
+    def save_preprocessing_bundle(
+        self, imputer, cols_drop, feature_order, model_dir, bucket
+    ):
+        """
+        Method Name :   save_preprocessing_bundle
+        Description :   This method saves the fitted imputer, the dropped columns and the feature order
+                        as a single preprocessing bundle in the model directory of s3 bucket
+
+        Output      :   A preprocessing bundle is saved to s3 bucket
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.save_preprocessing_bundle.__name__
+
+        self.log_writer.start_log(
+            "start",
+            self.class_name,
+            method_name,
+            self.log_file,
+        )
+
+        try:
+            bundle = {
+                "imputer": imputer,
+                "cols_drop": list(cols_drop),
+                "feature_order": list(feature_order),
+            }
+
+            self.s3.upload_pickle(
+                bundle,
+                model_dir + self.preprocessing_bundle_file,
+                bucket,
+                self.log_file,
+            )
+
+            self.log_writer.log(
+                self.log_file,
+                f"Saved preprocessing bundle to {model_dir} folder in {bucket} bucket",
+            )
+
+            self.log_writer.start_log(
+                "exit",
+                self.class_name,
+                method_name,
+                self.log_file,
+            )
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e,
+                self.class_name,
+                method_name,
+                self.log_file,
+            )
+
+    def load_preprocessing_bundle(self, model_dir, bucket):
+        """
+        Method Name :   load_preprocessing_bundle
+        Description :   This method loads the preprocessing bundle from the model directory of s3 bucket
+
+        Output      :   A dictionary with the fitted imputer, dropped columns and feature order
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.load_preprocessing_bundle.__name__
+
+        self.log_writer.start_log(
+            "start",
+            self.class_name,
+            method_name,
+            self.log_file,
+        )
+
+        try:
+            bundle = self.s3.read_pickle(
+                model_dir + self.preprocessing_bundle_file, bucket, self.log_file
+            )
+
+            self.log_writer.log(
+                self.log_file,
+                f"Loaded preprocessing bundle from {model_dir} folder in {bucket} bucket",
+            )
+
+            self.log_writer.start_log(
+                "exit",
+                self.class_name,
+                method_name,
+                self.log_file,
+            )
+
+            return bundle
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e,
+                self.class_name,
+                method_name,
+                self.log_file,
+            )
+
+    def apply_preprocessing_bundle(self, data, bundle):
+        """
+        Method Name :   apply_preprocessing_bundle
+        Description :   This method applies the preprocessing fitted during training on the data,
+                        by dropping the stored columns and only transforming it with the stored imputer
+
+        Output      :   A dataframe with features in the same order as used in training
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.apply_preprocessing_bundle.__name__
+
+        self.log_writer.start_log(
+            "start",
+            self.class_name,
+            method_name,
+            self.log_file,
+        )
+
+        try:
+            data = data[bundle["feature_order"]]
+
+            data = self.remove_columns(data, bundle["cols_drop"])
+
+            if data.isna().values.any():
+                data = self.impute_missing_values(data, imputer=bundle["imputer"])
+
+            self.log_writer.log(
+                self.log_file,
+                "Applied preprocessing bundle on the data",
+            )
+
+            self.log_writer.start_log(
+                "exit",
+                self.class_name,
+                method_name,
+                self.log_file,
+            )
+
+            return data
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e,
+                self.class_name,
+                method_name,
+                self.log_file,
+            )
@@ -1,10 +1,15 @@
 import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
 import mlflow
+import pandas as pd
 from climate.s3_bucket_operations.s3_operations import S3_Operation
+from mlflow.entities import Metric, Param, RunTag
 from mlflow.tracking import MlflowClient
 from utils.logger import App_Logger
-from utils.model_utils import Model_Utils
 from utils.read_params import read_params
 
 
@@ -12,10 +17,24 @@ class MLFlow_Operation:
     """
     Description :    This class shall be used for handling all the mlflow operations
 
+                     The tracking uri, the experiment ids and the mlflow client are resolved once per process
+                     and shared by all the instances. So is the queue of model artifacts, which are serialized,
+                     uploaded and registered by background workers until wait_for_artifacts is called.
+
     Version     :   1.2
     Revisions   :   Moved to setup to cloud
     """
 
+    tracking_uri = None
+
+    experiment_ids = {}
+
+    client = None
+
+    artifact_executor = None
+
+    artifact_futures = []
+
     def __init__(self, log_file):
         self.config = read_params()
 
@@ -23,8 +42,6 @@ class MLFlow_Operation:
 
         self.log_writer = App_Logger()
 
-        self.model_utils = Model_Utils()
-
         self.s3 = S3_Operation()
 
         self.log_file = log_file
@@ -39,6 +56,22 @@ class MLFlow_Operation:
 
         self.model_save_format = self.config["model_utils"]["save_format"]
 
+        self.tracking_mode = self.config["mlflow_config"]["tracking"]["mode"]
+
+        self.local_tracking_uri = self.config["mlflow_config"]["tracking"]["local_uri"]
+
+        self.local_artifact_root = self.config["mlflow_config"]["tracking"][
+            "local_artifact_root"
+        ]
+
+        self.search_page_size = self.config["mlflow_config"]["search_page_size"]
+
+        self.async_artifacts = self.config["mlflow_config"]["async_artifacts"]
+
+        self.transition_workers = self.config["mlflow_config"]["transition_workers"]
+
+        self.artifact_workers = self.config["mlflow_config"]["artifact_workers"]
+
     def get_experiment_mlflow(self, exp_name):
         """
         Method Name :   get_experiment_mlflow
@@ -74,12 +107,18 @@ class MLFlow_Operation:
                 e, self.class_name, method_name, self.log_file
             )
 
-    def get_runs_mlflow(self, exp_id):
+    def get_runs_mlflow(
+        self, exp_id, filter_string="", tags=None, columns=None, max_results=None
+    ):
         """
         Method Name :   get_runs_mlflow
-        Description :   This method gets the runs from the mlflow server for a particular experiment id
+        Description :   This method gets the runs from the mlflow server for a particular experiment id.
+
+                        The runs are filtered on the server with the filter string and the tags, and fetched
+                        page by page until max_results runs are fetched. Only the given columns are kept, where
+                        a column ending with a dot, like metrics., keeps every column having it as prefix.
 
-        Output      :   A pandas series object consisting of runs for the particular experiment id
+        Output      :   A pandas dataframe consisting of runs for the particular experiment id
         On Failure  :   Write an exception log and then raise an exception
 
         Version     :   1.2
@@ -91,11 +130,65 @@ class MLFlow_Operation:
         self.log_writer.start_log("start", self.class_name, method_name, self.log_file)
 
         try:
-            runs = mlflow.search_runs(experiment_ids=exp_id)
+            self.set_mlflow_tracking_uri()
+
+            filters = [filter_string] if filter_string else []
+
+            filters.extend(
+                f"tags.{key} = '{value}'" for key, value in (tags or {}).items()
+            )
+
+            filter_string = " and ".join(filters)
+
+            rows, page_token = [], None
+
+            while max_results is None or len(rows) < max_results:
+                page_size = (
+                    self.search_page_size
+                    if max_results is None
+                    else min(self.search_page_size, max_results - len(rows))
+                )
+
+                page = MLFlow_Operation.client.search_runs(
+                    experiment_ids=[exp_id],
+                    filter_string=filter_string,
+                    max_results=page_size,
+                    page_token=page_token,
+                )
+
+                for run in page:
+                    row = {"run_id": run.info.run_id}
+
+                    row.update({"metrics." + k: v for k, v in run.data.metrics.items()})
+
+                    row.update({"params." + k: v for k, v in run.data.params.items()})
+
+                    row.update({"tags." + k: v for k, v in run.data.tags.items()})
+
+                    rows.append(row)
+
+                page_token = page.token
+
+                if not page_token:
+                    break
+
+            runs = pd.DataFrame(rows, columns=None if rows else ["run_id"])
+
+            if columns is not None:
+                runs = runs[
+                    [
+                        col
+                        for col in runs.columns
+                        if any(
+                            col.startswith(c) if c.endswith(".") else col == c
+                            for c in columns
+                        )
+                    ]
+                ]
 
             self.log_writer.log(
                 self.log_file,
-                f"Completed searching for runs in mlflow with experiment ids as {exp_id}",
+                f"Got {len(runs)} runs from mlflow with experiment id as {exp_id} and filter as {filter_string}",
             )
 
             self.log_writer.start_log(
@@ -114,7 +207,8 @@ class MLFlow_Operation:
         Method Name :   set_mlflow_experiment
         Description :   This method sets the mlflow experiment with the particular experiment name
 
-        Output      :   An experiment with experiment name will be created in mlflow server
+        Output      :   An experiment with experiment name will be created in mlflow server, and its id is returned.
+                        The experiment is only resolved once per process.
         On Failure  :   Write an exception log and then raise an exception
 
         Version     :   1.2
@@ -126,17 +220,35 @@ class MLFlow_Operation:
         self.log_writer.start_log("start", self.class_name, method_name, self.log_file)
 
         try:
-            mlflow.set_experiment(experiment_name=experiment_name)
+            if experiment_name not in MLFlow_Operation.experiment_ids:
+                if (
+                    self.tracking_mode == "local"
+                    and mlflow.get_experiment_by_name(name=experiment_name) is None
+                ):
+                    mlflow.create_experiment(
+                        experiment_name,
+                        artifact_location=Path(self.local_artifact_root)
+                        .resolve()
+                        .as_uri(),
+                    )
 
-            self.log_writer.log(
-                self.log_file,
-                f"Set mlflow experiment with name as {experiment_name}",
-            )
+                mlflow.set_experiment(experiment_name=experiment_name)
+
+                exp = mlflow.get_experiment_by_name(name=experiment_name)
+
+                MLFlow_Operation.experiment_ids[experiment_name] = exp.experiment_id
+
+                self.log_writer.log(
+                    self.log_file,
+                    f"Set mlflow experiment with name as {experiment_name}",
+                )
 
             self.log_writer.start_log(
                 "exit", self.class_name, method_name, self.log_file
             )
 
+            return MLFlow_Operation.experiment_ids[experiment_name]
+
         except Exception as e:
             self.log_writer.exception_log(
                 e, self.class_name, method_name, self.log_file
@@ -159,7 +271,7 @@ class MLFlow_Operation:
         self.log_writer.start_log("start", self.class_name, method_name, self.log_file)
 
         try:
-            client = MlflowClient(tracking_uri=server_uri)
+            client = MlflowClient(tracking_uri=server_uri, registry_uri=server_uri)
 
             self.log_writer.log(
                 self.log_file,
@@ -177,75 +289,90 @@ class MLFlow_Operation:
                 e, self.class_name, method_name, self.log_file
             )
 
-    def set_mlflow_tracking_uri(self):
+    def get_tracking_uri(self):
         """
-        Method Name :   set_mlflow_tracking_uri
-        Description :   This method sets the mlflow tracking uri in mlflow server
+        Method Name :   get_tracking_uri
+        Description :   This method resolves the mlflow tracking and registry uri. In local mode it is the sqlite
+                        uri from params.yaml, else the remote server uri from the environment. The models are
+                        registered on every run, and the file store has no model registry, so any other local
+                        uri is rejected.
 
-        Output      :   MLFLow server will set the particular uri to communicate with code
+        Output      :   The mlflow tracking uri
         On Failure  :   Write an exception log and then raise an exception
 
         Version     :   1.2
 
         Revisions   :   moved setup to cloud
         """
-        method_name = self.set_mlflow_tracking_uri.__name__
+        method_name = self.get_tracking_uri.__name__
 
         self.log_writer.start_log("start", self.class_name, method_name, self.log_file)
 
         try:
-            server_uri = os.environ["MLFLOW_TRACKING_URI"]
+            if self.tracking_mode == "local":
+                server_uri = self.local_tracking_uri
+
+                if not server_uri.startswith("sqlite:"):
+                    raise ValueError(
+                        f"Local mlflow tracking uri {server_uri} has no model registry, use a sqlite: uri"
+                    )
 
-            mlflow.set_tracking_uri(server_uri)
+            else:
+                server_uri = os.environ["MLFLOW_TRACKING_URI"]
 
             self.log_writer.log(
                 self.log_file,
-                "Set mlflow tracking uri",
+                f"Got mlflow tracking uri for {self.tracking_mode} mode",
             )
 
             self.log_writer.start_log(
                 "exit", self.class_name, method_name, self.log_file
             )
 
+            return server_uri
+
         except Exception as e:
             self.log_writer.exception_log(
                 e, self.class_name, method_name, self.log_file
             )
 
-    def get_mlflow_models(self):
+    def set_mlflow_tracking_uri(self):
         """
-        Method Name :   get_mlflow_models
-        Description :   This method gets the registered models in mlflow server
+        Method Name :   set_mlflow_tracking_uri
+        Description :   This method sets the mlflow tracking uri in mlflow server
 
-        Output      :   A list of registered model names stored in mlflow server
+        Output      :   MLFLow server will set the particular uri to communicate with code, only once per process
         On Failure  :   Write an exception log and then raise an exception
 
         Version     :   1.2
 
         Revisions   :   moved setup to cloud
         """
-        method_name = self.get_mlflow_models.__name__
+        method_name = self.set_mlflow_tracking_uri.__name__
 
         self.log_writer.start_log("start", self.class_name, method_name, self.log_file)
 
         try:
-            remote_server_uri = os.environ["MLFLOW_TRACKING_URI"]
+            if MLFlow_Operation.tracking_uri is None:
+                server_uri = self.get_tracking_uri()
 
-            client = self.get_mlflow_client(server_uri=remote_server_uri)
+                mlflow.set_tracking_uri(server_uri)
 
-            reg_model_names = [rm.name for rm in client.list_registered_models()]
+                mlflow.set_registry_uri(server_uri)
 
-            self.log_writer.log(
-                self.log_file,
-                "Got registered models from mlflow",
-            )
+                MLFlow_Operation.tracking_uri = server_uri
+
+                MLFlow_Operation.client = self.get_mlflow_client(server_uri=server_uri)
+
+                self.log_writer.log(
+                    self.log_file,
+                    "Set mlflow tracking uri",
+                )
 
             self.log_writer.start_log(
                 "exit", self.class_name, method_name, self.log_file
             )
 
-            return reg_model_names
-
         except Exception as e:
             self.log_writer.exception_log(
                 e, self.class_name, method_name, self.log_file
@@ -268,9 +395,9 @@ class MLFlow_Operation:
         self.log_writer.start_log("start", self.class_name, method_name, self.log_file)
 
         try:
-            remote_server_uri = os.environ["MLFLOW_TRACKING_URI"]
+            self.set_mlflow_tracking_uri()
 
-            client = self.get_mlflow_client(server_uri=remote_server_uri)
+            client = MLFlow_Operation.client
 
             results = client.search_registered_models(order_by=[f"name {order}"])
 
@@ -328,30 +455,42 @@ class MLFlow_Operation:
                 e, self.class_name, method_name, self.log_file
             )
 
-    def log_metric(self, model_name, metric):
+    def save_and_register_model(self, model, model_name, run_id):
         """
-        Method Name :   log_metric
-        Description :   This method logs the model metric to mlflow server
+        Method Name :   save_and_register_model
+        Description :   This method serializes the model to a temporary folder, uploads it as an artifact of the run
+                        and registers it as a new version of the registered model
 
-        Output      :   A model metric is logged to mlflow server
+        Output      :   A model is logged to the run and registered in mlflow server
         On Failure  :   Write an exception log and then raise an exception
 
         Version     :   1.2
 
         Revisions   :   moved setup to cloud
         """
-        method_name = self.log_metric.__name__
+        method_name = self.save_and_register_model.__name__
 
         self.log_writer.start_log("start", self.class_name, method_name, self.log_file)
 
         try:
-            model_score_name = f"{model_name}-best_score"
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                local_path = os.path.join(tmp_dir, model_name)
 
-            mlflow.log_metric(model_score_name, value=metric)
+                mlflow.sklearn.save_model(
+                    sk_model=model,
+                    path=local_path,
+                    serialization_format=self.mlflow_save_format,
+                )
+
+                MLFlow_Operation.client.log_artifacts(
+                    run_id, local_path, artifact_path=model_name
+                )
+
+            mlflow.register_model(f"runs:/{run_id}/{model_name}", model_name)
 
             self.log_writer.log(
                 self.log_file,
-                f"{model_score_name} logged in mlflow",
+                f"Logged and registered {model_name} model in mlflow",
             )
 
             self.log_writer.start_log(
@@ -363,30 +502,38 @@ class MLFlow_Operation:
                 e, self.class_name, method_name, self.log_file
             )
 
-    def log_param(self, idx, model, model_name, param):
+    def log_model_async(self, model, model_name, run_id):
         """
-        Method Name :   log_param
-        Description :   This method logs the model param to mlflow server
+        Method Name :   log_model_async
+        Description :   This method queues the model to be logged and registered by a background worker,
+                        so that training does not wait for the upload
 
-        Output      :   A model param is logged to mlflow server
+        Output      :   A model is queued for logging to mlflow server
         On Failure  :   Write an exception log and then raise an exception
 
         Version     :   1.2
 
         Revisions   :   moved setup to cloud
         """
-        method_name = self.log_param.__name__
+        method_name = self.log_model_async.__name__
 
         self.log_writer.start_log("start", self.class_name, method_name, self.log_file)
 
         try:
-            model_param_name = model_name + str(idx) + f"-{param}"
+            if MLFlow_Operation.artifact_executor is None:
+                MLFlow_Operation.artifact_executor = ThreadPoolExecutor(
+                    max_workers=self.artifact_workers
+                )
 
-            mlflow.log_param(model_param_name, value=model.__dict__[param])
+            future = MLFlow_Operation.artifact_executor.submit(
+                self.save_and_register_model, model, model_name, run_id
+            )
+
+            MLFlow_Operation.artifact_futures.append(future)
 
             self.log_writer.log(
                 self.log_file,
-                f"{model_param_name} logged in mlflow",
+                f"Queued {model_name} model for logging in mlflow",
             )
 
             self.log_writer.start_log(
@@ -398,54 +545,69 @@ class MLFlow_Operation:
                 e, self.class_name, method_name, self.log_file
             )
 
-    def log_all_for_model(self, model, model_score, idx=None):
+    def wait_for_artifacts(self):
         """
-        Method Name :   log_all_for_model
-        Description :   This method logs model,model params and model score to mlflow server
+        Method Name :   wait_for_artifacts
+        Description :   This method waits until all the queued models are logged and registered in mlflow server
 
-        Output      :   Model,model parameters and model score are logged to mlflow server
+        Output      :   All the queued models are logged to mlflow server
         On Failure  :   Write an exception log and then raise an exception
 
         Version     :   1.2
 
         Revisions   :   moved setup to cloud
         """
-        method_name = self.log_all_for_model.__name__
+        method_name = self.wait_for_artifacts.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, self.log_file)
 
         try:
-            self.log_writer.start_log(
-                "start",
-                self.class_name,
-                method_name,
+            futures = MLFlow_Operation.artifact_futures
+
+            MLFlow_Operation.artifact_futures = []
+
+            for future in futures:
+                future.result()
+
+            self.log_writer.log(
                 self.log_file,
+                f"Logged {len(futures)} queued models in mlflow",
             )
 
-            base_model_name = model.__class__.__name__
+            self.log_writer.start_log(
+                "exit", self.class_name, method_name, self.log_file
+            )
 
-            if base_model_name is "KMeans":
-                self.log_model(model, base_model_name)
+        except Exception as e:
+            self.log_writer.exception_log(
+                e, self.class_name, method_name, self.log_file
+            )
 
-            else:
-                model_name = base_model_name + str(idx)
+    def log_batch(self, run_id, metrics=(), params=(), tags=()):
+        """
+        Method Name :   log_batch
+        Description :   This method logs the metrics, params and tags of a run to mlflow server in a single request
 
-                self.log_writer.log(
-                    self.log_file,
-                    f"Got the model name as {model_name}",
-                )
+        Output      :   Metrics, params and tags are logged to mlflow server
+        On Failure  :   Write an exception log and then raise an exception
 
-                model_params_list = list(self.config[model_name].keys())
+        Version     :   1.2
 
-                self.log_writer.log(
-                    self.log_file,
-                    f"Created a list of params based on {model_name}",
-                )
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.log_batch.__name__
 
-                for param in model_params_list:
-                    self.log_param(idx, model, model_name, param=param)
+        self.log_writer.start_log("start", self.class_name, method_name, self.log_file)
 
-                self.log_model(model, model_name)
+        try:
+            MLFlow_Operation.client.log_batch(
+                run_id, metrics=list(metrics), params=list(params), tags=list(tags)
+            )
 
-                self.log_metric(model_name, metric=float(model_score))
+            self.log_writer.log(
+                self.log_file,
+                f"Logged {len(metrics)} metrics, {len(params)} params and {len(tags)} tags in mlflow",
+            )
 
             self.log_writer.start_log(
                 "exit", self.class_name, method_name, self.log_file
@@ -456,102 +618,221 @@ class MLFlow_Operation:
                 e, self.class_name, method_name, self.log_file
             )
 
-    def transition_mlflow_model(self, model_version, stage, model_name, bucket):
+    def get_model_batch(self, model, model_score, idx=None):
         """
-        Method Name :   transition_mlflow_model
-        Description :   This method transitions mlflow model from one stage to other stage, and does the same in s3 bucket
+        Method Name :   get_model_batch
+        Description :   This method collects the params and the score of the model to be logged in a batch
 
-        Output      :   A mlflow model is transitioned from one stage to another, and same is reflected in s3 bucket
+        Output      :   A list of mlflow params and a list of mlflow metrics
         On Failure  :   Write an exception log and then raise an exception
 
         Version     :   1.2
 
         Revisions   :   moved setup to cloud
         """
-        method_name = self.transition_mlflow_model.__name__
+        method_name = self.get_model_batch.__name__
 
         self.log_writer.start_log("start", self.class_name, method_name, self.log_file)
 
         try:
-            remote_server_uri = os.environ["MLFLOW_TRACKING_URI"]
+            base_model_name = model.__class__.__name__
+
+            model_name = base_model_name + str(idx)
+
+            model_params = model.get_params()
 
-            current_version = model_version
+            params = [
+                Param(f"{model_name}-{param}", str(model_params[param]))
+                for param in self.config[base_model_name]
+            ]
+
+            metrics = [
+                Metric(
+                    f"{model_name}-best_score",
+                    float(model_score),
+                    int(time.time() * 1000),
+                    0,
+                )
+            ]
 
             self.log_writer.log(
                 self.log_file,
-                f"Got {current_version} as the current model version",
+                f"Collected params and metrics of {model_name} model",
             )
 
-            client = self.get_mlflow_client(server_uri=remote_server_uri)
+            self.log_writer.start_log(
+                "exit", self.class_name, method_name, self.log_file
+            )
+
+            return params, metrics
 
-            trained_model_file = (
-                self.trained_models_dir + "/" + model_name + self.model_save_format
+        except Exception as e:
+            self.log_writer.exception_log(
+                e, self.class_name, method_name, self.log_file
             )
 
-            stag_model_file = (
-                self.staged_models_dir + "/" + model_name + self.model_save_format
+    def log_all_for_models(self, lst, idx=None, kmeans=None, tags=None):
+        """
+        Method Name :   log_all_for_models
+        Description :   This method logs the models, their params and scores to the active mlflow run.
+                        The params, metrics and tags of all the models are sent in one batch, and the models
+                        are queued for the background workers when async artifacts are enabled.
+
+        Output      :   Models, model parameters and model scores are logged to mlflow server
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.log_all_for_models.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, self.log_file)
+
+        try:
+            params, metrics = [], []
+
+            for model, model_score in lst:
+                model_params, model_metrics = self.get_model_batch(
+                    model, model_score, idx=idx
+                )
+
+                params.extend(model_params)
+
+                metrics.extend(model_metrics)
+
+            run_tags = [RunTag(key, str(value)) for key, value in (tags or {}).items()]
+
+            run_id = mlflow.active_run().info.run_id
+
+            self.log_batch(run_id, metrics=metrics, params=params, tags=run_tags)
+
+            models = [(model, model.__class__.__name__ + str(idx)) for model, _ in lst]
+
+            if kmeans is not None:
+                models.append((kmeans, kmeans.__class__.__name__))
+
+            for model, model_name in models:
+                if self.async_artifacts is True:
+                    self.log_model_async(model, model_name, run_id)
+
+                else:
+                    self.log_model(model, model_name)
+
+            self.log_writer.start_log(
+                "exit", self.class_name, method_name, self.log_file
             )
 
-            prod_model_file = (
-                self.prod_models_dir + "/" + model_name + self.model_save_format
+        except Exception as e:
+            self.log_writer.exception_log(
+                e, self.class_name, method_name, self.log_file
             )
 
+    def transition_mlflow_models(
+        self, transitions, bucket, extra_copies=(), demotions=()
+    ):
+        """
+        Method Name :   transition_mlflow_models
+        Description :   This method transitions a planned list of mlflow models to their stages concurrently
+                        with the shared client, and then copies all their files from the trained models dir
+                        to the stage dirs in s3 bucket as one batch, together with the extra copies.
+
+                        The demotions are the earlier production versions moved to staging. Their files are
+                        moved from the production dir to the staging dir in the same batch, unless the staging
+                        dir gets a newer file of the same model, and are then deleted from the production dir
+                        unless a new version of the same model replaces them, so that the production dir
+                        keeps a single model for every cluster.
+
+        Output      :   The mlflow models are transitioned to their stages, and same is reflected in s3 bucket
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.transition_mlflow_models.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, self.log_file)
+
+        try:
+            self.set_mlflow_tracking_uri()
+
+            stage_dirs = {
+                "Production": self.prod_models_dir,
+                "Staging": self.staged_models_dir,
+            }
+
+            with ThreadPoolExecutor(max_workers=self.transition_workers) as executor:
+                futures = [
+                    executor.submit(
+                        MLFlow_Operation.client.transition_model_version_stage,
+                        name=model_name,
+                        version=model_version,
+                        stage=stage,
+                    )
+                    for model_name, model_version, stage in transitions
+                    + [
+                        (model_name, model_version, "Staging")
+                        for model_name, model_version in demotions
+                    ]
+                ]
+
+                for future in futures:
+                    future.result()
+
             self.log_writer.log(
                 self.log_file,
-                "Created trained,stag and prod model files",
+                f"Transitioned {len(transitions) + len(demotions)} models in mlflow",
             )
 
-            if stage == "Production":
-                self.log_writer.log(
-                    self.log_file,
-                    f"{stage} is selected for transition",
+            copies = [
+                (
+                    self.trained_models_dir + "/" + model_name + self.model_save_format,
+                    stage_dirs[stage] + "/" + model_name + self.model_save_format,
                 )
+                for model_name, _, stage in transitions
+            ]
 
-                client.transition_model_version_stage(
-                    name=model_name, version=current_version, stage=stage
-                )
+            batch_names = {model_name for model_name, _, _ in transitions}
 
-                self.log_writer.log(
-                    self.log_file,
-                    f"Transitioned {model_name} to {stage} in mlflow",
-                )
+            promoted_names = {
+                model_name
+                for model_name, _, stage in transitions
+                if stage == "Production"
+            }
 
-                self.s3.copy_data(
-                    trained_model_file,
-                    bucket,
-                    prod_model_file,
-                    bucket,
-                    self.log_file,
+            copies.extend(
+                (
+                    self.prod_models_dir + "/" + model_name + self.model_save_format,
+                    self.staged_models_dir + "/" + model_name + self.model_save_format,
                 )
+                for model_name, _ in demotions
+                if model_name not in batch_names
+            )
 
-            elif stage == "Staging":
-                self.log_writer.log(
-                    self.log_file,
-                    f"{stage} is selected for transition",
-                )
+            copies.extend(extra_copies)
 
-                client.transition_model_version_stage(
-                    name=model_name, version=current_version, stage=stage
-                )
+            copies = list(dict.fromkeys(copies))
 
-                self.log_writer.log(
-                    self.log_file,
-                    f"Transitioned {model_name} to {stage} in mlflow",
-                )
+            self.s3.copy_files(
+                copies, bucket, self.log_file, max_workers=self.transition_workers
+            )
 
-                self.s3.copy_data(
-                    trained_model_file,
-                    bucket,
-                    stag_model_file,
-                    bucket,
-                    self.log_file,
+            deletes = list(
+                dict.fromkeys(
+                    self.prod_models_dir + "/" + model_name + self.model_save_format
+                    for model_name, _ in demotions
+                    if model_name not in promoted_names
                 )
+            )
 
-            else:
-                self.log_writer.log(
-                    self.log_file,
-                    "Please select stage for model transition",
-                )
+            if len(deletes) > 0:
+                self.s3.delete_files(deletes, bucket, self.log_file)
+
+            self.log_writer.log(
+                self.log_file,
+                f"Copied {len(copies)} files and removed {len(deletes)} demoted files from production",
+            )
 
             self.log_writer.start_log(
                 "exit", self.class_name, method_name, self.log_file
@@ -0,0 +1,68 @@
+from io import BytesIO
+
+import numpy as np
+
+
+class Centroid_Assigner:
+    """
+    Description :   This class shall be used for assigning rows to their nearest KMeans centroid with NumPy only,
+                    so that the serving path needs neither sklearn nor the pickled KMeans model.
+
+                    The squared distance is expanded as ||x||^2 - 2x.c + ||c||^2. Since ||x||^2 is the same
+                    for every centroid of a row, only -2x.c + ||c||^2 is computed, in batches of rows.
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+
+    def __init__(self, centroids, batch_size=65536):
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float64)
+
+        self.centroids_t = np.ascontiguousarray(self.centroids.T)
+
+        self.sq_norms = np.einsum("ij,ij->i", self.centroids, self.centroids)
+
+        self.batch_size = batch_size
+
+    @classmethod
+    def from_bytes(cls, content, batch_size=65536):
+        return cls(np.load(BytesIO(content), allow_pickle=False), batch_size=batch_size)
+
+    @staticmethod
+    def to_bytes(centroids):
+        buffer = BytesIO()
+
+        np.save(buffer, np.asarray(centroids, dtype=np.float64), allow_pickle=False)
+
+        return buffer.getvalue()
+
+    @property
+    def n_clusters(self):
+        return self.centroids.shape[0]
+
+    def assign(self, data):
+        """
+        Method Name :   assign
+        Description :   This method assigns every row of the data, or a single row, to its nearest centroid
+
+        Output      :   An array of cluster numbers, one for every row
+        """
+        values = np.asarray(data, dtype=np.float64)
+
+        if values.ndim == 1:
+            values = values.reshape(1, -1)
+
+        labels = np.empty(values.shape[0], dtype=np.intp)
+
+        for start in range(0, values.shape[0], self.batch_size):
+            batch = values[start : start + self.batch_size]
+
+            dist = batch.dot(self.centroids_t)
+
+            dist *= -2
+
+            dist += self.sq_norms
+
+            labels[start : start + len(batch)] = dist.argmin(axis=1)
+
+        return labels
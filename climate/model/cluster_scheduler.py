@@ -0,0 +1,159 @@
+import os
+
+from climate.model_finder.tuner import Model_Finder
+from utils.logger import App_Logger
+from utils.model_utils import Model_Utils
+from utils.process_pool import get_process_pool
+from utils.read_params import read_params
+
+
+def train_cluster_models(idx, cluster_features, cluster_label, log_file, n_jobs):
+    """
+    Method Name :   train_cluster_models
+    Description :   This method trains the models of a single cluster inside a worker process
+
+    Output      :   The cluster number along with the list of trained models and their scores
+    """
+    model_finder = Model_Finder(log_file)
+
+    return idx, model_finder.train_models(
+        cluster_features, cluster_label, n_jobs=n_jobs
+    )
+
+
+def train_cluster_task(task):
+    return train_cluster_models(*task)
+
+
+class Cluster_Scheduler:
+    """
+    Description :   This class shall be used for training the models of all the clusters concurrently in a
+                    process pool. The cores are split between the clusters trained at the same time and the
+                    n_jobs of the hyperparameter search inside every cluster, so that both levels together
+                    do not oversubscribe the cores. Saving the models and logging to mlflow happen on the parent.
+
+                    The workers are spawned and not forked, with get_process_pool, since training runs inside
+                    the api server, whose threads and boto3 clients must not be copied into a child process.
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+
+    def __init__(self, log_file):
+        self.log_file = log_file
+
+        self.config = read_params()
+
+        self.max_workers = self.config["cluster_training"]["max_workers"]
+
+        self.model_utils = Model_Utils(log_file)
+
+        self.log_writer = App_Logger()
+
+        self.class_name = self.__class__.__name__
+
+    def get_worker_budget(self, n_clusters):
+        """
+        Method Name :   get_worker_budget
+        Description :   This method splits the cores between the cluster workers and the search inside every worker
+
+        Output      :   The number of cluster workers and the n_jobs for the search of every cluster
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.get_worker_budget.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, self.log_file)
+
+        try:
+            n_cores = os.cpu_count() or 1
+
+            max_workers = n_cores if self.max_workers == -1 else self.max_workers
+
+            n_workers = max(1, min(max_workers, n_clusters, n_cores))
+
+            n_jobs = max(1, n_cores // n_workers)
+
+            self.log_writer.log(
+                self.log_file,
+                f"Using {n_workers} cluster workers with n_jobs as {n_jobs} for {n_clusters} clusters",
+            )
+
+            self.log_writer.start_log(
+                "exit", self.class_name, method_name, self.log_file
+            )
+
+            return n_workers, n_jobs
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e, self.class_name, method_name, self.log_file
+            )
+
+    def train_clusters(self, X, kmeans_model, tags=None):
+        """
+        Method Name :   train_clusters
+        Description :   This method trains the models of every cluster in a process pool, and saves and logs
+                        the trained models on the parent as soon as every cluster finishes. The kmeans
+                        model is logged once for the whole batch
+
+        Output      :   The models of all the clusters are trained, saved to s3 bucket and logged to mlflow
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.train_clusters.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, self.log_file)
+
+        try:
+            list_of_clusters = X["Cluster"].unique()
+
+            n_workers, n_jobs = self.get_worker_budget(len(list_of_clusters))
+
+            # the kmeans model is shared by all the clusters, so it is logged once for the batch
+            self.model_utils.log_kmeans_model(kmeans_model, self.log_file, tags=tags)
+
+            tasks = [
+                (
+                    i,
+                    X[X["Cluster"] == i].drop(["Labels", "Cluster"], axis=1),
+                    X.loc[X["Cluster"] == i, "Labels"],
+                    self.log_file,
+                    n_jobs,
+                )
+                for i in list_of_clusters
+            ]
+
+            with get_process_pool(n_workers) as pool:
+                results = pool.imap_unordered(train_cluster_task, tasks)
+
+                self.log_writer.log(
+                    self.log_file,
+                    f"Submitted {len(tasks)} clusters for training",
+                )
+
+                for idx, lst in results:
+                    self.model_utils.save_and_log_models(
+                        lst, self.log_file, idx=idx, tags=tags
+                    )
+
+                pool.close()
+
+                pool.join()
+
+            self.log_writer.log(
+                self.log_file, "Trained, saved and logged models of all the clusters"
+            )
+
+            self.log_writer.start_log(
+                "exit", self.class_name, method_name, self.log_file
+            )
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e, self.class_name, method_name, self.log_file
+            )
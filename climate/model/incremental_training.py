@@ -0,0 +1,276 @@
+import numpy as np
+from climate.model.cluster_assigner import Centroid_Assigner
+from climate.s3_bucket_operations.s3_operations import S3_Operation
+from sklearn.model_selection import train_test_split
+from utils.logger import App_Logger
+from utils.model_utils import Model_Utils
+from utils.read_params import read_params
+
+
+class Incremental_Trainer:
+    """
+    Description :   This class shall be used for retraining the production models of the clusters on new data,
+                    instead of building them from nothing.
+
+                    The new data is assigned to the production centroids. A cluster is retrained only when the
+                    mean of its new rows has drifted from its centroid, which is the mean of its training rows,
+                    by more than the drift threshold, measured in standard deviations of the new rows.
+                    RandomForest models get extra trees through warm_start, and XGBoost models get extra
+                    boosting rounds on top of the production booster.
+
+                    Only the retrained clusters get a run in the training batch, and they are kept in
+                    retrained_clusters. The other clusters keep their production models, and when no cluster
+                    has drifted there is nothing to promote.
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+
+    def __init__(self, log_file):
+        self.log_file = log_file
+
+        self.config = read_params()
+
+        self.model_bucket = self.config["s3_bucket"]["climate_model_bucket"]
+
+        self.prod_model_dir = self.config["models_dir"]["prod"]
+
+        self.centroids_file = self.config["kmeans_cluster"]["centroids_file"]
+
+        self.manifest_file = self.config["production_manifest"]["file"]
+
+        self.drift_threshold = self.config["incremental_training"]["drift_threshold"]
+
+        self.extra_trees = self.config["incremental_training"]["extra_trees"]
+
+        self.extra_rounds = self.config["incremental_training"]["extra_rounds"]
+
+        self.split_kwargs = {
+            "test_size": self.config["base"]["test_size"],
+            "random_state": self.config["base"]["random_state"],
+        }
+
+        self.s3 = S3_Operation()
+
+        self.model_utils = Model_Utils(log_file)
+
+        self.retrained_clusters = []
+
+        self.log_writer = App_Logger()
+
+        self.class_name = self.__class__.__name__
+
+    def get_cluster_drift(self, X, clusters, centroids):
+        """
+        Method Name :   get_cluster_drift
+        Description :   This method measures, for every cluster, the root mean square over the features of the
+                        shift between the mean of the new rows and the centroid, in standard deviations of the new rows
+
+        Output      :   A dict of cluster number and drift
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.get_cluster_drift.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, self.log_file)
+
+        try:
+            values = np.asarray(X, dtype=np.float64)
+
+            drift = {}
+
+            for i in np.unique(clusters):
+                cluster_values = values[clusters == i]
+
+                std = cluster_values.std(axis=0)
+
+                shift = (cluster_values.mean(axis=0) - centroids[i]) / np.where(
+                    std > 0, std, 1.0
+                )
+
+                drift[int(i)] = float(np.sqrt(np.mean(shift**2)))
+
+            self.log_writer.log(self.log_file, f"Got cluster drift as {drift}")
+
+            self.log_writer.start_log(
+                "exit", self.class_name, method_name, self.log_file
+            )
+
+            return drift
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e, self.class_name, method_name, self.log_file
+            )
+
+    def load_production_model(self, idx, manifest):
+        """
+        Method Name :   load_production_model
+        Description :   This method loads the production model of the cluster, whose key is looked up in the
+                        production manifest, since the production folder also keeps the files of demoted models
+
+        Output      :   The production model of the cluster
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.load_production_model.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, self.log_file)
+
+        try:
+            model_key = manifest["clusters"][str(idx)]["model_key"]
+
+            model = self.s3.read_pickle(model_key, self.model_bucket, self.log_file)
+
+            self.log_writer.log(
+                self.log_file,
+                f"Loaded {model_key} as production model of cluster {idx}",
+            )
+
+            self.log_writer.start_log(
+                "exit", self.class_name, method_name, self.log_file
+            )
+
+            return model
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e, self.class_name, method_name, self.log_file
+            )
+
+    def continue_training(self, model, x_train, y_train):
+        """
+        Method Name :   continue_training
+        Description :   This method continues the training of the production model on the new data, with extra
+                        trees for RandomForest and extra boosting rounds for XGBoost
+
+        Output      :   The retrained model
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.continue_training.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, self.log_file)
+
+        try:
+            model_name = model.__class__.__name__
+
+            if model_name == "XGBRegressor":
+                booster = model.get_booster()
+
+                model = model.__class__(**model.get_params())
+
+                model.set_params(n_estimators=self.extra_rounds)
+
+                model.fit(x_train, y_train, xgb_model=booster)
+
+            else:
+                model.set_params(
+                    warm_start=True, n_estimators=model.n_estimators + self.extra_trees
+                )
+
+                model.fit(x_train, y_train)
+
+            self.log_writer.log(
+                self.log_file, f"Continued training of {model_name} model on new data"
+            )
+
+            self.log_writer.start_log(
+                "exit", self.class_name, method_name, self.log_file
+            )
+
+            return model
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e, self.class_name, method_name, self.log_file
+            )
+
+    def train_clusters(self, X, Y, tags=None):
+        """
+        Method Name :   train_clusters
+        Description :   This method retrains the production models of the clusters whose new data has drifted,
+                        and saves and logs them like the models of a full training. The retrained clusters are
+                        kept in retrained_clusters.
+
+        Output      :   The number of clusters of the production centroids
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.train_clusters.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, self.log_file)
+
+        try:
+            content = self.s3.read_bytes(
+                self.prod_model_dir + self.centroids_file,
+                self.model_bucket,
+                self.log_file,
+            )
+
+            cluster_assigner = Centroid_Assigner.from_bytes(content)
+
+            clusters = cluster_assigner.assign(X)
+
+            drift = self.get_cluster_drift(X, clusters, cluster_assigner.centroids)
+
+            manifest = self.s3.read_json(
+                self.prod_model_dir + self.manifest_file,
+                self.model_bucket,
+                self.log_file,
+            )
+
+            self.retrained_clusters = []
+
+            for i, cluster_drift in drift.items():
+                if cluster_drift < self.drift_threshold:
+                    self.log_writer.log(
+                        self.log_file,
+                        f"Skipped cluster {i} with drift {cluster_drift} below {self.drift_threshold}",
+                    )
+
+                    continue
+
+                cluster_mask = clusters == i
+
+                x_train, x_test, y_train, y_test = train_test_split(
+                    X[cluster_mask], Y[cluster_mask], **self.split_kwargs
+                )
+
+                model = self.load_production_model(i, manifest)
+
+                model = self.continue_training(model, x_train, y_train)
+
+                model_score = self.model_utils.get_model_score(
+                    model, x_test, y_test, self.log_file
+                )
+
+                self.model_utils.save_and_log_models(
+                    [(model, model_score)], self.log_file, idx=i, tags=tags
+                )
+
+                self.retrained_clusters.append(i)
+
+            self.log_writer.log(
+                self.log_file,
+                f"Retrained production models of the drifted clusters {self.retrained_clusters}",
+            )
+
+            self.log_writer.start_log(
+                "exit", self.class_name, method_name, self.log_file
+            )
+
+            return cluster_assigner.n_clusters
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e, self.class_name, method_name, self.log_file
+            )
@@ -1,3 +1,8 @@
+import json
+import re
+from datetime import datetime
+
+import pandas as pd
 from climate.mlflow_utils.mlflow_operations import MLFlow_Operation
 from climate.s3_bucket_operations.s3_operations import S3_Operation
 from utils.logger import App_Logger
@@ -12,7 +17,7 @@ class Load_Prod_Model:
     Revisions   :   Moved to setup to cloud
     """
 
-    def __init__(self, num_clusters):
+    def __init__(self, num_clusters, training_batch_id=None):
         self.log_writer = App_Logger()
 
         self.config = read_params()
@@ -21,9 +26,13 @@ class Load_Prod_Model:
 
         self.num_clusters = num_clusters
 
-        self.model_bucket = self.config["s3_bucket"]["climate_model"]
+        self.training_batch_id = training_batch_id
+
+        self.model_bucket = self.config["s3_bucket"]["climate_model_bucket"]
 
-        self.load_prod_model_log = self.config["train_db_log"]["Load_Prod_Model"]
+        self.load_prod_model_log = self.config["train_db_log"]["load_prod_model"]
+
+        self.trained_model_dir = self.config["models_dir"]["trained"]
 
         self.prod_model_dir = self.config["models_dir"]["prod"]
 
@@ -31,6 +40,16 @@ class Load_Prod_Model:
 
         self.exp_name = self.config["mlflow_config"]["experiment_name"]
 
+        self.preprocessing_bundle_file = self.config["preprocessing_bundle_file"]
+
+        self.centroids_file = self.config["kmeans_cluster"]["centroids_file"]
+
+        self.save_format = self.config["model_utils"]["save_format"]
+
+        self.manifest_file = self.config["production_manifest"]["file"]
+
+        self.manifest_history_dir = self.config["production_manifest"]["history_dir"]
+
         self.s3 = S3_Operation()
 
         self.mlflow_op = MLFlow_Operation(self.load_prod_model_log)
@@ -84,19 +103,23 @@ class Load_Prod_Model:
                 log_file,
             )
 
-    def load_production_model(self):
+    def get_model_scores(self, runs, results):
         """
-        Method Name :   load_production_model
-        Description :   This method is responsible for finding the best model based on metrics and then transitioned them to thier stages
+        Method Name :   get_model_scores
+        Description :   This method creates a tidy frame with one row for every model logged in the runs, by melting
+                        the best score metrics of the runs and joining them with the latest registered versions
 
-        Output      :   The best models are put in production and rest are put in staging
+                        Eg- metrics.XGBRegressor1-best_score of a run becomes a row with cluster as 1, model_family
+                        as XGBRegressor, model_name as XGBRegressor1, the score, the run id and the model version
+
+        Output      :   A dataframe with cluster, model_family, model_name, score, run_id and version as columns
         On Failure  :   Write an exception log and then raise an exception
 
         Version     :   1.2
 
         Revisions   :   moved setup to cloud
         """
-        method_name = self.load_production_model.__name__
+        method_name = self.get_model_scores.__name__
 
         self.log_writer.start_log(
             "start",
@@ -106,152 +129,473 @@ class Load_Prod_Model:
         )
 
         try:
-            self.create_folders_for_prod_and_stag(
-                self.model_bucket, self.load_prod_model_log
+            score_pattern = (
+                r"^metrics\.(?P<model_family>[A-Za-z]+)(?P<cluster>\d+)-best_score$"
             )
 
-            self.mlflow_op.set_mlflow_tracking_uri()
-
-            exp = self.mlflow_op.get_experiment_mlflow(exp_name=self.exp_name)
+            score_cols = runs.columns[runs.columns.str.match(score_pattern)]
 
-            runs = self.mlflow_op.get_runs_mlflow(exp_id=exp.experiment_id)
+            scores = runs.melt(
+                id_vars=["run_id"],
+                value_vars=score_cols,
+                var_name="metric",
+                value_name="score",
+            ).dropna(subset=["score"])
 
-            """
-            Code Explaination: 
-            num_clusters - Dynamically allocated based on the number of clusters created using elbow plot
+            parts = scores["metric"].str.extract(score_pattern)
 
-            Here, we are trying to iterate over the number of clusters and then dynamically create the cols 
-            where in the best model names can be found, and then copied to production or staging depending on
-            the condition
+            scores = scores.assign(
+                model_family=parts["model_family"],
+                model_name=parts["model_family"] + parts["cluster"],
+                cluster=parts["cluster"].astype(int),
+            )
 
-            Eg- metrics.XGBoost1-best_score
-            """
-            reg_model_names = self.mlflow_op.get_mlflow_models()
+            versions = pd.DataFrame(
+                [
+                    (mv.name, mv.run_id, mv.version)
+                    for res in results
+                    for mv in res.latest_versions
+                ],
+                columns=["model_name", "run_id", "version"],
+            )
 
-            cols = [
-                "metrics." + str(model) + "-best_score"
-                for model in reg_model_names
-                if model != "KMeans"
-            ]
+            model_scores = scores.merge(
+                versions, on=["model_name", "run_id"], how="inner"
+            )[["cluster", "model_family", "model_name", "score", "run_id", "version"]]
 
             self.log_writer.log(
                 self.load_prod_model_log,
-                "Created cols for all registered model",
+                f"Got scores of {len(model_scores)} models from {len(runs)} runs",
+            )
+
+            self.log_writer.start_log(
+                "exit",
+                self.class_name,
+                method_name,
+                self.load_prod_model_log,
             )
 
-            runs_cols = runs[cols].min().sort_values(ascending=False)
+            return model_scores
 
-            self.log_writer.log(
+        except Exception as e:
+            self.log_writer.exception_log(
+                e,
+                self.class_name,
+                method_name,
                 self.load_prod_model_log,
-                "Sorted the runs cols in descending order",
             )
 
-            metrics_dict = runs_cols.dict()
+    def get_champions(self, model_scores):
+        """
+        Method Name :   get_champions
+        Description :   This method picks the model with the highest score of every cluster
+
+        Output      :   A dataframe with one row for the best model of every cluster
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.get_champions.__name__
+
+        self.log_writer.start_log(
+            "start",
+            self.class_name,
+            method_name,
+            self.load_prod_model_log,
+        )
+
+        try:
+            champions = model_scores.loc[
+                model_scores.groupby("cluster")["score"].idxmax()
+            ]
 
             self.log_writer.log(
                 self.load_prod_model_log,
-                "Converted runs cols to dict",
-            )
-
-            """ 
-            Eg-output: For 3 clusters, 
-            
-            [
-                metrics.XGBoost0-best_score,
-                metrics.XGBoost1-best_score,
-                metrics.XGBoost2-best_score,
-                metrics.RandomForest0-best_score,
-                metrics.RandomForest1-best_score,
-                metrics.RandomForest2-best_score
-            ] 
-
-            Eg- runs_dataframe: I am only showing for 3 cols,actual runs dataframe will be different
-                                based on the number of clusters
-                
-                since for every run cluster values changes, rest two cols will be left as blank,
-                so only we are taking the min value of each col, which is nothing but the value of the metric
-                
-
-run_number  metrics.XGBoost0-best_score metrics.RandomForest1-best_score metrics.XGBoost1-best_score
-    0                   1                       0.5
-    1                                                                                   1                 
-    2                                                                           
-            """
-
-            best_metrics_names = [
-                min(
-                    [
-                        (file, metrics_dict[file])[0]
-                        for file in metrics_dict
-                        if str(i) in file
-                    ]
+                f"Got {list(champions['model_name'])} as best models of {len(champions)} clusters",
+            )
+
+            self.log_writer.start_log(
+                "exit",
+                self.class_name,
+                method_name,
+                self.load_prod_model_log,
+            )
+
+            return champions
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e,
+                self.class_name,
+                method_name,
+                self.load_prod_model_log,
+            )
+
+    def plan_transitions(self, results, batch_run_ids, champions):
+        """
+        Method Name :   plan_transitions
+        Description :   This method plans the stage of the latest registered versions logged by the runs of the
+                        batch. The best model of every cluster and the kmeans model go to production and the rest
+                        to staging. A production version of an earlier batch is moved to staging only when the
+                        batch brings a new production version for its cluster, else it is carried forward.
+
+                        Eg- after an incremental run which retrained only cluster 1, the production models of the
+                        other clusters stay in production and are carried forward
+
+        Output      :   A list of (model name, version, stage) transitions of the batch, a list of (model name, version)
+                        demotions of earlier production versions and the sorted carried forward clusters
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.plan_transitions.__name__
+
+        self.log_writer.start_log(
+            "start",
+            self.class_name,
+            method_name,
+            self.load_prod_model_log,
+        )
+
+        try:
+            top_mn_lst = set(champions["model_name"])
+
+            latest_versions = [mv for res in results for mv in res.latest_versions]
+
+            batch_versions = [
+                mv for mv in latest_versions if mv.run_id in batch_run_ids
+            ]
+
+            ## every cluster is a slot of its own, and so is the kmeans model
+            get_slot = lambda name: re.sub(r"^[A-Za-z]+(\d+)$", r"\1", name)
+
+            promoted_slots = {
+                get_slot(mv.name)
+                for mv in batch_versions
+                if mv.name in top_mn_lst or mv.name == "KMeans"
+            }
+
+            transitions = [
+                (
+                    mv.name,
+                    mv.version,
+                    (
+                        "Production"
+                        if mv.name in top_mn_lst or mv.name == "KMeans"
+                        else "Staging"
+                    ),
                 )
-                for i in range(0, self.num_clusters)
+                for mv in batch_versions
+            ]
+
+            prod_versions = [
+                mv
+                for mv in latest_versions
+                if mv.current_stage == "Production" and mv.run_id not in batch_run_ids
+            ]
+
+            demotions = [
+                (mv.name, mv.version)
+                for mv in prod_versions
+                if get_slot(mv.name) in promoted_slots
+            ]
+
+            carried_clusters = sorted(
+                {
+                    int(get_slot(mv.name))
+                    for mv in prod_versions
+                    if get_slot(mv.name).isdigit()
+                    and get_slot(mv.name) not in promoted_slots
+                }
+            )
+
+            covered_clusters = set(champions["cluster"]) | set(carried_clusters)
+
+            missing_clusters = [
+                idx for idx in range(self.num_clusters) if idx not in covered_clusters
             ]
 
+            if missing_clusters:
+                raise ValueError(
+                    f"No production model for clusters {missing_clusters} out of {self.num_clusters} clusters"
+                )
+
             self.log_writer.log(
                 self.load_prod_model_log,
-                f"Got top model names based on the metrics of clusters",
+                f"Planned transitions of {len(transitions)} models, demotions of {len(demotions)} models "
+                f"and carried forward clusters {carried_clusters}",
             )
 
-            ## best_metrics will store the value of metrics, but we want the names of the models,
-            ## so best_metrics.index will return the name of the metric as registered in mlflow
+            self.log_writer.start_log(
+                "exit",
+                self.class_name,
+                method_name,
+                self.load_prod_model_log,
+            )
 
-            ## Eg. metrics.XGBoost1-best_score
+            return transitions, demotions, carried_clusters
 
-            ## top_mn_lst - will store the top 3 model names
+        except Exception as e:
+            self.log_writer.exception_log(
+                e,
+                self.class_name,
+                method_name,
+                self.load_prod_model_log,
+            )
+
+    def write_production_manifest(self, champions):
+        """
+        Method Name :   write_production_manifest
+        Description :   This method writes the production manifest, which maps every cluster to the key, ETag,
+                        model family and registered version of its production model, along with the feature order
+                        and the keys and ETags of the preprocessing bundle and the centroids.
+
+                        The clusters without a champion in the batch keep their entries of the previous manifest,
+                        and the manifest is not written unless every cluster has a model in the production dir.
+
+                        The manifest is written under the manifest history dir with the deployment version as
+                        name, and then as the current manifest of the production dir.
+
+        Output      :   The production manifest
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.write_production_manifest.__name__
+
+        self.log_writer.start_log(
+            "start",
+            self.class_name,
+            method_name,
+            self.load_prod_model_log,
+        )
+
+        try:
+            etags = self.s3.list_objects(
+                self.prod_model_dir, self.model_bucket, self.load_prod_model_log
+            )
+
+            bundle_key = self.prod_model_dir + self.preprocessing_bundle_file
+
+            centroids_key = self.prod_model_dir + self.centroids_file
+
+            bundle = self.s3.read_pickle(
+                bundle_key, self.model_bucket, self.load_prod_model_log
+            )
+
+            version = self.training_batch_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+
+            manifest_key = self.prod_model_dir + self.manifest_file
 
-            top_mn_lst = [mn.split(".")[1].split("-")[0] for mn in best_metrics_names]
+            clusters = {}
+
+            ## the clusters which had no run in the batch keep the entries of the previous manifest
+            if (
+                self.s3.get_object_etag(
+                    manifest_key, self.model_bucket, self.load_prod_model_log
+                )
+                is not None
+            ):
+                prev_manifest = self.s3.read_json(
+                    manifest_key, self.model_bucket, self.load_prod_model_log
+                )
+
+                clusters = {
+                    cluster: dict(entry, etag=etags.get(entry["model_key"]))
+                    for cluster, entry in prev_manifest["clusters"].items()
+                    if int(cluster) < self.num_clusters
+                }
+
+            for champion in champions.itertuples(index=False):
+                model_key = (
+                    self.prod_model_dir + "/" + champion.model_name + self.save_format
+                )
+
+                clusters[str(champion.cluster)] = {
+                    "model_key": model_key,
+                    "etag": etags.get(model_key),
+                    "model_family": champion.model_family,
+                    "model_version": str(champion.version),
+                    "run_id": champion.run_id,
+                }
+
+            missing_clusters = [
+                idx
+                for idx in range(self.num_clusters)
+                if clusters.get(str(idx), {}).get("etag") is None
+            ]
+
+            if missing_clusters:
+                raise ValueError(
+                    f"No production model in {self.prod_model_dir} for clusters {missing_clusters}, manifest is not written"
+                )
+
+            manifest = {
+                "version": version,
+                "created_at": datetime.now().isoformat(),
+                "feature_order": [
+                    col
+                    for col in bundle["feature_order"]
+                    if col not in bundle["cols_drop"]
+                ],
+                "preprocessing_bundle": {
+                    "key": bundle_key,
+                    "etag": etags.get(bundle_key),
+                },
+                "centroids": {"key": centroids_key, "etag": etags.get(centroids_key)},
+                "clusters": clusters,
+            }
+
+            content = json.dumps(manifest, indent=2).encode()
+
+            self.s3.upload_bytes(
+                content,
+                self.manifest_history_dir + version + ".json",
+                self.model_bucket,
+                self.load_prod_model_log,
+            )
+
+            self.s3.upload_bytes(
+                content,
+                manifest_key,
+                self.model_bucket,
+                self.load_prod_model_log,
+            )
 
             self.log_writer.log(
                 self.load_prod_model_log,
-                f"Got the top model names",
+                f"Wrote production manifest {version} for {len(clusters)} clusters",
+            )
+
+            self.log_writer.start_log(
+                "exit",
+                self.class_name,
+                method_name,
+                self.load_prod_model_log,
+            )
+
+            return manifest
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e,
+                self.class_name,
+                method_name,
+                self.load_prod_model_log,
+            )
+
+    def load_production_model(self):
+        """
+        Method Name :   load_production_model
+        Description :   This method is responsible for finding the best model based on metrics and then transitioned them to thier stages.
+                        Only the runs of the current training batch are fetched, and the best model of every cluster
+                        is picked with a groupby over a tidy frame of the model scores. Clusters which have no run
+                        in the batch keep their production model. At the end the production manifest is written.
+
+        Output      :   The best models are put in production and rest are put in staging
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.load_production_model.__name__
+
+        self.log_writer.start_log(
+            "start",
+            self.class_name,
+            method_name,
+            self.load_prod_model_log,
+        )
+
+        try:
+            self.create_folders_for_prod_and_stag(
+                self.model_bucket, self.load_prod_model_log
+            )
+
+            self.mlflow_op.set_mlflow_tracking_uri()
+
+            # the models of the training are logged in the background,
+            # so wait for all of them to be registered before picking the best ones
+            self.mlflow_op.wait_for_artifacts()
+
+            exp = self.mlflow_op.get_experiment_mlflow(exp_name=self.exp_name)
+
+            if self.training_batch_id is not None:
+                batch_tags = {"training_batch_id": self.training_batch_id}
+
+            else:
+                batch_tags = None
+
+            runs = self.mlflow_op.get_runs_mlflow(
+                exp_id=exp.experiment_id,
+                tags=batch_tags,
+                columns=["run_id", "metrics."],
             )
 
             results = self.mlflow_op.search_mlflow_models(order="DESC")
 
-            ## results - This will store all the registered models in mlflow
-            ## Here we are iterating through all the registered model and for every latest registered model
-            ## we are checking if the model name is in the top 3 model list, if present we are putting that
-            ## model into production or staging
-
-            for res in results:
-                for mv in res.latest_versions:
-                    if mv.name in top_mn_lst:
-                        self.mlflow_op.transition_mlflow_model(
-                            mv.version,
-                            "Production",
-                            mv.name,
-                            self.model_bucket,
-                            self.model_bucket,
-                        )
-
-                    ## In the registered models, even kmeans model is present, so during Prediction,
-                    ## this model also needs to be in present in production, the code logic is present below
-
-                    elif mv.name == "KMeans":
-                        self.mlflow_op.transition_mlflow_model(
-                            mv.version,
-                            "Production",
-                            mv.name,
-                            self.model_bucket,
-                            self.model_bucket,
-                        )
-
-                    else:
-                        self.mlflow_op.transition_mlflow_model(
-                            mv.version,
-                            "Staging",
-                            mv.name,
-                            self.model_bucket,
-                            self.model_bucket,
-                        )
+            model_scores = self.get_model_scores(runs, results)
+
+            champions = self.get_champions(model_scores)
+
+            transitions, demotions, _ = self.plan_transitions(
+                results, set(runs["run_id"]), champions
+            )
+
+            if not transitions:
+                self.log_writer.log(
+                    self.load_prod_model_log,
+                    "No model of the batch to transition, production is left as it is",
+                )
+
+                self.log_writer.start_log(
+                    "exit",
+                    self.class_name,
+                    method_name,
+                    self.load_prod_model_log,
+                )
+
+                return
+
+            artifact_copies = [
+                (
+                    self.trained_model_dir + artifact_file,
+                    self.prod_model_dir + artifact_file,
+                )
+                for artifact_file in [
+                    self.preprocessing_bundle_file,
+                    self.centroids_file,
+                ]
+            ]
+
+            self.mlflow_op.transition_mlflow_models(
+                transitions,
+                self.model_bucket,
+                extra_copies=artifact_copies,
+                demotions=demotions,
+            )
 
             self.log_writer.log(
                 self.load_prod_model_log,
                 "Transitioning of models based on scores successfully done",
             )
 
+            self.log_writer.log(
+                self.load_prod_model_log,
+                "Copied preprocessing bundle and centroids to production",
+            )
+
+            # the manifest is written last, since a new manifest tells the
+            # prediction service that the whole deployment is in place
+            self.write_production_manifest(champions)
+
             self.log_writer.start_log(
                 "exit",
                 self.class_name,
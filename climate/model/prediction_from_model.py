@@ -2,6 +2,7 @@ import pandas as pd
 from botocore.exceptions import ClientError
 from climate.data_ingestion.data_loader_prediction import Data_Getter_Pred
 from climate.data_preprocessing.preprocessing import Preprocessor
+from climate.model.cluster_assigner import Centroid_Assigner
 from climate.s3_bucket_operations.s3_operations import S3_Operation
 from utils.logger import App_Logger
 from utils.read_params import read_params
@@ -15,7 +16,7 @@ class Prediction:
     Revisions   :   moved to setup to cloud
     """
 
-    def __init__(self):
+    def __init__(self, registry=None):
         self.config = read_params()
 
         self.pred_log = self.config["pred_db_log"]["pred_main"]
@@ -28,6 +29,12 @@ class Prediction:
 
         self.pred_output_file = self.config["pred_output_file"]
 
+        self.centroids_file = self.config["kmeans_cluster"]["centroids_file"]
+
+        self.assign_batch_size = self.config["kmeans_cluster"]["assign_batch_size"]
+
+        self.manifest_file = self.config["production_manifest"]["file"]
+
         self.log_writer = App_Logger()
 
         self.s3 = S3_Operation()
@@ -36,8 +43,144 @@ class Prediction:
 
         self.preprocessor = Preprocessor(self.pred_log)
 
+        self.preprocessing_bundle = None
+
+        self.cluster_assigner = None
+
+        self.manifest = None
+
+        self.registry = registry
+
         self.class_name = self.__class__.__name__
 
+    def get_preprocessing_bundle(self):
+        """
+        Method Name :   get_preprocessing_bundle
+        Description :   This method loads the production preprocessing bundle once and reuses it afterwards
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.get_preprocessing_bundle.__name__
+
+        self.log_writer.start_log(
+            "start",
+            self.class_name,
+            method_name,
+            self.pred_log,
+        )
+
+        try:
+            if self.preprocessing_bundle is None:
+                self.preprocessing_bundle = self.preprocessor.load_preprocessing_bundle(
+                    self.prod_model_dir, self.model_bucket
+                )
+
+            self.log_writer.start_log(
+                "exit",
+                self.class_name,
+                method_name,
+                self.pred_log,
+            )
+
+            return self.preprocessing_bundle
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e,
+                self.class_name,
+                method_name,
+                self.pred_log,
+            )
+
+    def get_cluster_assigner(self):
+        """
+        Method Name :   get_cluster_assigner
+        Description :   This method loads the production centroids once and creates the NumPy cluster assigner
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.get_cluster_assigner.__name__
+
+        self.log_writer.start_log(
+            "start",
+            self.class_name,
+            method_name,
+            self.pred_log,
+        )
+
+        try:
+            if self.cluster_assigner is None:
+                content = self.s3.read_bytes(
+                    self.prod_model_dir + self.centroids_file,
+                    self.model_bucket,
+                    self.pred_log,
+                )
+
+                self.cluster_assigner = Centroid_Assigner.from_bytes(
+                    content, batch_size=self.assign_batch_size
+                )
+
+            self.log_writer.start_log(
+                "exit",
+                self.class_name,
+                method_name,
+                self.pred_log,
+            )
+
+            return self.cluster_assigner
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e,
+                self.class_name,
+                method_name,
+                self.pred_log,
+            )
+
+    def get_manifest(self):
+        """
+        Method Name :   get_manifest
+        Description :   This method loads the production manifest once and reuses it afterwards
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.get_manifest.__name__
+
+        self.log_writer.start_log(
+            "start",
+            self.class_name,
+            method_name,
+            self.pred_log,
+        )
+
+        try:
+            if self.manifest is None:
+                self.manifest = self.s3.read_json(
+                    self.prod_model_dir + self.manifest_file,
+                    self.model_bucket,
+                    self.pred_log,
+                )
+
+            self.log_writer.start_log(
+                "exit",
+                self.class_name,
+                method_name,
+                self.pred_log,
+            )
+
+            return self.manifest
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e,
+                self.class_name,
+                method_name,
+                self.pred_log,
+            )
+
     def delete_pred_file(self, log_file):
         """
         Method Name :   delete_pred_file
@@ -91,7 +234,9 @@ class Prediction:
     def find_correct_model_file(self, cluster_number, bucket, log_file):
         """
         Method Name :   find_correct_model_file
-        Description :   This method is used for finding the correct model file during prediction
+        Description :   This method is used for finding the correct model file during prediction.
+                        The key of the model is looked up by cluster in the production manifest,
+                        so no listing of the production folder is needed.
 
         Version     :   1.2
         Revisions   :   moved setup to cloud
@@ -106,23 +251,13 @@ class Prediction:
         )
 
         try:
-            list_of_files = self.s3.get_files_from_folder(
-                self.prod_model_dir, bucket, log_file
-            )
-
-            for file in list_of_files:
-                try:
-                    if file.index(str(cluster_number)) != -1:
-                        model_name = file
-
-                except:
-                    continue
+            manifest = self.get_manifest()
 
-            model_name = model_name.split(".")[0]
+            model_key = manifest["clusters"][str(cluster_number)]["model_key"]
 
             self.log_writer.log(
                 log_file,
-                f"Got {model_name} from {self.prod_model_dir} folder in {bucket} bucket",
+                f"Got {model_key} for cluster {cluster_number} from production manifest in {bucket} bucket",
             )
 
             self.log_writer.start_log(
@@ -132,7 +267,7 @@ class Prediction:
                 log_file,
             )
 
-            return model_name
+            return model_key
 
         except Exception as e:
             self.log_writer.exception_log(
@@ -145,7 +280,9 @@ class Prediction:
     def predict_model(self):
         """
         Method Name :   predict_model
-        Description :   This method is used for loading from prod model dir of s3 bucket and use them for prediction
+        Description :   This method is used for loading from prod model dir of s3 bucket and use them for prediction.
+                        With a production registry, the models, the bundle and the centroids of its current
+                        snapshot are used, and no model is read from s3 bucket.
 
         Version     :   1.2
         Revisions   :   moved setup to cloud
@@ -164,39 +301,52 @@ class Prediction:
 
             data = self.data_getter_pred.get_data()
 
-            is_null_present = self.preprocessor.is_null_present(data)
+            snapshot = (
+                self.registry.get_snapshot() if self.registry is not None else None
+            )
 
-            if is_null_present:
-                data = self.preprocessor.impute_missing_values(data)
+            if snapshot is not None:
+                bundle, cluster_assigner = (
+                    snapshot["bundle"],
+                    snapshot["cluster_assigner"],
+                )
 
-            cols_drop = self.preprocessor.get_columns_with_zero_std_deviation(data)
+            else:
+                bundle, cluster_assigner = (
+                    self.get_preprocessing_bundle(),
+                    self.get_cluster_assigner(),
+                )
 
-            data = self.preprocessor.remove_columns(data, cols_drop)
+            data_climate_names = data["climate"]
 
-            kmeans = self.s3.load_model(self.model_bucket, "KMeans", self.pred_log)
+            data = self.preprocessor.apply_preprocessing_bundle(data, bundle)
 
-            clusters = kmeans.predict(data.drop(["climate"], axis=1))
+            clusters = cluster_assigner.assign(data)
 
             data["clusters"] = clusters
 
             clusters = data["clusters"].unique()
 
             for i in clusters:
-                cluster_data = data[data["clusters"] == i]
+                cluster_mask = data["clusters"] == i
 
-                climate_names = list(cluster_data["climate"])
+                cluster_data = data[cluster_mask].drop(["clusters"], axis=1)
 
-                cluster_data = data.drop(labels=["climate"], axis=1)
+                climate_names = list(data_climate_names[cluster_mask])
 
-                cluster_data = cluster_data.drop(["clusters"], axis=1)
+                if snapshot is not None:
+                    model = snapshot["models"][i]
 
-                crt_model_name = self.find_correct_model_file(
-                    i,
-                    self.model_bucket,
-                    self.pred_log,
-                )
+                else:
+                    model_key = self.find_correct_model_file(
+                        i,
+                        self.model_bucket,
+                        self.pred_log,
+                    )
 
-                model = self.s3.load_model(crt_model_name)
+                    model = self.s3.read_pickle(
+                        model_key, self.model_bucket, self.pred_log
+                    )
 
                 result = list(model.predict(cluster_data))
 
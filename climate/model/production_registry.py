@@ -0,0 +1,334 @@
+import hashlib
+import os
+import re
+import threading
+import time
+
+from climate.model.cluster_assigner import Centroid_Assigner
+from climate.s3_bucket_operations.s3_operations import S3_Operation
+from utils.logger import App_Logger
+from utils.read_params import read_params
+
+
+class Production_Registry:
+    """
+    Description :   This class shall be used for keeping all the production artifacts in memory, so that
+                    prediction never reads models from s3 bucket.
+
+                    The cluster models, the preprocessing bundle and the centroids are loaded together into
+                    a snapshot, which is swapped in as a whole, so a prediction always sees artifacts of the
+                    same deployment. The artifacts are resolved from the production manifest, and a background
+                    thread polls the ETag of the manifest and loads a new snapshot when it changes. Deployments
+                    promoted before the manifest existed are resolved and polled from the production folder.
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+
+    def __init__(self, log_file):
+        self.log_file = log_file
+
+        self.config = read_params()
+
+        self.model_bucket = self.config["s3_bucket"]["climate_model_bucket"]
+
+        self.prod_model_dir = self.config["models_dir"]["prod"]
+
+        self.centroids_file = self.config["kmeans_cluster"]["centroids_file"]
+
+        self.assign_batch_size = self.config["kmeans_cluster"]["assign_batch_size"]
+
+        self.model_families = self.config["model_families"]
+
+        self.save_format = self.config["model_utils"]["save_format"]
+
+        self.poll_interval = self.config["production_registry"]["poll_interval"]
+
+        self.manifest_file = self.config["production_manifest"]["file"]
+
+        self.bundle_file = self.config["preprocessing_bundle_file"]
+
+        self.model_file_pattern = re.compile(
+            r"^(?P<model_family>"
+            + "|".join(self.model_families)
+            + r")(?P<cluster>\d+)"
+            + re.escape(self.save_format)
+            + "$"
+        )
+
+        self.snapshot = None
+
+        self.refresh_lock = threading.Lock()
+
+        self.poll_thread = None
+
+        self.s3 = S3_Operation()
+
+        self.log_writer = App_Logger()
+
+        self.class_name = self.__class__.__name__
+
+    def get_version(self, objects):
+        h = hashlib.sha1()
+
+        for key in sorted(objects):
+            h.update(f"{key}:{objects[key]}".encode())
+
+        return h.hexdigest()
+
+    def get_current_version(self):
+        """
+        Method Name :   get_current_version
+        Description :   This method gets the version of the current production deployment, which is the ETag of
+                        the manifest, or a hash of the listing of the production folder when there is no manifest
+
+        Output      :   The version and the manifest ETag, which is None when there is no manifest
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.get_current_version.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, self.log_file)
+
+        try:
+            manifest_etag = self.s3.get_object_etag(
+                self.prod_model_dir + self.manifest_file,
+                self.model_bucket,
+                self.log_file,
+            )
+
+            if manifest_etag is not None:
+                version = manifest_etag
+
+            else:
+                version = self.get_version(
+                    self.s3.list_objects(
+                        self.prod_model_dir, self.model_bucket, self.log_file
+                    )
+                )
+
+            self.log_writer.start_log(
+                "exit", self.class_name, method_name, self.log_file
+            )
+
+            return version, manifest_etag
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e, self.class_name, method_name, self.log_file
+            )
+
+    def get_artifact_keys(self, manifest):
+        """
+        Method Name :   get_artifact_keys
+        Description :   This method gets the keys of the cluster models, the preprocessing bundle and the centroids,
+                        from the manifest in constant time per cluster, or else from the listing of the production
+                        folder, where the cluster is parsed exactly from the file name of the model
+
+        Output      :   A dict of cluster and model key, the bundle key and the centroids key
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.get_artifact_keys.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, self.log_file)
+
+        try:
+            if manifest is not None:
+                model_keys = {
+                    int(cluster): entry["model_key"]
+                    for cluster, entry in manifest["clusters"].items()
+                }
+
+                bundle_key = manifest["preprocessing_bundle"]["key"]
+
+                centroids_key = manifest["centroids"]["key"]
+
+            else:
+                objects = self.s3.list_objects(
+                    self.prod_model_dir, self.model_bucket, self.log_file
+                )
+
+                model_keys = {}
+
+                for key in objects:
+                    match = self.model_file_pattern.match(os.path.basename(key))
+
+                    if match is not None:
+                        model_keys[int(match.group("cluster"))] = key
+
+                bundle_key = self.prod_model_dir + self.bundle_file
+
+                centroids_key = self.prod_model_dir + self.centroids_file
+
+            self.log_writer.start_log(
+                "exit", self.class_name, method_name, self.log_file
+            )
+
+            return model_keys, bundle_key, centroids_key
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e, self.class_name, method_name, self.log_file
+            )
+
+    def load(self, version=None, manifest_etag=None):
+        """
+        Method Name :   load
+        Description :   This method loads every production artifact into a new snapshot and swaps it in
+
+        Output      :   The new snapshot of the production artifacts
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.load.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, self.log_file)
+
+        try:
+            if version is None:
+                version, manifest_etag = self.get_current_version()
+
+            if manifest_etag is not None:
+                manifest = self.s3.read_json(
+                    self.prod_model_dir + self.manifest_file,
+                    self.model_bucket,
+                    self.log_file,
+                )
+
+            else:
+                manifest = None
+
+            model_keys, bundle_key, centroids_key = self.get_artifact_keys(manifest)
+
+            models = {
+                cluster: self.s3.read_pickle(key, self.model_bucket, self.log_file)
+                for cluster, key in model_keys.items()
+            }
+
+            content = self.s3.read_bytes(
+                centroids_key, self.model_bucket, self.log_file
+            )
+
+            snapshot = {
+                "version": version,
+                "manifest": manifest,
+                "models": models,
+                "bundle": self.s3.read_pickle(
+                    bundle_key, self.model_bucket, self.log_file
+                ),
+                "cluster_assigner": Centroid_Assigner.from_bytes(
+                    content, batch_size=self.assign_batch_size
+                ),
+            }
+
+            self.snapshot = snapshot
+
+            self.log_writer.log(
+                self.log_file,
+                f"Loaded production snapshot {version} with models of clusters {sorted(models)}",
+            )
+
+            self.log_writer.start_log(
+                "exit", self.class_name, method_name, self.log_file
+            )
+
+            return snapshot
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e, self.class_name, method_name, self.log_file
+            )
+
+    def refresh(self):
+        """
+        Method Name :   refresh
+        Description :   This method compares the version of the current production deployment with the loaded
+                        snapshot, and loads a new snapshot only when it changed
+
+        Output      :   True if a new snapshot was loaded, else False
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.refresh.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, self.log_file)
+
+        try:
+            with self.refresh_lock:
+                version, manifest_etag = self.get_current_version()
+
+                is_changed = (
+                    self.snapshot is None or version != self.snapshot["version"]
+                )
+
+                if is_changed:
+                    self.load(version, manifest_etag)
+
+            self.log_writer.start_log(
+                "exit", self.class_name, method_name, self.log_file
+            )
+
+            return is_changed
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e, self.class_name, method_name, self.log_file
+            )
+
+    def poll(self):
+        while True:
+            time.sleep(self.poll_interval)
+
+            try:
+                self.refresh()
+
+            except Exception:
+                # the current snapshot keeps serving, the next poll tries again
+                pass
+
+    def start_polling(self):
+        """
+        Method Name :   start_polling
+        Description :   This method starts the background thread polling the production deployment for changes
+
+        Output      :   The polling thread is started
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.start_polling.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, self.log_file)
+
+        try:
+            if self.poll_thread is None:
+                self.poll_thread = threading.Thread(target=self.poll, daemon=True)
+
+                self.poll_thread.start()
+
+            self.log_writer.log(
+                self.log_file,
+                f"Polling production deployment every {self.poll_interval} seconds",
+            )
+
+            self.log_writer.start_log(
+                "exit", self.class_name, method_name, self.log_file
+            )
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e, self.class_name, method_name, self.log_file
+            )
+
+    def get_snapshot(self):
+        return self.snapshot
@@ -1,7 +1,13 @@
+from datetime import datetime
+
 from climate.data_ingestion.data_loader_train import Data_Getter_Train
+from climate.data_preprocessing.chunked_preprocessing import Chunked_Preprocessor
 from climate.data_preprocessing.clustering import KMeans_Clustering
+from climate.data_preprocessing.feature_matrix import Feature_Matrix
 from climate.data_preprocessing.preprocessing import Preprocessor
 from climate.mlflow_utils.mlflow_operations import MLFlow_Operation
+from climate.model.cluster_scheduler import Cluster_Scheduler
+from climate.model.incremental_training import Incremental_Trainer
 from climate.model_finder.tuner import Model_Finder
 from climate.s3_bucket_operations.s3_operations import S3_Operation
 from utils.logger import App_Logger
@@ -33,6 +39,26 @@ class Train_model:
 
         self.train_model_dir = self.config["models_dir"]["trained"]
 
+        self.input_files_bucket = self.config["s3_bucket"]["input_files_bucket"]
+
+        self.train_csv_file = self.config["export_csv_file"]["train"]
+
+        self.chunked_preprocessing = self.config["chunked_preprocessing"]["enabled"]
+
+        self.inplace_preprocessing = self.config["inplace_preprocessing"]
+
+        self.incremental_training = self.config["incremental_training"]["enabled"]
+
+        self.prod_model_dir = self.config["models_dir"]["prod"]
+
+        self.preprocessing_bundle_file = self.config["preprocessing_bundle_file"]
+
+        self.centroids_file = self.config["kmeans_cluster"]["centroids_file"]
+
+        self.training_batch_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        self.retrained_clusters = None
+
         self.class_name = self.__class__.__name__
 
         self.mlflow_op = MLFlow_Operation(self.model_train_log)
@@ -41,24 +67,125 @@ class Train_model:
 
         self.preprocessor = Preprocessor(self.model_train_log)
 
+        self.chunked_preprocessor = Chunked_Preprocessor(self.model_train_log)
+
         self.kmeans_op = KMeans_Clustering(self.model_train_log)
 
         self.model_finder = Model_Finder(self.model_train_log)
 
-        self.model_utils = Model_Utils()
+        self.model_utils = Model_Utils(self.model_train_log)
+
+        self.cluster_scheduler = Cluster_Scheduler(self.model_train_log)
+
+        self.incremental_trainer = Incremental_Trainer(self.model_train_log)
 
         self.s3 = S3_Operation()
 
-    def training_model(self):
+    def preprocess_data(self):
         """
-        Method Name :   training_model
-        Description :   This method is used for getting the data and applying
-                        some preprocessing steps and then train the models and register them in mlflow
+        Method Name :   preprocess_data
+        Description :   This method gets the whole training data in memory and applies the preprocessing steps on it
+
+        Output      :   Features, labels, the fitted imputer, the zero std columns and the feature order
+        On Failure  :   Write an exception log and then raise an exception
 
         Version     :   1.2
         Revisions   :   moved setup to cloud
         """
-        method_name = self.training_model.__name__
+        method_name = self.preprocess_data.__name__
+
+        self.log_writer.start_log(
+            "start",
+            self.class_name,
+            method_name,
+            self.model_train_log,
+        )
+
+        try:
+            data = self.data_getter_train.get_data()
+
+            data = self.preprocessor.remove_columns(data, ["climate"])
+
+            if self.inplace_preprocessing is True:
+                X = Feature_Matrix.from_frame(data, exclude=[self.target_col])
+
+                Y = data[self.target_col]
+
+                del data
+
+                self.log_writer.log(
+                    self.model_train_log,
+                    f"Created {X.__class__.__name__} for in place preprocessing",
+                )
+
+            else:
+                X, Y = self.preprocessor.separate_label_feature(
+                    data, label_column_name=self.target_col
+                )
+
+            feature_order = list(X.columns)
+
+            # no column is dropped yet, so the frame of the feature matrix is a view of its buffer
+            X_frame = X.to_frame() if self.inplace_preprocessing is True else X
+
+            is_null_present = self.preprocessor.is_null_present(X_frame)
+
+            del X_frame
+
+            # the profile computed by is_null_present is taken before imputation, so the
+            # zero std check also drops the columns having at most one value, which
+            # imputation turns into constant columns, and the imputer never sees a
+            # column without any value
+            cols_drop = self.preprocessor.get_columns_with_zero_std_deviation(
+                X, profile=self.preprocessor.profile
+            )
+
+            X = self.preprocessor.remove_columns(X, cols_drop)
+
+            imputer = self.preprocessor.fit_imputer(
+                X, sample_size=self.preprocessor.knn_reference_sample_size
+            )
+
+            if is_null_present:
+                X = self.preprocessor.impute_missing_values(X, imputer=imputer)
+
+            # the only copy of the in place features, once all the columns are dropped
+            if self.inplace_preprocessing is True:
+                X = X.to_frame()
+
+            self.log_writer.start_log(
+                "exit",
+                self.class_name,
+                method_name,
+                self.model_train_log,
+            )
+
+            return X, Y, imputer, cols_drop, feature_order
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e,
+                self.class_name,
+                method_name,
+                self.model_train_log,
+            )
+
+    def incremental_training_model(self):
+        """
+        Method Name :   incremental_training_model
+        Description :   This method preprocesses the new data with the production preprocessing bundle and
+                        continues the training of the production models of the clusters whose data has drifted.
+                        The production bundle and centroids are copied to the trained models dir, so that
+                        loading the production models keeps them. The retrained clusters are kept in
+                        retrained_clusters, which is empty when no cluster has drifted.
+
+        Output      :   The number of clusters
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.incremental_training_model.__name__
 
         self.log_writer.start_log(
             "start",
@@ -76,45 +203,110 @@ class Train_model:
                 data, label_column_name=self.target_col
             )
 
-            is_null_present = self.preprocessor.is_null_present(X)
+            bundle = self.preprocessor.load_preprocessing_bundle(
+                self.prod_model_dir, self.model_bucket
+            )
 
-            if is_null_present:
-                X = self.preprocessor.impute_missing_values(X)
+            X = self.preprocessor.apply_preprocessing_bundle(X, bundle)
 
-            cols_drop = self.preprocessor.get_columns_with_zero_std_deviation(X)
+            number_of_clusters = self.incremental_trainer.train_clusters(
+                X, Y, tags={"training_batch_id": self.training_batch_id}
+            )
 
-            X = self.preprocessor.remove_columns(X, cols_drop)
+            self.retrained_clusters = self.incremental_trainer.retrained_clusters
 
-            number_of_clusters = self.kmeans_op.elbow_plot(X)
+            for artifact_file in [self.preprocessing_bundle_file, self.centroids_file]:
+                self.s3.copy_data(
+                    self.prod_model_dir + artifact_file,
+                    self.model_bucket,
+                    self.train_model_dir + artifact_file,
+                    self.model_bucket,
+                    self.model_train_log,
+                )
 
-            X, kmeans_model = self.kmeans_op.create_clusters(
-                data=X, number_of_clusters=number_of_clusters
+            self.log_writer.start_log(
+                "exit",
+                self.class_name,
+                method_name,
+                self.model_train_log,
             )
 
-            X["Labels"] = Y
+            return number_of_clusters
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e,
+                self.class_name,
+                method_name,
+                self.model_train_log,
+            )
 
-            list_of_clusters = X["Cluster"].unique()
+    def training_model(self):
+        """
+        Method Name :   training_model
+        Description :   This method is used for getting the data and applying
+                        some preprocessing steps and then train the models and register them in mlflow
 
-            for i in list_of_clusters:
-                cluster_data = X[X["Cluster"] == i]
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.training_model.__name__
 
-                cluster_features = cluster_data.drop(["Labels", "Cluster"], axis=1)
+        self.log_writer.start_log(
+            "start",
+            self.class_name,
+            method_name,
+            self.model_train_log,
+        )
 
-                cluster_label = cluster_data["Labels"]
+        try:
+            if self.incremental_training is True:
+                number_of_clusters = self.incremental_training_model()
 
                 self.log_writer.log(
                     self.model_train_log,
-                    "Seprated cluster features and cluster label for the cluster data",
+                    "Successful End of Incremental Training",
                 )
 
-                self.model_utils.train_and_log_models(
-                    cluster_features,
-                    cluster_label,
-                    self.model_train_log,
-                    idx=i,
-                    kmeans=kmeans_model,
+                return number_of_clusters
+
+            if self.chunked_preprocessing is True:
+                (
+                    X,
+                    Y,
+                    imputer,
+                    cols_drop,
+                    feature_order,
+                ) = self.chunked_preprocessor.preprocess_training_data(
+                    self.train_csv_file,
+                    self.input_files_bucket,
+                    self.target_col,
+                    ["climate"],
                 )
 
+            else:
+                X, Y, imputer, cols_drop, feature_order = self.preprocess_data()
+
+            self.preprocessor.save_preprocessing_bundle(
+                imputer,
+                cols_drop,
+                feature_order,
+                self.train_model_dir,
+                self.model_bucket,
+            )
+
+            number_of_clusters = self.kmeans_op.elbow_plot(X)
+
+            X, kmeans_model = self.kmeans_op.create_clusters(
+                data=X, number_of_clusters=number_of_clusters
+            )
+
+            X["Labels"] = Y.to_numpy()
+
+            self.cluster_scheduler.train_clusters(
+                X, kmeans_model, tags={"training_batch_id": self.training_batch_id}
+            )
+
             self.log_writer.log(
                 self.model_train_log,
                 "Successful End of Training",
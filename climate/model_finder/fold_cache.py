@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import KFold
+
+
+class Fold_Cache:
+    """
+    Description :   This class shall be used for sharing the cross validation folds of a cluster between
+                    the searches of every model family.
+
+                    The features are converted once to a contiguous float32 array, which is what the tree
+                    models use internally, so the estimators do not convert them again on every fit. The
+                    fold indices are computed once and passed as cv to every search.
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+
+    def __init__(self, X, y, n_splits):
+        values = np.ascontiguousarray(X, dtype=np.float32)
+
+        columns = X.columns if isinstance(X, pd.DataFrame) else None
+
+        self.X = pd.DataFrame(values, columns=columns, copy=False)
+
+        self.y = np.asarray(y)
+
+        self.splits = list(KFold(n_splits=n_splits).split(values))
+
+    def get_split(self, fold=0):
+        """
+        Method Name :   get_split
+        Description :   This method returns the train and validation rows of the given fold
+
+        Output      :   Train features, validation features, train labels and validation labels
+        """
+        train_idx, valid_idx = self.splits[fold]
+
+        values = self.X.to_numpy()
+
+        return (
+            values[train_idx],
+            values[valid_idx],
+            self.y[train_idx],
+            self.y[valid_idx],
+        )
@@ -0,0 +1,75 @@
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import (
+    GridSearchCV,
+    HalvingGridSearchCV,
+    RandomizedSearchCV,
+)
+
+
+def get_search_cv(
+    estimator, param_grid, search_config, cv, verbose, n_jobs, random_state
+):
+    """
+    Method Name :   get_search_cv
+    Description :   This method creates the hyperparameter search for the strategy configured in params.yaml.
+
+                    grid    -   exhaustive GridSearchCV over the whole param grid
+                    random  -   RandomizedSearchCV over n_iter candidates of the param grid
+                    halving -   HalvingGridSearchCV, which trains every candidate on a small budget of the
+                                resource (rows with n_samples, or trees with n_estimators) and keeps only the
+                                best 1 / factor of the candidates for the next round with factor times more
+
+                    Every strategy exposes the same best_params_ and best_estimator_ as GridSearchCV.
+                    For halving on n_estimators, the n_estimators chosen by the search is in best_params_.
+
+    Output      :   An unfitted search object
+    On Failure  :   Raise Exception
+    """
+    strategy = search_config["strategy"]
+
+    if strategy == "grid":
+        return GridSearchCV(
+            estimator=estimator,
+            param_grid=param_grid,
+            cv=cv,
+            verbose=verbose,
+            n_jobs=n_jobs,
+        )
+
+    if strategy == "random":
+        return RandomizedSearchCV(
+            estimator=estimator,
+            param_distributions=param_grid,
+            n_iter=search_config["n_iter"],
+            cv=cv,
+            verbose=verbose,
+            n_jobs=n_jobs,
+            random_state=random_state,
+        )
+
+    if strategy == "halving":
+        resource = search_config["resource"]
+
+        param_grid = dict(param_grid)
+
+        if resource == "n_samples":
+            max_resources = "auto"
+
+        else:
+            max_resources = max(
+                param_grid.pop(resource, [estimator.get_params()[resource]])
+            )
+
+        return HalvingGridSearchCV(
+            estimator=estimator,
+            param_grid=param_grid,
+            factor=search_config["factor"],
+            resource=resource,
+            max_resources=max_resources,
+            cv=cv,
+            verbose=verbose,
+            n_jobs=n_jobs,
+            random_state=random_state,
+        )
+
+    raise Exception(f"Search strategy {strategy} is not one of grid, random or halving")
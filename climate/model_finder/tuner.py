@@ -1,4 +1,13 @@
+import importlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from climate.model_finder.fold_cache import Fold_Cache
+from climate.model_finder.tuning_cache import Tuning_Cache
+from climate.model_finder.xgboost_search import XGBoost_Search
 from sklearn.ensemble import RandomForestRegressor
+from sklearn.model_selection import train_test_split
 from utils.logger import App_Logger
 from utils.model_utils import Model_Utils
 from utils.read_params import read_params
@@ -22,19 +31,42 @@ class Model_Finder:
 
         self.log_writer = App_Logger()
 
-        self.model_utils = Model_Utils()
+        self.model_utils = Model_Utils(log_file)
+
+        self.cv = self.config["model_utils"]["cv"]
+
+        self.model_families = self.config["model_families"]
+
+        self.search_n_jobs = self.config["model_utils"]["n_jobs"]
+
+        self.tuning_cache = Tuning_Cache(log_file)
 
         self.rf_model = RandomForestRegressor()
 
-        self.xgb_model = XGBRegressor(objectective="binary:logistic")
+        self.xgb_tuning_config = self.config["xgboost_tuning"]
+
+        self.random_state = self.config["base"]["random_state"]
+
+        self.split_kwargs = {
+            "test_size": self.config["base"]["test_size"],
+            "random_state": self.random_state,
+        }
 
-    def get_best_model_for_random_forest(self, train_x, train_y):
+        self.xgb_model = XGBRegressor(
+            objectective="binary:logistic",
+            tree_method=self.xgb_tuning_config["tree_method"],
+        )
+
+    def get_best_model_for_random_forest(
+        self, train_x, train_y, n_jobs=None, fold_cache=None
+    ):
         """
         Method Name :   get_best_model_for_random_forest
         Description :   get the parameters for Random Forest Algorithm which give the best accuracy.
-                        Use Hyper Parameter Tuning.
+                        Use Hyper Parameter Tuning. The best estimator refitted by the search is reused,
+                        and with a fold cache the search runs on its float32 features and splits.
 
-        Output      :   The model with the best parameters
+        Output      :   The fitted search, having the model with the best parameters as best_estimator_
         On Failure  :   Write an exception log and then raise an exception
 
         Written By  :   iNeuron Intelligence
@@ -51,31 +83,104 @@ class Model_Finder:
         )
 
         try:
-            self.rf_model_name = self.rf_model.__class__.__name__
+            rf_model_name = self.rf_model.__class__.__name__
 
-            self.rf_best_params = self.model_utils.get_model_params(
-                self.rf_model, train_x, train_y, self.log_file
+            if fold_cache is not None:
+                train_x, train_y, cv = fold_cache.X, fold_cache.y, fold_cache.splits
+
+            else:
+                cv = None
+
+            rf_search = self.model_utils.get_model_search(
+                self.rf_model, train_x, train_y, self.log_file, n_jobs=n_jobs, cv=cv
             )
 
             self.log_writer.log(
                 self.log_file,
-                f"{self.rf_model_name} model best params are {self.rf_best_params}",
+                f"{rf_model_name} model best params are {rf_search.best_params_}",
             )
 
-            self.rf_model.set_params(**self.rf_best_params)
-
-            self.log_writer.log(
+            self.log_writer.start_log(
+                "exit",
+                self.class_name,
+                method_name,
                 self.log_file,
-                f"Initialized {self.rf_model_name} with {self.rf_best_params} as params",
             )
 
-            self.rf_model.fit(train_x, train_y)
+            return rf_search
 
-            self.log_writer.log(
+        except Exception as e:
+            self.log_writer.exception_log(
+                e,
+                self.class_name,
+                method_name,
                 self.log_file,
-                f"Created {self.rf_model_name} based on the {self.rf_best_params} as params",
             )
 
+    def get_best_params_for_xgboost(
+        self, train_x, train_y, n_jobs=None, fold_cache=None
+    ):
+        """
+        Method Name :   get_best_params_for_xgboost
+        Description :   get the parameters for XGBoost Algorithm which give the best accuracy.
+                        Use Hyper Parameter Tuning. When early stopping is enabled in params.yaml, every
+                        candidate is trained on a cached DMatrix until the validation metric stops improving.
+                        The best estimator refitted by the search is reused, and with a fold cache the
+                        search runs on its float32 features and splits.
+
+        Output      :   The fitted search, having the model with the best parameters as best_estimator_
+        On Failure  :   Write an exception log and then raise an exception
+
+        Written By  :   iNeuron Intelligence
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.get_best_params_for_xgboost.__name__
+
+        self.log_writer.start_log(
+            "start",
+            self.class_name,
+            method_name,
+            self.log_file,
+        )
+
+        try:
+            xgb_model_name = self.xgb_model.__class__.__name__
+
+            if fold_cache is not None:
+                train_x, train_y, cv = fold_cache.X, fold_cache.y, fold_cache.splits
+
+            else:
+                cv = None
+
+            if self.xgb_tuning_config["early_stopping"] is True:
+                xgb_search = XGBoost_Search(
+                    self.config[xgb_model_name],
+                    self.xgb_tuning_config,
+                    self.random_state,
+                    n_jobs=n_jobs,
+                ).fit(train_x, train_y, fold_cache=fold_cache)
+
+                self.log_writer.log(
+                    self.log_file,
+                    f"{xgb_model_name} model best params with early stopping are {xgb_search.best_params_}",
+                )
+
+            else:
+                xgb_search = self.model_utils.get_model_search(
+                    self.xgb_model,
+                    train_x,
+                    train_y,
+                    self.log_file,
+                    n_jobs=n_jobs,
+                    cv=cv,
+                )
+
+                self.log_writer.log(
+                    self.log_file,
+                    f"{xgb_model_name} model best params are {xgb_search.best_params_}",
+                )
+
             self.log_writer.start_log(
                 "exit",
                 self.class_name,
@@ -83,7 +188,7 @@ class Model_Finder:
                 self.log_file,
             )
 
-            return self.rf_model
+            return xgb_search
 
         except Exception as e:
             self.log_writer.exception_log(
@@ -93,20 +198,39 @@ class Model_Finder:
                 self.log_file,
             )
 
-    def get_best_params_for_xgboost(self, train_x, train_y):
+    def create_model(self, model_name):
         """
-        Method Name :   get_best_params_for_xgboost
-        Description :   get the parameters for XGBoost Algorithm which give the best accuracy.
-                        Use Hyper Parameter Tuning.
+        Method Name :   create_model
+        Description :   This method creates an unfitted model of the model family declared in params.yaml
 
-        Output      :   The model with the best parameters
+        Output      :   An unfitted model
+        On Failure  :   Raise Exception
+        """
+        module = importlib.import_module(self.model_families[model_name]["module"])
+
+        model = getattr(module, model_name)()
+
+        if model_name == "XGBRegressor":
+            model.set_params(tree_method=self.xgb_tuning_config["tree_method"])
+
+        return model
+
+    def get_best_model_for_family(
+        self, model_name, train_x, train_y, n_jobs=None, fold_cache=None
+    ):
+        """
+        Method Name :   get_best_model_for_family
+        Description :   get the best model of a model family declared in params.yaml, which has no dedicated
+                        tuning method. The estimator is created from the module and class name of the family
+                        and tuned over the param grid having the class name as key.
+
+        Output      :   The fitted search, having the model with the best parameters as best_estimator_
         On Failure  :   Write an exception log and then raise an exception
 
-        Written By  :   iNeuron Intelligence
         Version     :   1.2
         Revisions   :   moved setup to cloud
         """
-        method_name = self.get_best_params_for_xgboost.__name__
+        method_name = self.get_best_model_for_family.__name__
 
         self.log_writer.start_log(
             "start",
@@ -116,31 +240,180 @@ class Model_Finder:
         )
 
         try:
-            self.xgb_model_name = self.xgb_model.__class__.__name__
+            model = self.create_model(model_name)
 
-            self.xgb_best_params = self.model_utils.get_model_params(
-                self.xgb_model, train_x, train_y, self.log_file
+            if fold_cache is not None:
+                train_x, train_y, cv = fold_cache.X, fold_cache.y, fold_cache.splits
+
+            else:
+                cv = None
+
+            search = self.model_utils.get_model_search(
+                model, train_x, train_y, self.log_file, n_jobs=n_jobs, cv=cv
             )
 
             self.log_writer.log(
                 self.log_file,
-                f"{self.xgb_model} model best params are {self.xgb_best_params}",
+                f"{model_name} model best params are {search.best_params_}",
             )
 
-            self.xgb_model.set_params(**self.xgb_best_params)
+            self.log_writer.start_log(
+                "exit",
+                self.class_name,
+                method_name,
+                self.log_file,
+            )
 
-            self.log_writer.log(
+            return search
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e,
+                self.class_name,
+                method_name,
                 self.log_file,
-                f"Initialized {self.xgb_model_name} model with best params as {self.xgb_best_params}",
             )
 
-            self.xgb_model.fit(train_x, train_y)
+    def get_family_budget(self, n_jobs=None):
+        """
+        Method Name :   get_family_budget
+        Description :   This method splits the cores given to the cluster between the model families,
+                        based on the cpu_share of every family in params.yaml
+
+        Output      :   A dict of model family name and the n_jobs for its search
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.get_family_budget.__name__
+
+        self.log_writer.start_log(
+            "start",
+            self.class_name,
+            method_name,
+            self.log_file,
+        )
+
+        try:
+            if n_jobs is None:
+                n_jobs = self.search_n_jobs
+
+            n_cores = (os.cpu_count() or 1) if n_jobs == -1 else n_jobs
+
+            budget = {
+                model_name: max(1, int(n_cores * family["cpu_share"]))
+                for model_name, family in self.model_families.items()
+            }
 
             self.log_writer.log(
                 self.log_file,
-                f"Created {self.xgb_model_name} model with best params as {self.xgb_best_params}",
+                f"Split {n_cores} cores between model families as {budget}",
+            )
+
+            self.log_writer.start_log(
+                "exit",
+                self.class_name,
+                method_name,
+                self.log_file,
+            )
+
+            return budget
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e,
+                self.class_name,
+                method_name,
+                self.log_file,
             )
 
+    def get_best_model(
+        self, model_name, train_x, train_y, n_jobs=None, fold_cache=None
+    ):
+        """
+        Method Name :   get_best_model
+        Description :   This method tunes the model family, using the dedicated tuning method when there is one.
+                        When the search result for the same cluster data is in the tuning cache, the search is
+                        skipped and the model is fitted directly with the cached params.
+
+        Output      :   The model with the best parameters
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.get_best_model.__name__
+
+        self.log_writer.start_log(
+            "start",
+            self.class_name,
+            method_name,
+            self.log_file,
+        )
+
+        try:
+            if self.tuning_cache.enabled is True:
+                if fold_cache is not None:
+                    cache_key = self.tuning_cache.get_key(
+                        model_name, fold_cache.X, fold_cache.y
+                    )
+
+                else:
+                    cache_key = self.tuning_cache.get_key(model_name, train_x, train_y)
+
+                cached = self.tuning_cache.load(cache_key)
+
+                if cached is not None:
+                    model = self.create_model(model_name)
+
+                    if "n_jobs" in model.get_params():
+                        model.set_params(n_jobs=n_jobs or 1)
+
+                    model.set_params(**cached["best_params"])
+
+                    if fold_cache is not None:
+                        model.fit(fold_cache.X, fold_cache.y)
+
+                    else:
+                        model.fit(train_x, train_y)
+
+                    self.log_writer.log(
+                        self.log_file,
+                        f"Fitted {model_name} model with cached params {cached['best_params']}",
+                    )
+
+                    self.log_writer.start_log(
+                        "exit",
+                        self.class_name,
+                        method_name,
+                        self.log_file,
+                    )
+
+                    return model
+
+            start_time = time.time()
+
+            if model_name == "XGBRegressor":
+                search = self.get_best_params_for_xgboost(
+                    train_x, train_y, n_jobs=n_jobs, fold_cache=fold_cache
+                )
+
+            elif model_name == "RandomForestRegressor":
+                search = self.get_best_model_for_random_forest(
+                    train_x, train_y, n_jobs=n_jobs, fold_cache=fold_cache
+                )
+
+            else:
+                search = self.get_best_model_for_family(
+                    model_name, train_x, train_y, n_jobs=n_jobs, fold_cache=fold_cache
+                )
+
+            model = search.best_estimator_
+
+            if self.tuning_cache.enabled is True:
+                self.tuning_cache.save(cache_key, search, time.time() - start_time)
+
             self.log_writer.start_log(
                 "exit",
                 self.class_name,
@@ -148,7 +421,7 @@ class Model_Finder:
                 self.log_file,
             )
 
-            return self.xgb_model
+            return model
 
         except Exception as e:
             self.log_writer.exception_log(
@@ -158,10 +431,13 @@ class Model_Finder:
                 self.log_file,
             )
 
-    def get_trained_models(self, train_x, train_y, test_x, test_y):
+    def get_trained_models(self, train_x, train_y, test_x, test_y, n_jobs=None):
         """
         Method Name :   get_trained_models
-        Description :   Find out the Model which has the best score.
+        Description :   Find out the Model which has the best score. The model families declared in
+                        params.yaml are tuned concurrently on a shared fold cache. Every family is tuned by
+                        its own Model_Finder, created before the threads start, so that the searches share
+                        no loggers or clients, and the tuned models are returned by the futures.
         Output      :   The best model name and the model objectect
         On Failure  :   Write an exception log and then raise an exception
 
@@ -179,24 +455,99 @@ class Model_Finder:
         )
 
         try:
-            self.xgb_model = self.get_best_params_for_xgboost(train_x, train_y)
+            fold_cache = Fold_Cache(train_x, train_y, self.cv)
 
-            self.xgb_model_score = self.model_utils.get_model_score(
-                self.xgb_model,
-                test_x,
-                test_y,
+            self.log_writer.log(
                 self.log_file,
+                f"Created fold cache with {len(fold_cache.splits)} splits for {len(train_x)} rows",
             )
 
-            self.rf_model = self.get_best_model_for_random_forest(train_x, train_y)
+            budget = self.get_family_budget(n_jobs)
+
+            family_finders = {
+                model_name: Model_Finder(self.log_file) for model_name in budget
+            }
+
+            # the searches of the model families run concurrently, each one limited
+            # to its share of the cores, so the cluster takes about as long as the slowest family
+            with ThreadPoolExecutor(max_workers=len(budget)) as executor:
+                futures = [
+                    executor.submit(
+                        family_finders[model_name].get_best_model,
+                        model_name,
+                        train_x,
+                        train_y,
+                        n_jobs=family_n_jobs,
+                        fold_cache=fold_cache,
+                    )
+                    for model_name, family_n_jobs in budget.items()
+                ]
+
+                models = [future.result() for future in futures]
 
-            self.rf_model_score = self.model_utils.get_model_score(
-                self.rf_model,
-                test_x,
-                test_y,
+            lst = [
+                (
+                    model,
+                    self.model_utils.get_model_score(
+                        model, test_x, test_y, self.log_file
+                    ),
+                )
+                for model in models
+            ]
+
+            self.log_writer.start_log(
+                "exit",
+                self.class_name,
+                method_name,
+                self.log_file,
+            )
+
+            return lst
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e,
+                self.class_name,
+                method_name,
+                self.log_file,
+            )
+
+    def train_models(self, X_data, Y_data, n_jobs=None):
+        """
+        Method Name :   train_models
+        Description :   This method splits the data into train and test and trains the tuned models on it
+
+        Output      :   A list of trained models along with their scores
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.train_models.__name__
+
+        self.log_writer.start_log(
+            "start",
+            self.class_name,
+            method_name,
+            self.log_file,
+        )
+
+        try:
+            x_train, x_test, y_train, y_test = train_test_split(
+                X_data, Y_data, **self.split_kwargs
+            )
+
+            self.log_writer.log(
                 self.log_file,
+                f"Performed train test split with kwargs as {self.split_kwargs}",
+            )
+
+            lst = self.get_trained_models(
+                x_train, y_train, x_test, y_test, n_jobs=n_jobs
             )
 
+            self.log_writer.log(self.log_file, "Got trained models")
+
             self.log_writer.start_log(
                 "exit",
                 self.class_name,
@@ -204,11 +555,6 @@ class Model_Finder:
                 self.log_file,
             )
 
-            lst = [
-                (self.xgb_model, self.xgb_model_score),
-                (self.rf_model, self.rf_model_score),
-            ]
-
             return lst
 
         except Exception as e:
@@ -216,4 +562,5 @@ class Model_Finder:
                 e,
                 self.class_name,
                 method_name,
+                self.log_file,
             )
@@ -0,0 +1,232 @@
+import hashlib
+import importlib
+import json
+import os
+
+import numpy as np
+import sklearn
+from climate.s3_bucket_operations.s3_operations import S3_Operation
+from utils.logger import App_Logger
+from utils.read_params import read_params
+
+
+class Tuning_Cache:
+    """
+    Description :   This class shall be used for caching the results of the hyperparameter search of every
+                    model family, so that training again on identical cluster data skips the search.
+
+                    The key is a hash of the cluster features and labels, the param grid, the search config
+                    and the library versions. The best params, the cv scores and the search time are stored
+                    as json, either in the model bucket or in a local folder.
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+
+    def __init__(self, log_file):
+        self.log_file = log_file
+
+        self.config = read_params()
+
+        self.enabled = self.config["tuning_cache"]["enabled"]
+
+        self.store = self.config["tuning_cache"]["store"]
+
+        self.cache_dir = self.config["tuning_cache"]["cache_dir"]
+
+        self.local_dir = self.config["tuning_cache"]["local_dir"]
+
+        self.model_bucket = self.config["s3_bucket"]["climate_model_bucket"]
+
+        self.model_families = self.config["model_families"]
+
+        self.search_config = {
+            "cv": self.config["model_utils"]["cv"],
+            "search": self.config["model_utils"]["search"],
+            "xgboost_tuning": self.config["xgboost_tuning"],
+            "random_state": self.config["base"]["random_state"],
+        }
+
+        self.s3 = S3_Operation()
+
+        self.log_writer = App_Logger()
+
+        self.class_name = self.__class__.__name__
+
+    def get_library_versions(self, model_name):
+        module_name = self.model_families[model_name]["module"].split(".")[0]
+
+        return {
+            "numpy": np.__version__,
+            "sklearn": sklearn.__version__,
+            module_name: importlib.import_module(module_name).__version__,
+        }
+
+    def get_key(self, model_name, X, y):
+        """
+        Method Name :   get_key
+        Description :   This method hashes the cluster features and labels, together with the param grid,
+                        the search config and the library versions of the model family
+
+        Output      :   A hex digest used as key of the tuning cache
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.get_key.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, self.log_file)
+
+        try:
+            h = hashlib.sha1()
+
+            h.update(model_name.encode())
+
+            h.update(str(list(getattr(X, "columns", []))).encode())
+
+            for values in [np.asarray(X), np.asarray(y)]:
+                h.update(str(values.shape).encode())
+
+                h.update(str(values.dtype).encode())
+
+                h.update(np.ascontiguousarray(values).tobytes())
+
+            h.update(
+                json.dumps(
+                    {
+                        "param_grid": self.config[model_name],
+                        "search_config": self.search_config,
+                        "versions": self.get_library_versions(model_name),
+                    },
+                    sort_keys=True,
+                ).encode()
+            )
+
+            key = h.hexdigest()
+
+            self.log_writer.log(
+                self.log_file, f"Got {key} as tuning cache key for {model_name} model"
+            )
+
+            self.log_writer.start_log(
+                "exit", self.class_name, method_name, self.log_file
+            )
+
+            return key
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e, self.class_name, method_name, self.log_file
+            )
+
+    def load(self, key):
+        """
+        Method Name :   load
+        Description :   This method loads the cached search result for the key from the configured store
+
+        Output      :   The cached search result, or None when the key is not cached
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.load.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, self.log_file)
+
+        try:
+            entry = None
+
+            if self.store == "local":
+                local_file = os.path.join(self.local_dir, key + ".json")
+
+                if os.path.exists(local_file):
+                    with open(local_file) as f:
+                        entry = json.load(f)
+
+            else:
+                cache_file = self.cache_dir + key + ".json"
+
+                if self.s3.is_object_present(
+                    cache_file, self.model_bucket, self.log_file
+                ):
+                    entry = self.s3.read_json(
+                        cache_file, self.model_bucket, self.log_file
+                    )
+
+            self.log_writer.log(
+                self.log_file,
+                f"Tuning cache {'hit' if entry is not None else 'miss'} for {key} in {self.store} store",
+            )
+
+            self.log_writer.start_log(
+                "exit", self.class_name, method_name, self.log_file
+            )
+
+            return entry
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e, self.class_name, method_name, self.log_file
+            )
+
+    def save(self, key, search, fit_time):
+        """
+        Method Name :   save
+        Description :   This method saves the best params, the cv scores and the search time of the fitted
+                        search for the key in the configured store
+
+        Output      :   The search result is cached
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.save.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, self.log_file)
+
+        try:
+            if isinstance(search.cv_results_, dict):
+                cv_scores = list(search.cv_results_["mean_test_score"])
+
+            else:
+                cv_scores = [score for _, score in search.cv_results_]
+
+            content = json.dumps(
+                {
+                    "best_params": search.best_params_,
+                    "best_score": search.best_score_,
+                    "cv_scores": cv_scores,
+                    "fit_time": fit_time,
+                },
+                default=lambda value: value.item(),
+            )
+
+            if self.store == "local":
+                os.makedirs(self.local_dir, exist_ok=True)
+
+                with open(os.path.join(self.local_dir, key + ".json"), "w") as f:
+                    f.write(content)
+
+            else:
+                self.s3.upload_bytes(
+                    content.encode(),
+                    self.cache_dir + key + ".json",
+                    self.model_bucket,
+                    self.log_file,
+                )
+
+            self.log_writer.log(
+                self.log_file, f"Cached search result for {key} in {self.store} store"
+            )
+
+            self.log_writer.start_log(
+                "exit", self.class_name, method_name, self.log_file
+            )
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e, self.class_name, method_name, self.log_file
+            )
@@ -0,0 +1,146 @@
+import numpy as np
+import xgboost as xgb
+from sklearn.model_selection import ParameterGrid, train_test_split
+from xgboost import XGBRegressor
+
+
+class XGBoost_Search:
+    """
+    Description :   This class shall be used for tuning XGBoost with early stopping on a validation split.
+
+                    The train and validation DMatrix are built once per cluster and reused by every candidate
+                    of the param grid. With a fold cache, the first fold is used as the validation split.
+
+                    n_estimators is not searched over, its largest value in the grid is used as the budget
+                    of boosting rounds and every candidate stops once the validation metric has not improved
+                    for early_stopping_rounds rounds. The best number of rounds is returned as n_estimators
+                    in best_params_, like the other search strategies. The other keys of the grid are mapped
+                    from the XGBRegressor names to the native names, and unknown keys are rejected.
+
+                    The best candidate has the lowest validation metric, or the highest one for the metrics
+                    which xgboost maximizes during early stopping.
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+
+    native_params = {
+        "learning_rate": "eta",
+        "max_depth": "max_depth",
+        "min_child_weight": "min_child_weight",
+        "max_delta_step": "max_delta_step",
+        "gamma": "gamma",
+        "subsample": "subsample",
+        "colsample_bytree": "colsample_bytree",
+        "colsample_bylevel": "colsample_bylevel",
+        "colsample_bynode": "colsample_bynode",
+        "reg_alpha": "alpha",
+        "reg_lambda": "lambda",
+        "scale_pos_weight": "scale_pos_weight",
+        "base_score": "base_score",
+        "objective": "objective",
+        "booster": "booster",
+    }
+
+    maximize_metrics = ("auc", "aucpr", "map", "ndcg")
+
+    def __init__(self, param_grid, tuning_config, random_state, n_jobs=None):
+        self.param_grid = dict(param_grid)
+
+        self.max_rounds = max(self.param_grid.pop("n_estimators", [100]))
+
+        unknown_params = [p for p in self.param_grid if p not in self.native_params]
+
+        if len(unknown_params) > 0:
+            raise ValueError(
+                f"Params {unknown_params} of the param grid are not supported by early stopping search"
+            )
+
+        self.tree_method = tuning_config["tree_method"]
+
+        self.early_stopping_rounds = tuning_config["early_stopping_rounds"]
+
+        self.validation_size = tuning_config["validation_size"]
+
+        self.eval_metric = tuning_config["eval_metric"]
+
+        self.maximize = self.eval_metric.split("@")[0] in self.maximize_metrics
+
+        self.random_state = random_state
+
+        self.n_jobs = n_jobs
+
+        self.dtrain = None
+
+        self.dvalid = None
+
+    def build_dmatrix(self, X, y, fold_cache=None):
+        if fold_cache is not None:
+            x_fit, x_valid, y_fit, y_valid = fold_cache.get_split()
+
+        else:
+            x_fit, x_valid, y_fit, y_valid = train_test_split(
+                np.asarray(X, dtype=np.float32),
+                np.asarray(y),
+                test_size=self.validation_size,
+                random_state=self.random_state,
+            )
+
+        self.dtrain = xgb.DMatrix(x_fit, label=y_fit)
+
+        self.dvalid = xgb.DMatrix(x_valid, label=y_valid)
+
+    def fit(self, X, y, fold_cache=None):
+        if self.dtrain is None:
+            self.build_dmatrix(X, y, fold_cache=fold_cache)
+
+        self.cv_results_ = []
+
+        for candidate in ParameterGrid(self.param_grid):
+            params = {
+                self.native_params[name]: value for name, value in candidate.items()
+            }
+
+            params.update(
+                {
+                    "tree_method": self.tree_method,
+                    "eval_metric": self.eval_metric,
+                    "seed": self.random_state,
+                }
+            )
+
+            if self.n_jobs is not None:
+                params["nthread"] = self.n_jobs
+
+            booster = xgb.train(
+                params,
+                self.dtrain,
+                num_boost_round=self.max_rounds,
+                evals=[(self.dvalid, "valid")],
+                early_stopping_rounds=self.early_stopping_rounds,
+                verbose_eval=False,
+            )
+
+            self.cv_results_.append(
+                (
+                    dict(candidate, n_estimators=booster.best_iteration + 1),
+                    booster.best_score,
+                )
+            )
+
+        pick_best = max if self.maximize is True else min
+
+        self.best_params_, self.best_score_ = pick_best(
+            self.cv_results_, key=lambda r: r[1]
+        )
+
+        self.best_estimator_ = XGBRegressor(
+            tree_method=self.tree_method,
+            random_state=self.random_state,
+            n_jobs=self.n_jobs or 1,
+            **self.best_params_,
+        )
+
+        self.best_estimator_.fit(X, y)
+
+        return self
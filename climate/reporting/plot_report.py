@@ -0,0 +1,151 @@
+import threading
+from io import BytesIO
+
+from climate.s3_bucket_operations.s3_operations import S3_Operation
+from utils.logger import App_Logger
+from utils.read_params import read_params
+
+
+class Plot_Report:
+    """
+    Description :   This class shall be used for rendering the report plots off the training critical path.
+                    Matplotlib is imported only when a plot is rendered, always with the Agg backend, and
+                    figures are rendered to an in-memory buffer without going through pyplot, so no figure
+                    is kept alive after rendering.
+
+    Version     :   1.2
+    Revisions   :   moved setup to cloud
+    """
+
+    def __init__(self, log_file):
+        self.log_file = log_file
+
+        self.config = read_params()
+
+        self.input_files_bucket = self.config["s3_bucket"]["input_files_bucket"]
+
+        self.elbow_plot_file = self.config["elbow_plot_fig"]
+
+        self.s3 = S3_Operation()
+
+        self.log_writer = App_Logger()
+
+        self.class_name = self.__class__.__name__
+
+    def render_elbow_plot(self, wcss):
+        """
+        Method Name :   render_elbow_plot
+        Description :   This method renders the elbow plot of the wcss curve to an in-memory png
+
+        Output      :   The png image as bytes
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.render_elbow_plot.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, self.log_file)
+
+        try:
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            from matplotlib.figure import Figure
+
+            fig = Figure()
+
+            FigureCanvasAgg(fig)
+
+            ax = fig.add_subplot(1, 1, 1)
+
+            ax.plot(range(1, len(wcss) + 1), wcss)
+
+            ax.set_title("The Elbow Method")
+
+            ax.set_xlabel("Number of clusters")
+
+            ax.set_ylabel("WCSS")
+
+            buffer = BytesIO()
+
+            fig.savefig(buffer, format="png")
+
+            self.log_writer.log(self.log_file, "Rendered elbow plot to memory")
+
+            self.log_writer.start_log(
+                "exit", self.class_name, method_name, self.log_file
+            )
+
+            return buffer.getvalue()
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e, self.class_name, method_name, self.log_file
+            )
+
+    def upload_elbow_plot(self, wcss):
+        """
+        Method Name :   upload_elbow_plot
+        Description :   This method renders the elbow plot and uploads it to input files bucket
+
+        Output      :   An elbow plot figure saved to input files bucket
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.upload_elbow_plot.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, self.log_file)
+
+        try:
+            content = self.render_elbow_plot(wcss)
+
+            self.s3.upload_bytes(
+                content, self.elbow_plot_file, self.input_files_bucket, self.log_file
+            )
+
+            self.log_writer.start_log(
+                "exit", self.class_name, method_name, self.log_file
+            )
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e, self.class_name, method_name, self.log_file
+            )
+
+    def upload_elbow_plot_in_background(self, wcss):
+        """
+        Method Name :   upload_elbow_plot_in_background
+        Description :   This method renders and uploads the elbow plot in a background thread
+
+        Output      :   The started thread, which can be joined if the plot is needed
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.upload_elbow_plot_in_background.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, self.log_file)
+
+        try:
+            thread = threading.Thread(
+                target=self.upload_elbow_plot, args=(list(wcss),), daemon=True
+            )
+
+            thread.start()
+
+            self.log_writer.log(
+                self.log_file, "Started rendering elbow plot in background"
+            )
+
+            self.log_writer.start_log(
+                "exit", self.class_name, method_name, self.log_file
+            )
+
+            return thread
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e, self.class_name, method_name, self.log_file
+            )
@@ -1,13 +1,13 @@
 import json
 import os
 import pickle
+from concurrent.futures import ThreadPoolExecutor
 from io import StringIO
 
 import boto3
 import pandas as pd
 from botocore.exceptions import ClientError
 from utils.logger import App_Logger
-from utils.model_utils import Model_Utils
 from utils.read_params import read_params
 
 
@@ -27,8 +27,6 @@ class S3_Operation:
 
         self.class_name = self.__class__.__name__
 
-        self.model_utils = Model_Utils()
-
         self.file_format = self.config["model_utils"]["save_format"]
 
         self.s3_client = boto3.client("s3")
@@ -187,10 +185,10 @@ class S3_Operation:
                 log_file,
             )
 
-    def get_df_object(self, object, log_file):
+    def get_df_object(self, object, log_file, na_values=None):
         """
         Method Name :   get_df_object
-        Description :   This method gets dataframe from object
+        Description :   This method gets dataframe from object, parsing na_values as null
 
         Output      :   Dataframe is read from the object
         On Failure  :   Write an exception log and then raise an exception
@@ -210,7 +208,7 @@ class S3_Operation:
         try:
             content = self.read_object(object, log_file, make_readable=True)
 
-            df = pd.read_csv(content)
+            df = pd.read_csv(content, na_values=na_values)
 
             self.log_writer.start_log(
                 "exit",
@@ -229,10 +227,10 @@ class S3_Operation:
                 log_file,
             )
 
-    def read_csv(self, file_name, bucket, log_file):
+    def read_csv(self, file_name, bucket, log_file, na_values=None):
         """
         Method Name :   read_csv
-        Description :   This method reads the csv data from s3 bucket
+        Description :   This method reads the csv data from s3 bucket, parsing na_values as null
 
         Output      :   A pandas series object consisting of runs for the particular experiment id
         On Failure  :   Write an exception log and then raise an exception
@@ -256,7 +254,7 @@ class S3_Operation:
                 log_file,
             )
 
-            df = self.get_df_object(csv_obj, log_file)
+            df = self.get_df_object(csv_obj, log_file, na_values=na_values)
 
             self.log_writer.log(
                 log_file,
@@ -601,7 +599,7 @@ class S3_Operation:
                 log_file,
             )
 
-    def copy_data(self, file_name, bucket, log_file):
+    def copy_data(self, from_file_name, from_bucket, to_file_name, to_bucket, log_file):
         """
         Method Name :   copy_data
         Description :   This method copies the data from one bucket to another bucket
@@ -622,13 +620,68 @@ class S3_Operation:
         )
 
         try:
-            copy_source = {"Bucket": bucket, "Key": file_name}
+            copy_source = {"Bucket": from_bucket, "Key": from_file_name}
 
-            self.s3_resource.meta.client.copy(copy_source, bucket, file_name)
+            self.s3_resource.meta.client.copy(copy_source, to_bucket, to_file_name)
 
             self.log_writer.log(
                 log_file,
-                f"Copied data from bucket {bucket} to bucket {bucket}",
+                f"Copied {from_file_name} from bucket {from_bucket} to {to_file_name} in bucket {to_bucket}",
+            )
+
+            self.log_writer.start_log(
+                "exit",
+                self.class_name,
+                method_name,
+                log_file,
+            )
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e,
+                self.class_name,
+                method_name,
+                log_file,
+            )
+
+    def copy_files(self, copies, bucket, log_file, max_workers=16):
+        """
+        Method Name :   copy_files
+        Description :   This method copies a batch of files inside the bucket concurrently, with the shared s3 client
+
+        Output      :   All the files are copied to their new names in the bucket
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.copy_files.__name__
+
+        self.log_writer.start_log(
+            "start",
+            self.class_name,
+            method_name,
+            log_file,
+        )
+
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [
+                    executor.submit(
+                        self.s3_client.copy_object,
+                        Bucket=bucket,
+                        Key=to_file_name,
+                        CopySource={"Bucket": bucket, "Key": from_file_name},
+                    )
+                    for from_file_name, to_file_name in copies
+                ]
+
+                for future in futures:
+                    future.result()
+
+            self.log_writer.log(
+                log_file,
+                f"Copied {len(copies)} files in bucket {bucket}",
             )
 
             self.log_writer.start_log(
@@ -689,6 +742,64 @@ class S3_Operation:
                 log_file,
             )
 
+    def delete_files(self, file_names, bucket, log_file):
+        """
+        Method Name :   delete_files
+        Description :   This method deletes a batch of files from s3 bucket, with one request for every 1000 files
+
+        Output      :   All the files are deleted from s3 bucket
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.delete_files.__name__
+
+        self.log_writer.start_log(
+            "start",
+            self.class_name,
+            method_name,
+            log_file,
+        )
+
+        try:
+            file_names = list(file_names)
+
+            for start in range(0, len(file_names), 1000):
+                response = self.s3_client.delete_objects(
+                    Bucket=bucket,
+                    Delete={
+                        "Objects": [
+                            {"Key": file_name}
+                            for file_name in file_names[start : start + 1000]
+                        ],
+                        "Quiet": True,
+                    },
+                )
+
+                if len(response.get("Errors", [])) > 0:
+                    raise Exception(f"Failed to delete {response['Errors']}")
+
+            self.log_writer.log(
+                log_file,
+                f"Deleted {len(file_names)} files from bucket {bucket}",
+            )
+
+            self.log_writer.start_log(
+                "exit",
+                self.class_name,
+                method_name,
+                log_file,
+            )
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e,
+                self.class_name,
+                method_name,
+                log_file,
+            )
+
     def move_data(self, file_name, bucket, log_file):
         """
         Method Name :   move_data
@@ -744,6 +855,57 @@ class S3_Operation:
                 log_file,
             )
 
+    def list_objects(self, prefix, bucket, log_file):
+        """
+        Method Name :   list_objects
+        Description :   This method lists the keys and ETags of the objects under the prefix in s3 bucket
+
+        Output      :   A dict of object key and ETag
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.list_objects.__name__
+
+        self.log_writer.start_log(
+            "start",
+            self.class_name,
+            method_name,
+            log_file,
+        )
+
+        try:
+            paginator = self.s3_client.get_paginator("list_objects_v2")
+
+            objects = {
+                obj["Key"]: obj["ETag"]
+                for page in paginator.paginate(Bucket=bucket, Prefix=prefix)
+                for obj in page.get("Contents", [])
+            }
+
+            self.log_writer.log(
+                log_file,
+                f"Listed {len(objects)} objects under {prefix} in bucket {bucket}",
+            )
+
+            self.log_writer.start_log(
+                "exit",
+                self.class_name,
+                method_name,
+                log_file,
+            )
+
+            return objects
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e,
+                self.class_name,
+                method_name,
+                log_file,
+            )
+
     def get_files_from_folder(self, folder_name, bucket, log_file):
         """
         Method Name :   get_files_from_folder
@@ -875,7 +1037,7 @@ class S3_Operation:
             model_file = func()
 
             self.log_writer.log(
-                log_file == log_file,
+                log_file,
                 f"Got {model_file} as model file",
             )
 
@@ -928,7 +1090,7 @@ class S3_Operation:
         )
 
         try:
-            model_name = self.model_utils.get_model_name(model, log_file)
+            model_name = model.__class__.__name__
 
             func = (
                 lambda: model_name + self.file_format
@@ -1008,7 +1170,7 @@ class S3_Operation:
         )
 
         try:
-            data_frame.csv(local_file_name, index=None, header=True)
+            data_frame.to_csv(local_file_name, index=None, header=True)
 
             self.log_writer.log(
                 log_file,
@@ -1036,3 +1198,354 @@ class S3_Operation:
                 method_name,
                 log_file,
             )
+
+    def upload_bytes(self, content, bucket_file_name, bucket, log_file):
+        """
+        Method Name :   upload_bytes
+        Description :   This method uploads in-memory content to s3 bucket without creating a local file
+
+        Output      :   The content is uploaded to s3 bucket
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.upload_bytes.__name__
+
+        self.log_writer.start_log(
+            "start",
+            self.class_name,
+            method_name,
+            log_file,
+        )
+
+        try:
+            self.s3_client.put_object(
+                Bucket=bucket, Key=bucket_file_name, Body=content
+            )
+
+            self.log_writer.log(
+                log_file,
+                f"Uploaded {bucket_file_name} to s3 bucket {bucket}",
+            )
+
+            self.log_writer.start_log(
+                "exit",
+                self.class_name,
+                method_name,
+                log_file,
+            )
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e,
+                self.class_name,
+                method_name,
+                log_file,
+            )
+
+    def upload_pickle(self, obj, bucket_file_name, bucket, log_file):
+        """
+        Method Name :   upload_pickle
+        Description :   This method pickles the object and uploads it to s3 bucket
+
+        Output      :   A pickled object is uploaded to s3 bucket
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.upload_pickle.__name__
+
+        self.log_writer.start_log(
+            "start",
+            self.class_name,
+            method_name,
+            log_file,
+        )
+
+        try:
+            content = pickle.dumps(obj)
+
+            self.log_writer.log(
+                log_file,
+                f"Pickled {obj.__class__.__name__} object",
+            )
+
+            self.upload_bytes(content, bucket_file_name, bucket, log_file)
+
+            self.log_writer.start_log(
+                "exit",
+                self.class_name,
+                method_name,
+                log_file,
+            )
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e,
+                self.class_name,
+                method_name,
+                log_file,
+            )
+
+    def read_pickle(self, file_name, bucket, log_file):
+        """
+        Method Name :   read_pickle
+        Description :   This method reads the pickled object from s3 bucket
+
+        Output      :   An unpickled object is returned
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.read_pickle.__name__
+
+        self.log_writer.start_log(
+            "start",
+            self.class_name,
+            method_name,
+            log_file,
+        )
+
+        try:
+            content = self.read_bytes(file_name, bucket, log_file)
+
+            obj = pickle.loads(content)
+
+            self.log_writer.log(
+                log_file,
+                f"Read {file_name} pickle from {bucket} bucket",
+            )
+
+            self.log_writer.start_log(
+                "exit",
+                self.class_name,
+                method_name,
+                log_file,
+            )
+
+            return obj
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e,
+                self.class_name,
+                method_name,
+                log_file,
+            )
+
+    def download_file(self, file_name, bucket, local_file_name, log_file):
+        """
+        Method Name :   download_file
+        Description :   This method downloads a file from s3 bucket to the local file system
+
+        Output      :   A file is downloaded from s3 bucket
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.download_file.__name__
+
+        self.log_writer.start_log(
+            "start",
+            self.class_name,
+            method_name,
+            log_file,
+        )
+
+        try:
+            self.s3_resource.meta.client.download_file(
+                bucket, file_name, local_file_name
+            )
+
+            self.log_writer.log(
+                log_file,
+                f"Downloaded {file_name} from {bucket} bucket to {local_file_name}",
+            )
+
+            self.log_writer.start_log(
+                "exit",
+                self.class_name,
+                method_name,
+                log_file,
+            )
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e,
+                self.class_name,
+                method_name,
+                log_file,
+            )
+
+    def is_object_present(self, file_name, bucket, log_file):
+        """
+        Method Name :   is_object_present
+        Description :   This method checks whether the object is present in s3 bucket
+
+        Output      :   True if the object is present, else False
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.is_object_present.__name__
+
+        self.log_writer.start_log(
+            "start",
+            self.class_name,
+            method_name,
+            log_file,
+        )
+
+        try:
+            self.s3_client.head_object(Bucket=bucket, Key=file_name)
+
+            self.log_writer.log(
+                log_file,
+                f"{file_name} is present in {bucket} bucket",
+            )
+
+            self.log_writer.start_log(
+                "exit",
+                self.class_name,
+                method_name,
+                log_file,
+            )
+
+            return True
+
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "404":
+                self.log_writer.log(
+                    log_file,
+                    f"{file_name} is not present in {bucket} bucket",
+                )
+
+                self.log_writer.start_log(
+                    "exit",
+                    self.class_name,
+                    method_name,
+                    log_file,
+                )
+
+                return False
+
+            else:
+                self.log_writer.exception_log(
+                    e,
+                    self.class_name,
+                    method_name,
+                    log_file,
+                )
+
+    def get_object_etag(self, file_name, bucket, log_file):
+        """
+        Method Name :   get_object_etag
+        Description :   This method gets the ETag of the object in s3 bucket with a single head request
+
+        Output      :   The ETag of the object, or None if the object is not present
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.get_object_etag.__name__
+
+        self.log_writer.start_log(
+            "start",
+            self.class_name,
+            method_name,
+            log_file,
+        )
+
+        try:
+            etag = self.s3_client.head_object(Bucket=bucket, Key=file_name)["ETag"]
+
+            self.log_writer.log(
+                log_file,
+                f"Got {etag} as ETag of {file_name} in {bucket} bucket",
+            )
+
+            self.log_writer.start_log(
+                "exit",
+                self.class_name,
+                method_name,
+                log_file,
+            )
+
+            return etag
+
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "404":
+                self.log_writer.log(
+                    log_file,
+                    f"{file_name} is not present in {bucket} bucket",
+                )
+
+                self.log_writer.start_log(
+                    "exit",
+                    self.class_name,
+                    method_name,
+                    log_file,
+                )
+
+                return None
+
+            else:
+                self.log_writer.exception_log(
+                    e,
+                    self.class_name,
+                    method_name,
+                    log_file,
+                )
+
+    def read_bytes(self, file_name, bucket, log_file):
+        """
+        Method Name :   read_bytes
+        Description :   This method reads the raw content of the object from s3 bucket with a single get request
+
+        Output      :   The content of the object as bytes
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.read_bytes.__name__
+
+        self.log_writer.start_log(
+            "start",
+            self.class_name,
+            method_name,
+            log_file,
+        )
+
+        try:
+            content = self.s3_client.get_object(Bucket=bucket, Key=file_name)[
+                "Body"
+            ].read()
+
+            self.log_writer.log(
+                log_file,
+                f"Read {file_name} from {bucket} bucket",
+            )
+
+            self.log_writer.start_log(
+                "exit",
+                self.class_name,
+                method_name,
+                log_file,
+            )
+
+            return content
+
+        except Exception as e:
+            self.log_writer.exception_log(
+                e,
+                self.class_name,
+                method_name,
+                log_file,
+            )
@@ -8,6 +8,7 @@ from fastapi.templating import Jinja2Templates
 
 from climate.model.load_production_model import Load_Prod_Model
 from climate.model.prediction_from_model import Prediction
+from climate.model.production_registry import Production_Registry
 from climate.model.training_model import Train_model
 from climate.validation_insertion.prediction_validation_insertion import Pred_Validation
 from climate.validation_insertion.train_validation_insertion import Train_Validation
@@ -19,6 +20,8 @@ config = read_params()
 
 templates = Jinja2Templates(directory=config["templates"]["dir"])
 
+registry = Production_Registry(config["pred_db_log"]["pred_main"])
+
 origins = ["*"]
 
 app.add_middleware(
@@ -30,6 +33,18 @@ app.add_middleware(
 )
 
 
+@app.on_event("startup")
+async def load_production_registry():
+    try:
+        registry.load()
+
+    except Exception:
+        # no production models yet, polling loads them once they are promoted
+        pass
+
+    registry.start_polling()
+
+
 @app.get("/")
 async def index(request: Request):
     return templates.TemplateResponse(
@@ -50,10 +65,17 @@ async def trainRouteClient():
 
         num_clusters = train_model.training_model()
 
-        load_prod_model_object = Load_Prod_Model(num_clusters=num_clusters)
+        if train_model.retrained_clusters == []:
+            return Response("Training successfull!! No cluster has drifted")
+
+        load_prod_model_object = Load_Prod_Model(
+            num_clusters=num_clusters, training_batch_id=train_model.training_batch_id
+        )
 
         load_prod_model_object.load_production_model()
 
+        registry.refresh()
+
     except Exception as e:
         return Response("Error Occurred! %s" % e)
 
@@ -69,7 +91,7 @@ async def predictRouteClient():
 
         pred_val.prediction_validation()
 
-        pred = Prediction()
+        pred = Prediction(registry=registry)
 
         bucket, filename, json_predictions = pred.predict_model()
 
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import os
+import pickle
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, ROOT_DIR)
+
+# the loggers and s3 helpers create boto3 clients when they are built, which needs a region
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+
+class Fake_S3:
+    """
+    Description :   In memory stand in for S3_Operation, keeping every object as bytes with its md5 as ETag
+    """
+
+    def __init__(self):
+        self.objects = {}
+
+    def put(self, key, content):
+        self.objects[key] = content
+
+    def upload_bytes(self, content, bucket_file_name, bucket, log_file):
+        self.put(bucket_file_name, content)
+
+    def upload_pickle(self, obj, bucket_file_name, bucket, log_file):
+        self.put(bucket_file_name, pickle.dumps(obj))
+
+    def read_bytes(self, file_name, bucket, log_file):
+        return self.objects[file_name]
+
+    def download_file(self, file_name, bucket, local_file_name, log_file):
+        with open(local_file_name, "wb") as f:
+            f.write(self.objects[file_name])
+
+    def read_pickle(self, file_name, bucket, log_file):
+        return pickle.loads(self.objects[file_name])
+
+    def read_json(self, file_name, bucket, log_file):
+        return json.loads(self.objects[file_name])
+
+    def get_object_etag(self, file_name, bucket, log_file):
+        if file_name not in self.objects:
+            return None
+
+        return hashlib.md5(self.objects[file_name]).hexdigest()
+
+    def copy_files(self, copies, bucket, log_file, max_workers=16):
+        for from_file_name, to_file_name in copies:
+            self.put(to_file_name, self.objects[from_file_name])
+
+    def delete_files(self, file_names, bucket, log_file):
+        for file_name in file_names:
+            del self.objects[file_name]
+
+    def list_objects(self, prefix, bucket, log_file):
+        return {
+            key: self.get_object_etag(key, bucket, log_file)
+            for key in self.objects
+            if key.startswith(prefix)
+        }
+
+    def get_files_from_folder(self, folder_name, bucket, log_file):
+        return list(self.list_objects(folder_name, bucket, log_file))
+
+
+@pytest.fixture(autouse=True)
+def app_env(monkeypatch):
+    """
+    Description :   Runs every test from the repo root, so that params.yaml is found, and keeps the
+                    loggers from writing to DynamoDB
+    """
+    from utils.logger import App_Logger
+
+    monkeypatch.chdir(ROOT_DIR)
+
+    monkeypatch.setattr(App_Logger, "log", lambda self, log_file, log_info: None)
+
+
+@pytest.fixture
+def fake_s3():
+    return Fake_S3()
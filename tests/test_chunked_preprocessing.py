@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+import pytest
+from climate.data_preprocessing.chunked_preprocessing import (
+    Chunked_Preprocessor,
+    Zero_Std_Stage,
+)
+
+
+@pytest.fixture
+def chunked(tmp_path):
+    chunked = Chunked_Preprocessor("test_log")
+
+    chunked.chunksize = 7
+
+    chunked.work_dir = str(tmp_path)
+
+    chunked.preprocessor.knn_n_neighbors = 2
+
+    return chunked
+
+
+def make_training_file(tmp_path):
+    rng = np.random.RandomState(0)
+
+    n_rows = 30
+
+    data = pd.DataFrame(
+        {
+            "a": rng.randn(n_rows),
+            "b": rng.randn(n_rows),
+            "const": np.full(n_rows, 3.0),
+            "single": [np.nan] * (n_rows - 1) + [1.0],
+            "late": [np.nan] * 5 + [2.0, 4.0] + [np.nan] * (n_rows - 7),
+            "id": np.arange(n_rows),
+            "Labels": rng.randn(n_rows),
+        }
+    )
+
+    data.loc[[2, 9, 15], "a"] = np.nan
+
+    local_file = tmp_path / "train.csv"
+
+    data.to_csv(local_file, index=False)
+
+    return data, str(local_file)
+
+
+def test_zero_std_stage_merges_chunks():
+    stage = Zero_Std_Stage()
+
+    stage.update(
+        pd.DataFrame({"a": [1.0, np.nan], "b": [2.0, 2.0], "c": [np.nan, 5.0]})
+    )
+
+    stage.update(
+        pd.DataFrame({"a": [3.0, 4.0], "b": [2.0, np.nan], "c": [np.nan, np.nan]})
+    )
+
+    stage.finalize([])
+
+    assert stage.cols_drop == ["b", "c"]
+
+
+# a small sample leaves the late column empty, so it is fitted on the backfilled rows
+@pytest.mark.parametrize("sample_size", [100, 3])
+def test_chunked_training_data_matches_in_memory_preprocessing(
+    chunked, tmp_path, sample_size
+):
+    data, local_file = make_training_file(tmp_path)
+
+    chunked.knn_reference_sample_size = sample_size
+
+    stages = chunked.get_training_stages(["id"])
+
+    n_rows = chunked.collect_stats(local_file, stages, "Labels")
+
+    X, Y = chunked.transform_chunks(local_file, stages, "Labels", n_rows)
+
+    features = data.drop(["id", "Labels"], axis=1)
+
+    assert n_rows == len(data)
+
+    assert stages[
+        3
+    ].cols_drop == chunked.preprocessor.get_columns_with_zero_std_deviation(features)
+
+    assert list(X.columns) == ["a", "b", "late"]
+
+    assert stages[4].feature_order == list(features.columns)
+
+    assert not X.isna().values.any()
+
+    np.testing.assert_allclose(X["b"], features["b"], rtol=1e-6)
+
+    np.testing.assert_allclose(Y, data["Labels"])
+
+
+def test_preprocess_training_data_keeps_float_labels_and_cleans_up(
+    chunked, tmp_path, fake_s3
+):
+    data, local_file = make_training_file(tmp_path)
+
+    # the labels of the first chunk parse as integers
+    data["Labels"] = pd.Series(list(range(7)) + list(data["Labels"][7:]), dtype=object)
+
+    data.to_csv(local_file, index=False)
+
+    with open(local_file, "rb") as f:
+        fake_s3.put("train/train.csv", f.read())
+
+    chunked.s3 = fake_s3
+
+    files_before = set(tmp_path.iterdir())
+
+    X, Y, imputer, cols_drop, feature_order = chunked.preprocess_training_data(
+        "train/train.csv", "bucket", "Labels", ["id"]
+    )
+
+    np.testing.assert_allclose(Y, data["Labels"].astype(float))
+
+    assert Y.dtype == np.float64
+
+    assert list(X.columns) == ["a", "b", "late"]
+
+    assert set(tmp_path.iterdir()) == files_before
@@ -0,0 +1,31 @@
+import numpy as np
+from climate.model.cluster_assigner import Centroid_Assigner
+from sklearn.cluster import KMeans
+
+
+def test_assign_matches_kmeans_predict():
+    rng = np.random.RandomState(0)
+
+    data = np.vstack([rng.randn(50, 3) + offset for offset in (0.0, 5.0, 10.0)])
+
+    kmeans = KMeans(n_clusters=3, n_init=3, random_state=0).fit(data)
+
+    assigner = Centroid_Assigner(kmeans.cluster_centers_, batch_size=16)
+
+    np.testing.assert_array_equal(assigner.assign(data), kmeans.predict(data))
+
+    assert assigner.n_clusters == 3
+
+
+def test_assign_single_row():
+    assigner = Centroid_Assigner(np.array([[0.0, 0.0], [10.0, 10.0]]))
+
+    np.testing.assert_array_equal(assigner.assign([9.0, 8.0]), [1])
+
+
+def test_bytes_round_trip():
+    centroids = np.array([[0.0, 1.0], [2.0, 3.0]])
+
+    assigner = Centroid_Assigner.from_bytes(Centroid_Assigner.to_bytes(centroids))
+
+    np.testing.assert_array_equal(assigner.centroids, centroids)
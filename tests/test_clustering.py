@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+from climate.data_preprocessing.clustering import KMeans_Clustering
+from sklearn.cluster import KMeans
+
+
+@pytest.fixture
+def kmeans_op(tmp_path):
+    kmeans_op = KMeans_Clustering("test_log")
+
+    kmeans_op.work_dir = str(tmp_path)
+
+    kmeans_op.max_clusters = 4
+
+    kmeans_op.elbow_n_jobs = 2
+
+    return kmeans_op
+
+
+def test_get_wcss_parallel_matches_sequential_fits(kmeans_op):
+    rng = np.random.RandomState(0)
+
+    data = pd.DataFrame(
+        np.vstack([rng.randn(30, 2) + offset for offset in (0.0, 6.0, 12.0)]),
+        columns=["a", "b"],
+    )
+
+    wcss = kmeans_op.get_wcss_parallel(data)
+
+    expected = [
+        KMeans(
+            n_clusters=i,
+            init=kmeans_op.kmeans_init,
+            random_state=kmeans_op.random_state,
+        )
+        .fit(data.to_numpy(dtype=np.float32))
+        .inertia_
+        for i in range(1, 4)
+    ]
+
+    np.testing.assert_allclose(wcss, expected, rtol=1e-4)
@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+import pytest
+from climate.data_preprocessing.feature_matrix import Feature_Matrix
+from climate.data_preprocessing.preprocessing import Preprocessor
+
+
+def make_frame():
+    return pd.DataFrame(
+        {
+            "a": [1.0, 2.0, np.nan, 4.0],
+            "b": [1.0, 1.0, 1.0, 1.0],
+            "c": [10.0, 20.0, 30.0, 40.0],
+            "Labels": [0.0, 1.0, 0.0, 1.0],
+        }
+    )
+
+
+def test_from_frame_excludes_columns():
+    matrix = Feature_Matrix.from_frame(make_frame(), exclude=["Labels"])
+
+    assert matrix.columns == ["a", "b", "c"]
+
+    assert matrix.buffer.dtype == np.float32
+
+    assert matrix.shape == (4, 3)
+
+
+def test_drop_only_updates_active_columns():
+    matrix = Feature_Matrix.from_frame(make_frame(), exclude=["Labels"])
+
+    buffer = matrix.buffer
+
+    matrix.drop(["c"])
+
+    assert matrix.is_view()
+
+    assert np.shares_memory(matrix.to_array(), buffer)
+
+    matrix.drop(["a"]).drop([])
+
+    assert matrix.columns == ["b"]
+
+    assert matrix.buffer is buffer
+
+
+def test_to_array_copies_non_contiguous_columns():
+    matrix = Feature_Matrix.from_frame(make_frame(), exclude=["Labels"]).drop(["b"])
+
+    assert not matrix.is_view()
+
+    np.testing.assert_array_equal(
+        matrix.to_array(), make_frame()[["a", "c"]].to_numpy(dtype=np.float32)
+    )
+
+
+def test_impute_missing_values_writes_into_buffer(fake_s3):
+    preprocessor = Preprocessor("test_log")
+
+    preprocessor.knn_n_neighbors = 2
+
+    matrix = Feature_Matrix.from_frame(make_frame(), exclude=["Labels"]).drop(["b"])
+
+    buffer = matrix.buffer
+
+    result = preprocessor.impute_missing_values(matrix)
+
+    assert result is matrix
+
+    assert matrix.buffer is buffer
+
+    # the nearest rows on c are 20 and 40, with a as 2 and 4
+    assert matrix.to_frame().loc[2, "a"] == pytest.approx(3.0)
+
+    # the dropped column is left untouched
+    np.testing.assert_array_equal(buffer[:, 1], np.ones(4, dtype=np.float32))
+
+
+def test_get_nan_rows_of_active_columns():
+    matrix = Feature_Matrix.from_frame(make_frame(), exclude=["Labels"])
+
+    np.testing.assert_array_equal(matrix.get_nan_rows(), [2])
+
+    np.testing.assert_array_equal(matrix.drop(["a"]).get_nan_rows(), [])
+
+
+def test_sample_frame_adds_rows_for_empty_columns():
+    data = pd.DataFrame(
+        {
+            "a": np.arange(100, dtype=float),
+            "skip": np.zeros(100),
+            "rare": [np.nan] * 99 + [1.0],
+        }
+    )
+
+    matrix = Feature_Matrix.from_frame(data).drop(["skip"])
+
+    sample = matrix.sample_frame(10, random_state=0)
+
+    assert list(sample.columns) == ["a", "rare"]
+
+    assert len(sample) == 11
+
+    assert sample["rare"].notna().sum() == 1
+
+    assert len(matrix.sample_frame(None, random_state=0)) == 100
+
+
+def test_fit_imputer_on_feature_matrix_does_not_copy_matrix(fake_s3, monkeypatch):
+    preprocessor = Preprocessor("test_log")
+
+    preprocessor.knn_n_neighbors = 2
+
+    matrix = Feature_Matrix.from_frame(make_frame(), exclude=["Labels"]).drop(["b"])
+
+    def fail():
+        raise AssertionError("the feature matrix was copied")
+
+    monkeypatch.setattr(matrix, "to_array", fail)
+
+    imputer = preprocessor.fit_imputer(matrix, sample_size=3)
+
+    preprocessor.impute_missing_values(matrix, imputer=imputer)
+
+    assert not np.isnan(matrix.buffer).any()
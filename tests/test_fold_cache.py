@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+from climate.model_finder.fold_cache import Fold_Cache
+
+
+def test_fold_cache_converts_once_and_shares_splits():
+    X = pd.DataFrame({"a": np.arange(10, dtype=np.float64), "b": np.arange(10) * 2})
+
+    y = np.arange(10) % 2
+
+    fold_cache = Fold_Cache(X, y, n_splits=5)
+
+    assert list(fold_cache.X.columns) == ["a", "b"]
+
+    assert fold_cache.X.dtypes.eq(np.float32).all()
+
+    assert len(fold_cache.splits) == 5
+
+    x_fit, x_valid, y_fit, y_valid = fold_cache.get_split()
+
+    assert x_fit.shape == (8, 2) and x_valid.shape == (2, 2)
+
+    np.testing.assert_array_equal(x_valid[:, 0], [0.0, 1.0])
+
+    np.testing.assert_array_equal(y_valid, [0, 1])
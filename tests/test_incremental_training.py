@@ -0,0 +1,112 @@
+import json
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+from climate.model.cluster_assigner import Centroid_Assigner
+from climate.model.incremental_training import Incremental_Trainer
+from sklearn.ensemble import RandomForestRegressor
+
+CENTROIDS = np.array([[0.0, 0.0], [10.0, 10.0]])
+
+
+def model_key(trainer, model_name):
+    return trainer.prod_model_dir + "/" + model_name + ".sav"
+
+
+@pytest.fixture
+def trainer(fake_s3, monkeypatch):
+    trainer = Incremental_Trainer("test_log")
+
+    fake_s3.put(
+        trainer.prod_model_dir + trainer.centroids_file,
+        Centroid_Assigner.to_bytes(CENTROIDS),
+    )
+
+    fake_s3.put(
+        trainer.prod_model_dir + trainer.manifest_file,
+        json.dumps(
+            {
+                "clusters": {
+                    str(idx): {
+                        "model_key": model_key(trainer, f"RandomForestRegressor{idx}")
+                    }
+                    for idx in range(len(CENTROIDS))
+                }
+            }
+        ).encode(),
+    )
+
+    trainer.s3 = fake_s3
+
+    trainer.logged = []
+
+    monkeypatch.setattr(
+        trainer.model_utils,
+        "save_and_log_models",
+        lambda lst, log_file, idx=None, tags=None: trainer.logged.append(
+            (idx, lst[0][0].n_estimators)
+        ),
+    )
+
+    return trainer
+
+
+def make_cluster_data(shift=(0.0, 0.0)):
+    rng = np.random.RandomState(0)
+
+    noise = rng.randn(10, 2)
+
+    # symmetric noise, so that the mean of every cluster is exactly its centroid
+    offsets = np.vstack([noise, -noise])
+
+    X = pd.DataFrame(
+        np.vstack([CENTROIDS[0] + offsets, CENTROIDS[1] + shift + offsets]),
+        columns=["a", "b"],
+    )
+
+    Y = pd.Series(X["a"] + X["b"])
+
+    return X, Y
+
+
+def test_train_clusters_without_drift_retrains_nothing(trainer):
+    X, Y = make_cluster_data()
+
+    assert trainer.train_clusters(X, Y) == 2
+
+    assert trainer.retrained_clusters == []
+
+    assert trainer.logged == []
+
+
+def test_train_clusters_retrains_only_drifted_clusters(trainer, fake_s3):
+    X, Y = make_cluster_data(shift=(2.0, 2.0))
+
+    model = RandomForestRegressor(n_estimators=5, random_state=0).fit(X, Y)
+
+    fake_s3.put(model_key(trainer, "RandomForestRegressor1"), pickle.dumps(model))
+
+    # a demoted model left in the production folder must not be picked up
+    fake_s3.put(model_key(trainer, "XGBRegressor1"), b"stale")
+
+    trainer.train_clusters(X, Y)
+
+    assert trainer.retrained_clusters == [1]
+
+    assert trainer.logged == [(1, 5 + trainer.extra_trees)]
+
+
+def test_load_production_model_uses_manifest_key(trainer, fake_s3):
+    model = RandomForestRegressor(n_estimators=5, random_state=0)
+
+    fake_s3.put(model_key(trainer, "RandomForestRegressor0"), pickle.dumps(model))
+
+    manifest = fake_s3.read_json(
+        trainer.prod_model_dir + trainer.manifest_file, None, None
+    )
+
+    loaded = trainer.load_production_model(0, manifest)
+
+    assert loaded.get_params() == model.get_params()
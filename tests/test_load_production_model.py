@@ -0,0 +1,188 @@
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+from climate.model.load_production_model import Load_Prod_Model
+
+
+def model_version(name, version, run_id, current_stage="None"):
+    return SimpleNamespace(
+        name=name, version=version, run_id=run_id, current_stage=current_stage
+    )
+
+
+def registered_models(*versions):
+    return [SimpleNamespace(latest_versions=list(versions))]
+
+
+@pytest.fixture
+def prod_model():
+    return Load_Prod_Model(num_clusters=2, training_batch_id="batch")
+
+
+def test_get_champions_picks_best_score_of_every_cluster(prod_model):
+    runs = pd.DataFrame(
+        {
+            "run_id": ["r0", "r1", "rk"],
+            "metrics.XGBRegressor0-best_score": [0.7, None, None],
+            "metrics.RandomForestRegressor0-best_score": [0.9, None, None],
+            "metrics.XGBRegressor1-best_score": [None, 0.8, None],
+            "metrics.RandomForestRegressor1-best_score": [None, 0.6, None],
+        }
+    )
+
+    results = registered_models(
+        model_version("XGBRegressor0", "1", "r0"),
+        model_version("RandomForestRegressor0", "1", "r0"),
+        model_version("XGBRegressor1", "1", "r1"),
+        model_version("RandomForestRegressor1", "1", "r1"),
+        model_version("KMeans", "1", "rk"),
+    )
+
+    model_scores = prod_model.get_model_scores(runs, results)
+
+    assert len(model_scores) == 4
+
+    champions = prod_model.get_champions(model_scores)
+
+    assert dict(zip(champions["cluster"], champions["model_name"])) == {
+        0: "RandomForestRegressor0",
+        1: "XGBRegressor1",
+    }
+
+
+def test_plan_transitions_of_full_batch(prod_model):
+    champions = pd.DataFrame(
+        {"cluster": [0, 1], "model_name": ["RandomForestRegressor0", "XGBRegressor1"]}
+    )
+
+    results = registered_models(
+        model_version("RandomForestRegressor0", "2", "r0"),
+        model_version("XGBRegressor0", "2", "r0"),
+        model_version("XGBRegressor1", "2", "r1"),
+        model_version("KMeans", "2", "rk"),
+        model_version("KMeans", "1", "old", current_stage="Production"),
+        model_version("XGBRegressor0", "1", "old", current_stage="Production"),
+    )
+
+    transitions, demotions, carried_clusters = prod_model.plan_transitions(
+        results, {"r0", "r1", "rk"}, champions
+    )
+
+    assert sorted(transitions) == [
+        ("KMeans", "2", "Production"),
+        ("RandomForestRegressor0", "2", "Production"),
+        ("XGBRegressor0", "2", "Staging"),
+        ("XGBRegressor1", "2", "Production"),
+    ]
+
+    assert sorted(demotions) == [("KMeans", "1"), ("XGBRegressor0", "1")]
+
+    assert carried_clusters == []
+
+
+def test_plan_transitions_carries_forward_clusters_without_runs(prod_model):
+    champions = pd.DataFrame({"cluster": [1], "model_name": ["XGBRegressor1"]})
+
+    results = registered_models(
+        model_version("XGBRegressor1", "3", "r1"),
+        model_version("RandomForestRegressor1", "2", "old", current_stage="Production"),
+        model_version("XGBRegressor0", "1", "old", current_stage="Production"),
+        model_version("KMeans", "1", "old", current_stage="Production"),
+    )
+
+    transitions, demotions, carried_clusters = prod_model.plan_transitions(
+        results, {"r1"}, champions
+    )
+
+    assert transitions == [("XGBRegressor1", "3", "Production")]
+
+    assert demotions == [("RandomForestRegressor1", "2")]
+
+    assert carried_clusters == [0]
+
+
+def test_plan_transitions_raises_for_cluster_without_production_model(prod_model):
+    champions = pd.DataFrame({"cluster": [1], "model_name": ["XGBRegressor1"]})
+
+    results = registered_models(model_version("XGBRegressor1", "3", "r1"))
+
+    with pytest.raises(Exception, match=r"No production model for clusters \[0\]"):
+        prod_model.plan_transitions(results, {"r1"}, champions)
+
+
+@pytest.fixture
+def manifest_model(prod_model, fake_s3):
+    prod_model.s3 = fake_s3
+
+    fake_s3.upload_pickle(
+        {"feature_order": ["a", "b", "c"], "cols_drop": ["b"]},
+        prod_model.prod_model_dir + prod_model.preprocessing_bundle_file,
+        prod_model.model_bucket,
+        "test_log",
+    )
+
+    fake_s3.put(prod_model.prod_model_dir + prod_model.centroids_file, b"centroids")
+
+    for model_name in ["XGBRegressor0", "RandomForestRegressor1", "XGBRegressor1"]:
+        fake_s3.put(
+            prod_model.prod_model_dir + "/" + model_name + prod_model.save_format,
+            model_name.encode(),
+        )
+
+    return prod_model
+
+
+def champion_frame(cluster, model_family, version):
+    return pd.DataFrame(
+        {
+            "cluster": [cluster],
+            "model_family": [model_family],
+            "model_name": [model_family + str(cluster)],
+            "score": [0.9],
+            "run_id": ["r" + str(cluster)],
+            "version": [version],
+        }
+    )
+
+
+def test_write_production_manifest_keeps_previous_entries(manifest_model, fake_s3):
+    first = manifest_model.write_production_manifest(
+        pd.concat(
+            [
+                champion_frame(0, "XGBRegressor", "1"),
+                champion_frame(1, "RandomForestRegressor", "1"),
+            ]
+        )
+    )
+
+    assert first["feature_order"] == ["a", "c"]
+
+    manifest = manifest_model.write_production_manifest(
+        champion_frame(1, "XGBRegressor", "2")
+    )
+
+    assert manifest["clusters"]["0"] == first["clusters"]["0"]
+
+    assert manifest["clusters"]["1"]["model_key"].endswith("XGBRegressor1.sav")
+
+    assert manifest["clusters"]["1"]["model_version"] == "2"
+
+    assert (
+        fake_s3.read_json(
+            manifest_model.prod_model_dir + manifest_model.manifest_file, None, None
+        )
+        == manifest
+    )
+
+
+def test_write_production_manifest_raises_for_missing_cluster(manifest_model, fake_s3):
+    with pytest.raises(Exception, match=r"for clusters \[0\]"):
+        manifest_model.write_production_manifest(champion_frame(1, "XGBRegressor", "2"))
+
+    assert (
+        fake_s3.get_object_etag(
+            manifest_model.prod_model_dir + manifest_model.manifest_file, None, None
+        )
+        is None
+    )
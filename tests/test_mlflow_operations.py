@@ -0,0 +1,100 @@
+from types import SimpleNamespace
+
+import pytest
+from climate.mlflow_utils.mlflow_operations import MLFlow_Operation
+
+
+@pytest.fixture
+def mlflow_op():
+    mlflow_op = MLFlow_Operation("test_log")
+
+    mlflow_op.tracking_mode = "local"
+
+    return mlflow_op
+
+
+def test_get_tracking_uri_uses_local_sqlite_uri(mlflow_op):
+    mlflow_op.local_tracking_uri = "sqlite:///mlflow.db"
+
+    assert mlflow_op.get_tracking_uri() == "sqlite:///mlflow.db"
+
+
+def test_get_tracking_uri_rejects_local_file_store(mlflow_op):
+    mlflow_op.local_tracking_uri = "file:./mlruns"
+
+    with pytest.raises(Exception, match="has no model registry"):
+        mlflow_op.get_tracking_uri()
+
+
+def test_transition_mlflow_models_moves_demoted_files(mlflow_op, fake_s3, monkeypatch):
+    transitioned = []
+
+    client = SimpleNamespace(
+        transition_model_version_stage=lambda name, version, stage: transitioned.append(
+            (name, version, stage)
+        )
+    )
+
+    monkeypatch.setattr(MLFlow_Operation, "tracking_uri", "sqlite:///mlflow.db")
+
+    monkeypatch.setattr(MLFlow_Operation, "client", client)
+
+    mlflow_op.s3 = fake_s3
+
+    def model_file(model_dir, model_name):
+        return model_dir + "/" + model_name + mlflow_op.model_save_format
+
+    trained, stag, prod = (
+        mlflow_op.trained_models_dir,
+        mlflow_op.staged_models_dir,
+        mlflow_op.prod_models_dir,
+    )
+
+    for model_name in ["XGBRegressor0", "RandomForestRegressor0", "XGBRegressor1"]:
+        fake_s3.put(model_file(trained, model_name), b"new " + model_name.encode())
+
+    for model_name in [
+        "RandomForestRegressor0",
+        "RandomForestRegressor1",
+        "XGBRegressor1",
+        "XGBRegressor2",
+    ]:
+        fake_s3.put(model_file(prod, model_name), b"old " + model_name.encode())
+
+    mlflow_op.transition_mlflow_models(
+        [
+            ("XGBRegressor0", "2", "Production"),
+            ("RandomForestRegressor0", "2", "Staging"),
+            ("XGBRegressor1", "2", "Production"),
+        ],
+        "bucket",
+        demotions=[
+            ("RandomForestRegressor0", "1"),
+            ("RandomForestRegressor1", "1"),
+            ("XGBRegressor1", "1"),
+        ],
+    )
+
+    assert len(transitioned) == 6
+
+    prod_files = fake_s3.get_files_from_folder(prod, "bucket", "test_log")
+
+    # a single model is left for every cluster, the one of cluster 2 was not demoted
+    assert sorted(prod_files) == [
+        model_file(prod, "XGBRegressor0"),
+        model_file(prod, "XGBRegressor1"),
+        model_file(prod, "XGBRegressor2"),
+    ]
+
+    assert fake_s3.read_bytes(model_file(prod, "XGBRegressor1"), None, None) == (
+        b"new XGBRegressor1"
+    )
+
+    # the staging dir keeps the newer file of a model demoted and staged in the same batch
+    assert fake_s3.read_bytes(
+        model_file(stag, "RandomForestRegressor0"), None, None
+    ) == (b"new RandomForestRegressor0")
+
+    assert fake_s3.read_bytes(
+        model_file(stag, "RandomForestRegressor1"), None, None
+    ) == (b"old RandomForestRegressor1")
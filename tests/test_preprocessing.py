@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+from climate.data_preprocessing.preprocessing import Preprocessor
+
+
+@pytest.fixture
+def preprocessor(fake_s3):
+    preprocessor = Preprocessor("test_log")
+
+    preprocessor.s3 = fake_s3
+
+    preprocessor.knn_n_neighbors = 2
+
+    return preprocessor
+
+
+def make_train_data():
+    return pd.DataFrame(
+        {
+            "a": [1.0, 2.0, 3.0, np.nan, 5.0, 6.0],
+            "b": [10.0, 20.0, 30.0, 40.0, 50.0, 60.0],
+            "const": [7.0, 7.0, 7.0, 7.0, 7.0, np.nan],
+            "single": [np.nan, np.nan, 3.0, np.nan, np.nan, np.nan],
+        }
+    )
+
+
+def test_get_columns_with_zero_std_deviation_drops_constant_and_single_value(
+    preprocessor,
+):
+    assert preprocessor.get_columns_with_zero_std_deviation(make_train_data()) == [
+        "const",
+        "single",
+    ]
+
+
+def test_fit_imputer_rejects_columns_without_values(preprocessor):
+    data = make_train_data().assign(empty=np.nan)
+
+    with pytest.raises(Exception, match=r"Columns \['empty'\] have no value"):
+        preprocessor.fit_imputer(data)
+
+
+def test_fit_imputer_sample_keeps_every_column(preprocessor):
+    data = pd.DataFrame(
+        {"a": np.arange(100, dtype=float), "rare": [np.nan] * 99 + [1.0]}
+    )
+
+    imputer = preprocessor.fit_imputer(data, sample_size=10)
+
+    assert imputer.transform(data).shape == data.shape
+
+
+def test_preprocessing_bundle_reuses_training_imputer(preprocessor):
+    train = make_train_data()
+
+    cols_drop = preprocessor.get_columns_with_zero_std_deviation(train)
+
+    train = preprocessor.remove_columns(train, cols_drop)
+
+    imputer = preprocessor.fit_imputer(train)
+
+    preprocessor.save_preprocessing_bundle(
+        imputer, cols_drop, make_train_data().columns, "trained/", "bucket"
+    )
+
+    bundle = preprocessor.load_preprocessing_bundle("trained/", "bucket")
+
+    assert bundle["imputer"] is not imputer
+
+    # the serving rows arrive in another column order, and are imputed from the training rows
+    serving = pd.DataFrame(
+        {"single": [1.0], "const": [1.0], "b": [25.0], "a": [np.nan]}
+    )
+
+    data = preprocessor.apply_preprocessing_bundle(serving, bundle)
+
+    assert list(data.columns) == ["a", "b"]
+
+    # the two nearest training rows on b are 20 and 30, with a as 2 and 3
+    assert data.loc[0, "a"] == pytest.approx(2.5)
@@ -0,0 +1,8 @@
+from utils.process_pool import get_process_pool
+
+
+def test_process_pool_runs_tasks():
+    with get_process_pool(2) as pool:
+        results = sorted(pool.imap_unordered(abs, [-3, 2, -1]))
+
+    assert results == [1, 2, 3]
@@ -0,0 +1,80 @@
+import json
+import pickle
+
+import numpy as np
+import pytest
+from climate.model.cluster_assigner import Centroid_Assigner
+from climate.model.production_registry import Production_Registry
+
+
+@pytest.fixture
+def registry(fake_s3):
+    registry = Production_Registry("test_log")
+
+    registry.s3 = fake_s3
+
+    prod_dir = registry.prod_model_dir
+
+    fake_s3.put(prod_dir + registry.bundle_file, pickle.dumps({"cols_drop": []}))
+
+    fake_s3.put(
+        prod_dir + registry.centroids_file,
+        Centroid_Assigner.to_bytes(np.array([[0.0], [1.0]])),
+    )
+
+    fake_s3.put(prod_dir + "/XGBRegressor0.sav", pickle.dumps("xgb0"))
+
+    fake_s3.put(prod_dir + "/RandomForestRegressor1.sav", pickle.dumps("rf1"))
+
+    return registry
+
+
+def put_manifest(registry, fake_s3, clusters):
+    prod_dir = registry.prod_model_dir
+
+    manifest = {
+        "preprocessing_bundle": {"key": prod_dir + registry.bundle_file},
+        "centroids": {"key": prod_dir + registry.centroids_file},
+        "clusters": {
+            str(cluster): {"model_key": prod_dir + "/" + name + ".sav"}
+            for cluster, name in clusters.items()
+        },
+    }
+
+    fake_s3.put(prod_dir + registry.manifest_file, json.dumps(manifest).encode())
+
+
+def test_load_from_folder_without_manifest(registry):
+    snapshot = registry.load()
+
+    assert snapshot["manifest"] is None
+
+    assert snapshot["models"] == {0: "xgb0", 1: "rf1"}
+
+    assert snapshot["cluster_assigner"].n_clusters == 2
+
+
+def test_load_from_manifest(registry, fake_s3):
+    fake_s3.put(registry.prod_model_dir + "/XGBRegressor1.sav", pickle.dumps("xgb1"))
+
+    put_manifest(registry, fake_s3, {0: "XGBRegressor0", 1: "XGBRegressor1"})
+
+    assert registry.load()["models"] == {0: "xgb0", 1: "xgb1"}
+
+
+def test_refresh_only_when_manifest_changes(registry, fake_s3):
+    put_manifest(registry, fake_s3, {0: "XGBRegressor0", 1: "RandomForestRegressor1"})
+
+    assert registry.refresh() is True
+
+    snapshot = registry.get_snapshot()
+
+    assert registry.refresh() is False
+
+    assert registry.get_snapshot() is snapshot
+
+    put_manifest(registry, fake_s3, {0: "RandomForestRegressor1", 1: "XGBRegressor0"})
+
+    assert registry.refresh() is True
+
+    assert registry.get_snapshot()["models"] == {0: "rf1", 1: "xgb0"}
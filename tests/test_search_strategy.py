@@ -0,0 +1,49 @@
+import pytest
+from climate.model_finder.search_strategy import get_search_cv
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.model_selection import (
+    GridSearchCV,
+    HalvingGridSearchCV,
+    RandomizedSearchCV,
+)
+
+PARAM_GRID = {"n_estimators": [10, 30, 90], "max_depth": [2, 4]}
+
+
+def make_search(**search_config):
+    return get_search_cv(
+        RandomForestRegressor(),
+        PARAM_GRID,
+        search_config,
+        cv=3,
+        verbose=0,
+        n_jobs=1,
+        random_state=0,
+    )
+
+
+def test_grid_and_random_strategies():
+    assert isinstance(make_search(strategy="grid"), GridSearchCV)
+
+    search = make_search(strategy="random", n_iter=4)
+
+    assert isinstance(search, RandomizedSearchCV)
+
+    assert search.n_iter == 4
+
+
+def test_halving_on_n_estimators_uses_largest_value_as_budget():
+    search = make_search(strategy="halving", factor=3, resource="n_estimators")
+
+    assert isinstance(search, HalvingGridSearchCV)
+
+    assert search.max_resources == 90
+
+    assert search.param_grid == {"max_depth": [2, 4]}
+
+    assert PARAM_GRID["n_estimators"] == [10, 30, 90]
+
+
+def test_unknown_strategy_is_rejected():
+    with pytest.raises(Exception, match="not one of grid, random or halving"):
+        make_search(strategy="bayes")
@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+from climate.model_finder.tuning_cache import Tuning_Cache
+
+
+@pytest.fixture
+def tuning_cache(tmp_path):
+    tuning_cache = Tuning_Cache("test_log")
+
+    tuning_cache.store = "local"
+
+    tuning_cache.local_dir = str(tmp_path)
+
+    return tuning_cache
+
+
+def make_data(shift=0.0):
+    X = pd.DataFrame({"a": np.arange(5.0) + shift, "b": np.ones(5)})
+
+    return X, np.arange(5)
+
+
+def test_key_depends_on_data_and_model(tuning_cache):
+    X, y = make_data()
+
+    key = tuning_cache.get_key("XGBRegressor", X, y)
+
+    assert key == tuning_cache.get_key("XGBRegressor", *make_data())
+
+    assert key != tuning_cache.get_key("XGBRegressor", *make_data(shift=1.0))
+
+    assert key != tuning_cache.get_key("RandomForestRegressor", X, y)
+
+
+def test_save_and_load_round_trip(tuning_cache):
+    assert tuning_cache.load("missing") is None
+
+    search = SimpleNamespace(
+        cv_results_={"mean_test_score": np.array([0.5, 0.75])},
+        best_params_={"max_depth": np.int64(3)},
+        best_score_=np.float64(0.75),
+    )
+
+    tuning_cache.save("key", search, fit_time=1.5)
+
+    assert tuning_cache.load("key") == {
+        "best_params": {"max_depth": 3},
+        "best_score": 0.75,
+        "cv_scores": [0.5, 0.75],
+        "fit_time": 1.5,
+    }
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from climate.model_finder.xgboost_search import XGBoost_Search
+
+TUNING_CONFIG = {
+    "early_stopping_rounds": 5,
+    "validation_size": 0.25,
+    "tree_method": "hist",
+    "eval_metric": "rmse",
+}
+
+
+def make_data():
+    rng = np.random.RandomState(0)
+
+    X = rng.rand(200, 3)
+
+    y = X[:, 0] * 3 + rng.randn(200) * 0.1
+
+    return X, y
+
+
+def test_param_grid_is_mapped_to_native_names():
+    search = XGBoost_Search(
+        {"n_estimators": [20, 50], "learning_rate": [0.3], "max_depth": [2, 3]},
+        TUNING_CONFIG,
+        random_state=0,
+        n_jobs=1,
+    )
+
+    assert search.max_rounds == 50
+
+    X, y = make_data()
+
+    search.fit(X, y)
+
+    assert len(search.cv_results_) == 2
+
+    assert set(search.best_params_) == {"n_estimators", "learning_rate", "max_depth"}
+
+    assert search.best_params_["n_estimators"] <= 50
+
+    assert search.best_score_ == min(score for _, score in search.cv_results_)
+
+    assert (
+        search.best_estimator_.get_params()["max_depth"]
+        == search.best_params_["max_depth"]
+    )
+
+
+def test_unknown_param_is_rejected():
+    with pytest.raises(ValueError, match="not_a_param"):
+        XGBoost_Search({"not_a_param": [1]}, TUNING_CONFIG, random_state=0)
+
+
+@pytest.mark.parametrize(
+    "eval_metric, maximize", [("rmse", False), ("auc", True), ("ndcg@5", True)]
+)
+def test_best_score_direction_follows_metric(eval_metric, maximize):
+    search = XGBoost_Search(
+        {"max_depth": [2]}, dict(TUNING_CONFIG, eval_metric=eval_metric), random_state=0
+    )
+
+    assert search.maximize is maximize
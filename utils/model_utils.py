@@ -1,9 +1,8 @@
 import mlflow
 from climate.mlflow_utils.mlflow_operations import MLFlow_Operation
-from climate.model_finder.tuner import Model_Finder
+from climate.model_finder.search_strategy import get_search_cv
 from climate.s3_bucket_operations.s3_operations import S3_Operation
-from sklearn.metrics import accuracy_score, roc_auc_score
-from sklearn.model_selection import GridSearchCV, train_test_split
+from sklearn.metrics import r2_score
 
 from utils.logger import App_Logger
 from utils.read_params import read_params
@@ -17,28 +16,35 @@ class Model_Utils:
     Revisions   :   Moved to setup to cloud
     """
 
-    def __init__(self):
+    def __init__(self, log_file):
         self.log_writer = App_Logger()
 
         self.config = read_params()
 
-        self.tuner_kwargs = self.config["model_utils"]
+        self.tuner_kwargs = {
+            "cv": self.config["model_utils"]["cv"],
+            "verbose": self.config["model_utils"]["verbose"],
+            "n_jobs": self.config["model_utils"]["n_jobs"],
+        }
 
-        self.split_kwargs = self.config["base"]
+        self.search_config = self.config["model_utils"]["search"]
+
+        self.split_kwargs = {
+            "test_size": self.config["base"]["test_size"],
+            "random_state": self.config["base"]["random_state"],
+        }
 
         self.train_model_dir = self.config["models_dir"]["trained"]
 
-        self.save_format = self.config["model_save_format"]
+        self.save_format = self.config["model_utils"]["save_format"]
 
-        self.model_bucket = self.config["s3_bucket"]["model"]
+        self.model_bucket = self.config["s3_bucket"]["climate_model_bucket"]
 
         self.exp_name = self.config["mlflow_config"]["experiment_name"]
 
         self.run_name = self.config["mlflow_config"]["run_name"]
 
-        self.mlflow_op = MLFlow_Operation()
-
-        self.model_finder = Model_Finder()
+        self.mlflow_op = MLFlow_Operation(log_file)
 
         self.s3 = S3_Operation()
 
@@ -47,7 +53,8 @@ class Model_Utils:
     def get_model_score(self, model, test_x, test_y, log_file):
         """
         Method Name :   get_model_score
-        Description :   This method gets model score againist the test data
+        Description :   This method gets model score againist the test data, as the R2 score of the
+                        predicted visibility, so that a higher score is a better model
 
         Output      :   A model score is returned
         On Failure  :   Write an exception log and then raise an exception
@@ -69,19 +76,9 @@ class Model_Utils:
                 log_file, f"Used {model_name} model to get predictions on test data"
             )
 
-            if len(test_y.unique()) == 1:
-                model_score = accuracy_score(test_y, preds)
+            model_score = r2_score(test_y, preds)
 
-                self.log_writer.log(
-                    log_file, f"Accuracy for {model_name} is {model_score}"
-                )
-
-            else:
-                model_score = roc_auc_score(test_y, preds)
-
-                self.log_writer.log(
-                    log_file, f"AUC score for {model_name} is {model_score}"
-                )
+            self.log_writer.log(log_file, f"R2 score for {model_name} is {model_score}")
 
             self.log_writer.start_log("exit", self.class_name, method_name, log_file)
 
@@ -90,19 +87,22 @@ class Model_Utils:
         except Exception as e:
             self.log_writer.exception_log(e, self.class_name, method_name, log_file)
 
-    def get_model_params(self, model, x_train, y_train, log_file):
+    def get_model_search(self, model, x_train, y_train, log_file, n_jobs=None, cv=None):
         """
-        Method Name :   get_model_params
-        Description :   This method gets the model parameters based on model_key_name and train data
+        Method Name :   get_model_search
+        Description :   This method runs the hyperparameter search for the model based on model_key_name and
+                        train data, using the search strategy configured in params.yaml.
+                        n_jobs and cv, when given, override the n_jobs and cv of the search from params.yaml.
+                        cv can be the precomputed splits of a fold cache.
 
-        Output      :   Best model parameters are returned
+        Output      :   The fitted search, having best_params_ and the refitted best_estimator_
         On Failure  :   Write an exception log and then raise an exception
 
         Version     :   1.2
         Revisions   :   moved setup to cloud
         """
 
-        method_name = self.get_model_params.__name__
+        method_name = self.get_model_search.__name__
 
         self.log_writer.start_log("start", self.class_name, method_name, log_file)
 
@@ -111,8 +111,20 @@ class Model_Utils:
 
             model_param_grid = self.config[model_name]
 
-            model_grid = GridSearchCV(
-                estimator=model, param_grid=model_param_grid, **self.tuner_kwargs
+            tuner_kwargs = dict(self.tuner_kwargs)
+
+            if n_jobs is not None:
+                tuner_kwargs["n_jobs"] = n_jobs
+
+            if cv is not None:
+                tuner_kwargs["cv"] = cv
+
+            model_grid = get_search_cv(
+                model,
+                model_param_grid,
+                self.search_config,
+                random_state=self.split_kwargs["random_state"],
+                **tuner_kwargs,
             )
 
             self.log_writer.log(
@@ -129,57 +141,119 @@ class Model_Utils:
 
             self.log_writer.start_log("exit", self.class_name, method_name, log_file)
 
-            return model_grid.best_params_
+            return model_grid
 
         except Exception as e:
             self.log_writer.exception_log(e, self.class_name, method_name, log_file)
 
-    def train_and_log_models(self, X_data, Y_data, log_file, idx=None, kmeans=None):
-        method_name = self.train_and_log_models.__name__
+    def get_model_params(self, model, x_train, y_train, log_file, n_jobs=None):
+        """
+        Method Name :   get_model_params
+        Description :   This method gets the model parameters based on model_key_name and train data,
+                        using the search strategy configured in params.yaml.
+                        n_jobs, when given, overrides the n_jobs of the search from params.yaml.
+
+        Output      :   Best model parameters are returned
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
 
-        self.log_writer.start_log("start", log_file, self.class_name, method_name)
+        method_name = self.get_model_params.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
 
         try:
-            x_train, x_test, y_train, y_test = train_test_split(
-                X_data, Y_data, **self.split_kwargs
+            model_grid = self.get_model_search(
+                model, x_train, y_train, log_file, n_jobs=n_jobs
             )
 
-            self.log_writer.log(
-                log_file,
-                f"Performed train test split with kwargs as {self.split_kwargs}",
-            )
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+            return model_grid.best_params_
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
 
-            lst = self.model_finder.get_trained_models(x_train, y_train, x_test, y_test)
+    def save_and_log_models(self, lst, log_file, idx=None, tags=None):
+        """
+        Method Name :   save_and_log_models
+        Description :   This method saves the trained models to s3 bucket and logs them to mlflow,
+                        all the models of the cluster in a single run tagged with the cluster, the model
+                        families and the given tags
 
-            self.log_writer.log(log_file, "Got trained models")
+        Output      :   The trained models are saved to s3 bucket and logged to mlflow
+        On Failure  :   Write an exception log and then raise an exception
 
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.save_and_log_models.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
             for _, tm in enumerate(lst):
                 self.s3.save_model(
                     tm[0],
                     self.train_model_dir,
                     self.model_bucket,
                     log_file,
-                    format=self.save_format,
+                    idx=idx,
                 )
 
-                self.mlflow_op.set_mlflow_tracking_uri()
+            self.mlflow_op.set_mlflow_tracking_uri()
 
-                self.mlflow_op.set_mlflow_experiment(self.exp_name)
+            exp_id = self.mlflow_op.set_mlflow_experiment(self.exp_name)
 
-                with mlflow.start_run(run_name=self.run_name):
-                    self.mlflow_op.log_all_for_model(idx, tm[0], tm[1])
-
-                    if kmeans is not None:
-                        self.mlflow_op.log_all_for_model(None, kmeans, None)
+            run_tags = dict(
+                tags or {},
+                cluster=idx,
+                model_families=",".join(tm[0].__class__.__name__ for tm in lst),
+            )
 
-                    else:
-                        pass
+            with mlflow.start_run(experiment_id=exp_id, run_name=self.run_name):
+                self.mlflow_op.log_all_for_models(lst, idx=idx, tags=run_tags)
 
             self.log_writer.log(
                 log_file, "Saved and logged all trained models to mlflow"
             )
 
-            self.log_writer.start_log("exit", log_file, self.class_name, method_name)
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
+
+        except Exception as e:
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
+
+    def log_kmeans_model(self, kmeans, log_file, tags=None):
+        """
+        Method Name :   log_kmeans_model
+        Description :   This method logs and registers the kmeans model to mlflow in a run of its own,
+                        once for the training batch, tagged with the given tags
+
+        Output      :   The kmeans model is logged to mlflow
+        On Failure  :   Write an exception log and then raise an exception
+
+        Version     :   1.2
+        Revisions   :   moved setup to cloud
+        """
+        method_name = self.log_kmeans_model.__name__
+
+        self.log_writer.start_log("start", self.class_name, method_name, log_file)
+
+        try:
+            self.mlflow_op.set_mlflow_tracking_uri()
+
+            exp_id = self.mlflow_op.set_mlflow_experiment(self.exp_name)
+
+            run_tags = dict(tags or {}, model_families=kmeans.__class__.__name__)
+
+            with mlflow.start_run(experiment_id=exp_id, run_name=self.run_name):
+                self.mlflow_op.log_all_for_models([], kmeans=kmeans, tags=run_tags)
+
+            self.log_writer.log(log_file, "Logged kmeans model to mlflow")
+
+            self.log_writer.start_log("exit", self.class_name, method_name, log_file)
 
         except Exception as e:
-            self.log_writer.exception_log(e, log_file, self.class_name, method_name)
+            self.log_writer.exception_log(e, self.class_name, method_name, log_file)
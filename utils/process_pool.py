@@ -0,0 +1,14 @@
+import multiprocessing
+
+
+def get_process_pool(processes):
+    """
+    Method Name :   get_process_pool
+    Description :   This method creates a pool of worker processes which are spawned and not forked, since the
+                    pools run inside the api server, whose threads, boto3 clients and OpenMP state must not be
+                    copied into a child process. ProcessPoolExecutor only takes a spawn context from python 3.7,
+                    so a multiprocessing pool of the spawn context is used.
+
+    Output      :   A multiprocessing pool with the given number of spawned worker processes
+    """
+    return multiprocessing.get_context("spawn").Pool(processes=processes)